@@ -0,0 +1,300 @@
+#!/usr/bin/env python
+
+"""
+benchmark
+
+Performance measurements for the hot paths of handcompare, so regressions show up
+as numbers rather than as a slow production run.
+
+Every benchmark runs over seeded workloads, so two runs measure exactly the same
+hands:
+    random: uniformly random five card hands
+    default: every hand in default_hands.DEFAULT_HANDS, repeated
+    worst_case: straights and two pairs, which run through most of the check_()
+                functions before being recognised
+
+For each workload, the rate in hands (or comparisons) per second is measured for
+parsing, evaluation with each evaluator, comparison, sorting and showdowns. Peak
+memory of the benchmark process and cold start time of handcompare.py are also
+recorded. Results are written as JSON.
+
+Usage:
+    benchmark.py [--output results.json] [--hands N] [--repeat N] [--seed N]
+    benchmark.py --compare baseline.json results.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import platform
+import resource
+import subprocess
+
+import card
+import hand
+import evaluator
+import handcompare
+import default_hands
+
+# Defaults: hands in each workload, timed runs of each benchmark (the fastest is
+# kept) and the workload seed
+HANDS = 5000
+REPEAT = 3
+SEED = 18
+
+# Number of hands in each showdown
+SHOWDOWN_SIZE = 6
+
+
+def get_card_string(value, suit):
+    """Return the command line string for a card value and suit."""
+    return "{0}{1}".format(
+        evaluator.LookupEvaluator.VALUE_LETTERS.get(value, value), suit)
+
+
+def get_random_workload(count, rng):
+    """Return count random five card hand strings."""
+    deck = [get_card_string(value, suit)
+            for value in range(2, 15) for suit in card.Card.SUIT_ORDER]
+    return [",".join(rng.sample(deck, 5)) for hand_index in range(0, count)]
+
+
+def get_default_workload(count, rng):
+    """Return count hand strings cycling through default_hands.DEFAULT_HANDS."""
+    hand_strings = [default_hands.DEFAULT_HANDS[name]
+                    for name in sorted(default_hands.DEFAULT_HANDS.keys())]
+    return [hand_strings[hand_index % len(hand_strings)]
+            for hand_index in range(0, count)]
+
+
+def get_worst_case_workload(count, rng):
+    """Return count hand strings, alternating straights and two pairs."""
+    hand_strings = []
+    for hand_index in range(0, count):
+        if hand_index % 2:
+            # two pair: two values twice each, plus a kicker
+            values = rng.sample(range(2, 15), 3)
+            values = [values[0], values[0], values[1], values[1], values[2]]
+            suits = rng.sample(card.Card.SUIT_ORDER, 2) + \
+                rng.sample(card.Card.SUIT_ORDER, 2) + [rng.choice(card.Card.SUIT_ORDER)]
+        else:
+            # straight, never in a single suit
+            low_value = rng.randint(2, 10)
+            values = range(low_value, low_value + 5)
+            suits = [rng.choice(card.Card.SUIT_ORDER) for value in values]
+            if len(set(suits)) == 1:
+                suits[0] = card.Card.SUIT_ORDER[
+                    (card.Card.SUIT_ORDER.index(suits[0]) + 1) % 4]
+
+        cards = [get_card_string(value, suit) for (value, suit) in zip(values, suits)]
+        rng.shuffle(cards)
+        hand_strings.append(",".join(cards))
+
+    return hand_strings
+
+
+WORKLOADS = (
+    ("random", get_random_workload),
+    ("default", get_default_workload),
+    ("worst_case", get_worst_case_workload),
+)
+
+
+def time_best(function, repeat):
+    """Return the fastest of repeat runs of function, in seconds."""
+    best = None
+    for run in range(0, repeat):
+        start = time.time()
+        function()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best
+
+
+def measure(function, count, repeat):
+    """Return a result dict for function, which processes count items per run."""
+    seconds = time_best(function, repeat)
+    return {
+        "count": count,
+        "seconds": seconds,
+        "per_second": count / seconds if seconds else 0.0,
+    }
+
+
+def run_workload(hand_strings, repeat):
+    """Run every benchmark over a list of hand strings; return a dict of results."""
+    hc = handcompare.HandCompare()
+    results = {}
+
+    results["parse"] = measure(
+        lambda: [hc.parse_hand_string(hand_string) for hand_string in hand_strings],
+        len(hand_strings), repeat)
+
+    card_lists = [hc.parse_hand_string(hand_string).cards for hand_string in hand_strings]
+
+    def evaluate():
+        for cards in card_lists:
+            hand.Hand().add_cards(cards)
+
+    previous_evaluator = hand.Hand.evaluator
+    try:
+        for evaluator_name in hand.EVALUATORS:
+            hand.set_evaluator(evaluator_name)
+            results["evaluate_" + evaluator_name] = measure(
+                evaluate, len(card_lists), repeat)
+    finally:
+        hand.set_evaluator(previous_evaluator)
+
+    hands = [hc.parse_hand_string(hand_string) for hand_string in hand_strings]
+    pairs = zip(hands[0::2], hands[1::2])
+
+    results["compare"] = measure(
+        lambda: [hc.compare_hands(hand1, hand2) for (hand1, hand2) in pairs],
+        len(pairs), repeat)
+    results["compare_operator"] = measure(
+        lambda: [hand1 > hand2 for (hand1, hand2) in pairs], len(pairs), repeat)
+
+    results["sort"] = measure(lambda: sorted(hands), len(hands), repeat)
+    results["sort_score"] = measure(
+        lambda: sorted(hands, key=hand.Hand.get_score), len(hands), repeat)
+    results["sort_hands"] = measure(lambda: hand.sort_hands(hands), len(hands), repeat)
+    results["top_k"] = measure(lambda: hand.top_k(hands, 10), len(hands), repeat)
+
+    showdowns = [hands[start:start + SHOWDOWN_SIZE]
+                 for start in range(0, len(hands) - SHOWDOWN_SIZE + 1, SHOWDOWN_SIZE)]
+    results["showdown"] = measure(
+        lambda: [hc.showdown(showdown_hands) for showdown_hands in showdowns],
+        len(showdowns), repeat)
+
+    return results
+
+
+def measure_cold_start(repeat):
+    """
+    Time complete runs of handcompare.py comparing two hands in a new interpreter.
+    Returns a dict with the fastest and mean time in seconds.
+    """
+    command = [sys.executable,
+               os.path.join(os.path.dirname(os.path.abspath(__file__)), "handcompare.py"),
+               default_hands.DEFAULT_HANDS["royal_flush"],
+               default_hands.DEFAULT_HANDS["straight_flush"]]
+
+    timings = []
+    with open(os.devnull, "w") as devnull:
+        for run in range(0, repeat):
+            start = time.time()
+            subprocess.call(command, stdout=devnull, stderr=devnull)
+            timings.append(time.time() - start)
+
+    return {
+        "runs": repeat,
+        "min_seconds": min(timings),
+        "mean_seconds": sum(timings) / len(timings),
+    }
+
+
+def run_benchmarks(hands=HANDS, repeat=REPEAT, seed=SEED, cold_start=True):
+    """Run every benchmark and return the results as a dict suitable for JSON."""
+    results = {}
+    for (workload_name, get_workload) in WORKLOADS:
+        hand_strings = get_workload(hands, random.Random(seed))
+        for (name, result) in run_workload(hand_strings, repeat).items():
+            results["{0}.{1}".format(name, workload_name)] = result
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "hands": hands,
+            "repeat": repeat,
+            "seed": seed,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+        # ru_maxrss is in kilobytes on Linux (bytes on OS X)
+        "peak_memory": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+    if cold_start:
+        report["cold_start"] = measure_cold_start(repeat)
+
+    return report
+
+
+def compare_reports(baseline, current):
+    """
+    Return lines comparing two benchmark reports: the rate of each benchmark in both,
+    with the change as a percentage (positive is faster), then cold start times.
+    """
+    lines = ["{0:<32} {1:>14} {2:>14} {3:>9}".format(
+        "benchmark", "baseline/s", "current/s", "change")]
+
+    for name in sorted(set(baseline["results"]) & set(current["results"])):
+        before = baseline["results"][name]["per_second"]
+        after = current["results"][name]["per_second"]
+        change = (after / before - 1) * 100 if before else 0.0
+        lines.append("{0:<32} {1:>14.1f} {2:>14.1f} {3:>+8.1f}%".format(
+            name, before, after, change))
+
+    if "cold_start" in baseline and "cold_start" in current:
+        before = baseline["cold_start"]["min_seconds"]
+        after = current["cold_start"]["min_seconds"]
+        # Lower is better, so a faster start is a positive change
+        change = (before / after - 1) * 100 if after else 0.0
+        lines.append("{0:<32} {1:>13.3f}s {2:>13.3f}s {3:>+8.1f}%".format(
+            "cold_start", before, after, change))
+
+    lines.append("{0:<32} {1:>14} {2:>14}".format(
+        "peak_memory", baseline["peak_memory"], current["peak_memory"]))
+
+    return lines
+
+
+def get_option(name, default):
+    """Return the value following a command line option, or a default."""
+    if name in sys.argv:
+        try:
+            return sys.argv[sys.argv.index(name) + 1]
+        except IndexError:
+            print "Error: {0} requires a value".format(name)
+            sys.exit(1)
+
+    return default
+
+
+if __name__ == '__main__':
+    if "--compare" in sys.argv:
+        position = sys.argv.index("--compare")
+        if len(sys.argv) < position + 3:
+            print "Usage: {0} --compare [baseline file] [results file]".format(
+                sys.argv[0])
+            sys.exit(1)
+
+        with open(sys.argv[position + 1]) as baseline_file:
+            baseline = json.load(baseline_file)
+        with open(sys.argv[position + 2]) as current_file:
+            current = json.load(current_file)
+
+        print "\n".join(compare_reports(baseline, current))
+        sys.exit(0)
+
+    try:
+        hands = int(get_option("--hands", HANDS))
+        repeat = int(get_option("--repeat", REPEAT))
+        seed = int(get_option("--seed", SEED))
+    except ValueError:
+        print "Error: --hands, --repeat and --seed require integer values"
+        sys.exit(1)
+
+    report = run_benchmarks(hands, repeat, seed)
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if "--output" in sys.argv:
+        with open(get_option("--output", None), "w") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print output
@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+
+"""
+bulkcompare
+
+Parallel version of handcompare.py --batch for very large files of hand pairs.
+
+The input file is split into byte ranges of about --chunk-size bytes, each moved
+forward to the start of a line, so no line is split between chunks. Chunks are
+compared in a pool of worker processes with the HandCompare pipeline (iter_parse_hands,
+iter_evaluate and iter_compare) and the lookup evaluator.
+
+Output matches --batch: one result code per non-blank input line (1 for a line that
+cannot be parsed), followed by tab separated hand details with --verbose. By default
+results are written in input order. With --unordered, each chunk is written as soon as
+it finishes, and every output line starts with the byte offset of its input line and
+a tab so results can still be matched to their input.
+
+Lines end at "\n" only, as they do when handcompare.py --batch reads a file. Errors
+are reported on stderr with their line numbers as soon as every earlier chunk has been
+compared, and the totals for each result code follow at the end.
+
+Usage:
+    bulkcompare.py [input file] [--output file] [--processes N] [--chunk-size N]
+                   [--unordered] [--verbose] [--no-sanity]
+"""
+
+import os
+import sys
+import multiprocessing
+from cStringIO import StringIO
+
+import hand
+import evaluator
+import handcompare
+
+# Default number of bytes of input in each chunk
+CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def get_chunks(path, chunk_size=CHUNK_SIZE):
+    """
+    Return a list of (start, stop) byte ranges covering the file at path, each about
+    chunk_size bytes and each starting at the beginning of a line.
+    """
+    size = os.path.getsize(path)
+    starts = [0]
+
+    with open(path, "rb") as input_file:
+        for boundary in range(chunk_size, size, chunk_size):
+            if boundary <= starts[-1]:
+                # The previous chunk already extends past this boundary
+                continue
+
+            # Move to the start of the line after the one holding byte boundary - 1;
+            # if that byte ends a line, boundary is already the start of a line
+            input_file.seek(boundary - 1)
+            input_file.readline()
+            start = input_file.tell()
+            if start < size:
+                starts.append(start)
+
+    return zip(starts, starts[1:] + [size])
+
+
+def _compare_chunk(task):
+    """
+    Worker: compare every line in a byte range of the input. task is a tuple of (path,
+    start, stop, verbosity, sanity, with_offsets).
+
+    Returns a tuple of (output text, dict of result code to count, number of lines,
+    list of (line number within the chunk, error message)).
+    """
+    (path, start, stop, verbosity, sanity, with_offsets) = task
+
+    with open(path, "rb") as input_file:
+        input_file.seek(start)
+        # Unlike str.splitlines(), this only splits lines at "\n"
+        lines = StringIO(input_file.read(stop - start)).readlines()
+
+    hc = handcompare.HandCompare()
+    hand.set_evaluator("lookup")
+
+    # Byte offset of every line, by line number within the chunk
+    offsets = [start]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line))
+
+    totals = {handcompare.HAND1_WINS: 0, handcompare.HAND2_WINS: 0,
+              handcompare.HANDS_DRAW: 0, 1: 0}
+    output = []
+    errors = []
+
+    records = hc.iter_compare(hc.iter_evaluate(hc.iter_parse_hands(lines, sanity=sanity)))
+    for record in records:
+        prefix = ""
+        if with_offsets:
+            prefix = "{0}\t".format(offsets[record.line_number - 1])
+
+        if record.error is not None:
+            errors.append((record.line_number, str(record.error)))
+            output.append(prefix + "1\n")
+            totals[1] += 1
+            continue
+
+        totals[record.result] += 1
+        if verbosity == 0:
+            output.append("{0}{1}\n".format(prefix, record.result))
+        else:
+            output.append("{0}{1}\t{2}\t{3}\n".format(
+                prefix, record.result, hc.describe_hand(record.hands[0]),
+                hc.describe_hand(record.hands[1])))
+
+    return ("".join(output), totals, len(lines), errors)
+
+
+def bulk_compare(path, output_file, processes=None, ordered=True, verbosity=0,
+                 sanity=True, chunk_size=CHUNK_SIZE, error_file=None):
+    """
+    Compare every pair of hands in the file at path across processes, writing results
+    to output_file (see the module description for the format).
+
+    processes: number of worker processes; None uses every core, 1 runs in-process
+    ordered: write results in input order; otherwise write each chunk as it finishes,
+             with the byte offset of each input line
+    error_file: file for error messages, written as soon as their line numbers are
+                known; None discards them
+
+    Returns a dict of result code to number of occurrences, as HandCompare.batch() does.
+    Throws a ValueError if chunk_size is not positive.
+    """
+    if chunk_size < 1:
+        raise ValueError("Chunks must hold at least one byte")
+
+    tasks = [(path, start, stop, verbosity, sanity, not ordered)
+             for (start, stop) in get_chunks(path, chunk_size)]
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+
+    # Build the lookup tables before forking so workers inherit them
+    evaluator.get_lookup_evaluator()
+
+    totals = {handcompare.HAND1_WINS: 0, handcompare.HAND2_WINS: 0,
+              handcompare.HANDS_DRAW: 0, 1: 0}
+    # Line counts and errors of finished chunks waiting for an earlier chunk, by index
+    pending_errors = {}
+    next_chunk = 0
+    first_line = 0
+
+    pool = None
+    previous_evaluator = hand.Hand.evaluator
+    try:
+        if processes > 1 and len(tasks) > 1:
+            pool = multiprocessing.Pool(processes)
+            if ordered:
+                chunk_results = pool.imap(_compare_chunk, tasks)
+            else:
+                chunk_results = pool.imap_unordered(_numbered_chunk, enumerate(tasks))
+        else:
+            chunk_results = (_compare_chunk(task) for task in tasks)
+
+        for (chunk_index, chunk_result) in enumerate(chunk_results):
+            if not ordered and pool:
+                (chunk_index, chunk_result) = chunk_result
+
+            (output, chunk_totals, line_count, errors) = chunk_result
+            output_file.write(output)
+            for (code, count) in chunk_totals.items():
+                totals[code] += count
+
+            # Error line numbers are only known once every earlier chunk is counted
+            pending_errors[chunk_index] = (line_count, errors)
+            while next_chunk in pending_errors:
+                (line_count, errors) = pending_errors.pop(next_chunk)
+                if error_file is not None:
+                    for (line_number, message) in errors:
+                        error_file.write("Error on line {0}: {1}\n".format(
+                            first_line + line_number, message))
+                first_line += line_count
+                next_chunk += 1
+    finally:
+        if pool:
+            pool.terminate()
+            pool.join()
+        hand.set_evaluator(previous_evaluator)
+
+    return totals
+
+
+def _numbered_chunk(numbered_task):
+    """Worker: as _compare_chunk(), for a tuple of (chunk index, task)."""
+    return (numbered_task[0], _compare_chunk(numbered_task[1]))
+
+
+def get_option(name, default):
+    """Return the value following a command line option, or a default."""
+    if name in sys.argv:
+        try:
+            return sys.argv[sys.argv.index(name) + 1]
+        except IndexError:
+            print "Error: {0} requires a value".format(name)
+            sys.exit(1)
+
+    return default
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1].startswith("--"):
+        print "Usage: {0} [input file] [--output file] [--processes N] " \
+              "[--chunk-size N] [--unordered] [--verbose] [--no-sanity]".format(
+                  sys.argv[0])
+        sys.exit(1)
+
+    try:
+        processes = get_option("--processes", None)
+        if processes is not None:
+            processes = int(processes)
+        chunk_size = int(get_option("--chunk-size", CHUNK_SIZE))
+    except ValueError:
+        print "Error: --processes and --chunk-size require integer values"
+        sys.exit(1)
+
+    if chunk_size < 1:
+        print "Error: --chunk-size must be at least 1"
+        sys.exit(1)
+
+    if not os.path.isfile(sys.argv[1]):
+        print "Error: Could not open input file {0}.".format(sys.argv[1])
+        sys.exit(1)
+
+    output_path = get_option("--output", None)
+    output_file = sys.stdout
+    if output_path is not None:
+        output_file = open(output_path, "w")
+
+    try:
+        totals = bulk_compare(sys.argv[1], output_file, processes,
+                              "--unordered" not in sys.argv,
+                              1 if "--verbose" in sys.argv else 0,
+                              "--no-sanity" not in sys.argv, chunk_size, sys.stderr)
+    finally:
+        if output_path is not None:
+            output_file.close()
+
+    sys.stderr.write("Compared {0} lines: {1} hand 1 wins, {2} hand 2 wins, "
+                     "{3} draws, {4} errors\n".format(
+                         sum(totals.values()), totals[handcompare.HAND1_WINS],
+                         totals[handcompare.HAND2_WINS], totals[handcompare.HANDS_DRAW],
+                         totals[1]))
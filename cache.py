@@ -0,0 +1,104 @@
+"""
+This script is not directly executable and forms part of the objects for
+the handcompare application.
+"""
+
+# EvaluationCache: Remembers hand evaluation results with least recently used eviction.
+
+import collections
+
+import isomorphism
+
+# Default number of results kept by an EvaluationCache
+DEFAULT_MAXSIZE = 65536
+
+
+class EvaluationCache(object):
+    """
+    Bounded cache of hand evaluation results, each a tuple of
+    (type, multiple, rank tuple, score), evicting the least recently used result
+    once maxsize results are held.
+
+    Results are keyed by the set of cards, so card order never matters. With
+    suit_isomorphism, hands that only differ by a relabelling of suits (for example,
+    AC,KC,2D,3H,4S and AD,KD,2S,3C,4H) share a key. The result of an evaluation never
+    depends on which suit is which, so this raises the hit rate without changing any
+    result.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, suit_isomorphism=False):
+        """Constructor: create an empty cache. Throws a ValueError if maxsize < 1."""
+        if maxsize < 1:
+            raise ValueError("Cache must hold at least one result")
+
+        self.maxsize = maxsize
+        self.suit_isomorphism = suit_isomorphism
+        self.entries = collections.OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        """Number of results currently held."""
+        return len(self.entries)
+
+    def get_key(self, cards):
+        """
+        Return the cache key for a list of Card objects: the bitwise or of their
+        masks, or with suit_isomorphism, their key from isomorphism.get_key().
+        """
+        if self.suit_isomorphism:
+            return isomorphism.get_key((cards,))
+
+        mask = 0
+        for card_obj in cards:
+            mask |= card_obj.mask
+        return mask
+
+    def get(self, key):
+        """Return the result for a key and mark it as recently used, or None."""
+        try:
+            result = self.entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+
+        self.entries[key] = result
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        """Store the result for a key, evicting the least recently used if full."""
+        if key in self.entries:
+            del self.entries[key]
+        elif len(self.entries) >= self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+        self.entries[key] = result
+
+    def clear(self):
+        """Remove every result and reset the counters."""
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_hit_rate(self):
+        """Accessor: fraction of lookups that were hits, from 0 to 1"""
+        if not self.hits + self.misses:
+            return 0.0
+
+        return float(self.hits) / (self.hits + self.misses)
+
+    def get_stats(self):
+        """Accessor: dict of size, maxsize, hits, misses, evictions and hit rate"""
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.get_hit_rate(),
+        }
@@ -12,6 +12,18 @@ class InvalidCardError(Exception):
 
 
 class Card(object):
+    """
+    Defines a single immutable card.
+
+    There are only 52 distinct cards, so every Card is interned: constructing the same
+    value and suit twice returns the same object. Each card also carries a small
+    integer encoding - index (0-51, ordered by value and then suit) and mask
+    (1 << index) - for use in integer card sets.
+    """
+
+    # No per-instance __dict__; value/suit/index/mask are the only attributes.
+    __slots__ = ("value", "suit", "index", "mask")
+
     # Suit definitions. Provided as a dict for potential future text output.
     SUITS = {
         "H": "hearts",
@@ -20,6 +32,9 @@ class Card(object):
         "D": "diamonds",
     }
 
+    # Suit ordering used for the index encoding of each card.
+    SUIT_ORDER = ("C", "D", "H", "S")
+
     # Assign integer values to Jack through Ace. In this code, Ace is considered high
     # and dealt with specially when considering a A-5 straight.
     LETTER_CARD_VALUES = {
@@ -29,9 +44,13 @@ class Card(object):
         "A": 14,
     }
 
-    # Local properties for card value and suit.
-    value = 0
-    suit = ""
+    # Interned cards, keyed by the canonical (card_value, card_suit) arguments of each
+    # card, such as (10, "H") or ("A", "S"). Populated at module load, so it holds
+    # exactly 52 entries; other spellings are validated and looked up by index.
+    _interned = {}
+
+    # Interned cards in index order (0-51), populated at module load.
+    _by_index = [None] * 52
 
     def __repr__(self):
         """For sorting purposes, always use value first and then suit; return a tuple"""
@@ -39,9 +58,26 @@ class Card(object):
 
     def __eq__(self, other):
         """Equality operator. Check if value and suit match."""
-        return (self.value == other.get_value() and self.suit == other.get_suit())
+        return isinstance(other, Card) and self.index == other.index
+
+    def __ne__(self, other):
+        """Inequality operator: inverse of __eq__"""
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        """Hash: the card index, consistent with __eq__"""
+        return self.index
+
+    def __setattr__(self, name, value):
+        """Cards are shared between all users, so prevent modification."""
+        raise AttributeError("Card objects are immutable")
 
-    def _map_card_value(self, card):
+    def __reduce__(self):
+        """Pickle as a reference to the interned card so copies stay interned."""
+        return (from_index, (self.index,))
+
+    @classmethod
+    def _map_card_value(cls, card):
         """
         Internal mapping function. Check if card is an integer.
         If not, catch exception and return predefined value.
@@ -54,8 +90,8 @@ class Card(object):
             # TypeError occurs when card cannot be converted to integer (None)
             # ValueError occurs when card is letter; try and retrieve it from dict
             try:
-                return self.LETTER_CARD_VALUES[card]
-            except KeyError:
+                return cls.LETTER_CARD_VALUES[card]
+            except (KeyError, TypeError):
                 raise ValueError("Card value must be between 2 and A")
 
         # Check if card falls outside range 2-10 (11+ have already been returned)
@@ -65,33 +101,121 @@ class Card(object):
         # Enforce integer on return.
         return card
 
-    def _check_card_suit(self, suit):
+    @classmethod
+    def _check_card_suit(cls, suit):
         """Internal card suit validation function."""
-        return suit in self.SUITS
+        try:
+            return suit in cls.SUITS
+        except TypeError:
+            # unhashable suits can never be valid
+            return False
 
-    def __init__(self, card_value, card_suit):
+    def __new__(cls, card_value, card_suit):
         """
-        Constructor. Set up a new object with specified value and suit.
+        Constructor. Return the interned card with specified value and suit.
         Can throw an InvalidCardError if parsing the given value or suit fails.
         """
 
-        self.value = card_value
-        self.suit = card_suit
+        # Fast path: the card is given by its canonical value and suit
+        try:
+            return cls._interned[(card_value, card_suit)]
+        except (KeyError, TypeError):
+            # TypeError occurs when either argument is unhashable; validation fails
+            pass
 
         # try to map card value with appropriate table
         try:
-            self.value = self._map_card_value(self.value)
+            value = cls._map_card_value(card_value)
         except ValueError:
             # raise custom exception
             raise InvalidCardError("Value of card could not be parsed")
 
-        if not self._check_card_suit(self.suit):
+        if not cls._check_card_suit(card_suit):
             raise InvalidCardError("Value of suit could not be parsed")
 
+        return cls._by_index[(value - 2) * 4 + cls.SUIT_ORDER.index(card_suit)]
+
+    @classmethod
+    def _create(cls, value, suit):
+        """Internal: allocate one of the 52 interned cards at module load."""
+        card_obj = object.__new__(cls)
+        index = (value - 2) * 4 + cls.SUIT_ORDER.index(suit)
+
+        object.__setattr__(card_obj, "value", value)
+        object.__setattr__(card_obj, "suit", suit)
+        object.__setattr__(card_obj, "index", index)
+        object.__setattr__(card_obj, "mask", 1 << index)
+
+        cls._by_index[index] = card_obj
+        return card_obj
+
     def get_value(self):
         """Accessor method for card value"""
-        return int(self.value)
+        return self.value
 
     def get_suit(self):
         """Accessor method for card suit"""
         return self.suit
+
+    def get_index(self):
+        """Accessor method for card index (0-51)"""
+        return self.index
+
+    def get_mask(self):
+        """Accessor method for card bitmask (1 << index)"""
+        return self.mask
+
+
+def from_index(index):
+    """Return the interned Card for an index from 0-51."""
+    return Card._by_index[index]
+
+
+def from_token(token):
+    """
+    Return the interned Card for a card string such as "10C" or "AS". Tokens are
+    resolved with one lookup in CARD_TOKENS; lowercase letters, surrounding whitespace
+    and "T" for ten are also accepted. Throws an InvalidCardError for anything else.
+    """
+    try:
+        return CARD_TOKENS[token]
+    except (KeyError, TypeError):
+        pass
+
+    try:
+        return CARD_TOKENS[token.strip().upper()]
+    except (KeyError, AttributeError):
+        raise InvalidCardError("Card {0!r} could not be parsed".format(token))
+
+
+def to_token(card_obj):
+    """Return the card string for a Card, such as "10C" or "AS"; see from_token()."""
+    for (letter, letter_value) in Card.LETTER_CARD_VALUES.items():
+        if letter_value == card_obj.value:
+            return letter + card_obj.suit
+
+    return str(card_obj.value) + card_obj.suit
+
+
+# Create the 52 interned cards.
+for _value in range(2, 15):
+    for _suit in Card.SUIT_ORDER:
+        Card._create(_value, _suit)
+del _value, _suit
+
+# Canonical arguments of every card: an integer value up to 10, otherwise its letter
+_letters = dict((_letter_value, _letter)
+                for (_letter, _letter_value) in Card.LETTER_CARD_VALUES.items())
+for _card in Card._by_index:
+    Card._interned[(_letters.get(_card.value, _card.value), _card.suit)] = _card
+del _card, _letters
+
+# Every valid card string (value then suit, uppercase) mapped to its interned card.
+CARD_TOKENS = {}
+for _card in Card._by_index:
+    for _letter, _letter_value in Card.LETTER_CARD_VALUES.items() + [("T", 10)]:
+        if _letter_value == _card.value:
+            CARD_TOKENS[_letter + _card.suit] = _card
+    if _card.value <= 10:
+        CARD_TOKENS[str(_card.value) + _card.suit] = _card
+del _card, _letter, _letter_value
@@ -0,0 +1,65 @@
+"""
+This script is not directly executable and forms part of the objects for
+the handcompare application.
+"""
+
+# Combinatorics: Binomial coefficients and combinations numbered by index.
+
+
+# Binomial coefficients C(n, k) for n, k up to 52, indexed [n][k].
+BINOMIALS = [[0] * 53 for n in range(0, 53)]
+for _n in range(0, 53):
+    BINOMIALS[_n][0] = 1
+    for _k in range(1, _n + 1):
+        BINOMIALS[_n][_k] = BINOMIALS[_n - 1][_k - 1] + BINOMIALS[_n - 1][_k]
+del _n, _k
+
+
+def binomial(n, k):
+    """Return the binomial coefficient C(n, k) for any n, using BINOMIALS up to 52."""
+    if k < 0 or k > n:
+        return 0
+    if n < len(BINOMIALS):
+        return BINOMIALS[n][k]
+
+    k = min(k, n - k)
+    result = 1
+    for i in range(1, k + 1):
+        result = result * (n - k + i) // i
+
+    return result
+
+
+def unrank_combination(index, k):
+    """
+    Return the combination with the given index in the combinatorial number system:
+    a list of k ascending positions c1 < c2 < ... < ck such that
+    index = C(ck, k) + ... + C(c2, 2) + C(c1, 1). Combinations are numbered in
+    colexicographic order, so index 0 is [0, 1, ..., k - 1].
+    """
+    positions = [0] * k
+    for size in range(k, 0, -1):
+        # largest position whose binomial does not exceed the remaining index
+        position = size - 1
+        while BINOMIALS[position + 1][size] <= index:
+            position += 1
+        positions[size - 1] = position
+        index -= BINOMIALS[position][size]
+
+    return positions
+
+
+def next_combination(positions):
+    """
+    Advance a list of ascending positions, in place, to the combination with the
+    next index in the combinatorial number system.
+    """
+    for size in range(0, len(positions)):
+        if size + 1 == len(positions) or positions[size] + 1 < positions[size + 1]:
+            positions[size] += 1
+            # reset every lower position to its smallest value
+            for lower in range(0, size):
+                positions[lower] = lower
+            return positions
+
+    return positions
@@ -0,0 +1,325 @@
+"""
+This script is not directly executable and forms part of the objects for
+the handcompare application.
+"""
+
+# Equity: Estimates how often each of several hands wins from a partial deal.
+
+import math
+import random
+import multiprocessing
+
+import hand
+import evaluator
+import combinatorics
+
+# Default number of cards on a complete board (Texas Hold-Em)
+BOARD_SIZE = 5
+
+# Number of trials simulated by one worker task. Trials are always split into chunks
+# of this size regardless of the number of processes, so results for a given seed
+# do not depend on how many processes were used.
+CHUNK_SIZE = 2000
+
+
+class EquityResult(object):
+    """
+    Win/tie/loss counts for each player over a number of trials (or deals).
+
+    wins: number of deals each player won outright
+    ties: number of deals each player split with one or more other players
+    shares: sum over all deals of each player's share of the pot (1 for an outright
+            win, 1/N for an N-way split), used for equity
+    share_squares: sum of the squares of those shares, used for the standard error
+    """
+
+    def __init__(self, players):
+        """Constructor: zero counts for the given number of players."""
+        self.trials = 0
+        self.wins = [0] * players
+        self.ties = [0] * players
+        self.shares = [0.0] * players
+        self.share_squares = [0.0] * players
+
+    def __repr__(self):
+        """Representation: equity of each player and number of trials"""
+        return "EquityResult(trials={0}, equity={1})".format(
+            self.trials, [round(self.get_equity(player), 4)
+                          for player in range(0, len(self.wins))])
+
+    def add_deal(self, scores):
+        """Record a single deal given the final score of every player."""
+        best_score = max(scores)
+        winners = [player for player in range(0, len(scores))
+                   if scores[player] == best_score]
+
+        self.trials += 1
+        share = 1.0 / len(winners)
+        for player in winners:
+            if len(winners) == 1:
+                self.wins[player] += 1
+            else:
+                self.ties[player] += 1
+            self.shares[player] += share
+            self.share_squares[player] += share * share
+
+    def merge(self, other):
+        """Add the counts from another EquityResult to this one."""
+        self.trials += other.trials
+        for player in range(0, len(self.wins)):
+            self.wins[player] += other.wins[player]
+            self.ties[player] += other.ties[player]
+            self.shares[player] += other.shares[player]
+            self.share_squares[player] += other.share_squares[player]
+
+        return self
+
+    def get_losses(self, player):
+        """Accessor: number of deals the player neither won nor tied"""
+        return self.trials - self.wins[player] - self.ties[player]
+
+    def get_equity(self, player):
+        """Accessor: the player's expected share of the pot, from 0 to 1"""
+        if not self.trials:
+            return 0.0
+
+        return self.shares[player] / self.trials
+
+    def get_standard_error(self, player):
+        """Accessor: standard error of the player's equity estimate"""
+        if self.trials < 2:
+            return float("inf")
+
+        mean = self.get_equity(player)
+        variance = max(self.share_squares[player] / self.trials - mean * mean, 0.0)
+        return math.sqrt(variance / (self.trials - 1))
+
+
+def get_card_indices(cards):
+    """
+    Return a list of Card.index values for a list of Card objects, throwing a
+    DuplicateCardError if any card appears more than once.
+    """
+    mask = 0
+    card_indices = []
+    for card_obj in cards:
+        if mask & card_obj.mask:
+            raise hand.DuplicateCardError(
+                "Card {0} appears more than once".format(card_obj))
+        mask |= card_obj.mask
+        card_indices.append(card_obj.index)
+
+    return card_indices
+
+
+def prepare_deal(hands, board=None, dead=None, board_size=BOARD_SIZE):
+    """
+    Validate a partial deal and convert it to card indices. Returns a tuple of
+    (list of hole card indices per player, board indices, indices of cards still in
+    the deck, number of board cards to deal).
+
+    Throws a DuplicateCardError if a card is used twice, a ValueError for fewer than
+    two players, and a MissingCardError or MaximumCardError if players would not end
+    up with five to seven cards each.
+    """
+    board = list(board or [])
+    dead = list(dead or [])
+
+    if len(hands) < 2:
+        raise ValueError("At least two hands are required to calculate equity")
+
+    # Checks every known card for duplicates across players, board and dead cards
+    all_indices = get_card_indices([card_obj for hole_cards in hands
+                                    for card_obj in hole_cards] + board + dead)
+
+    if len(board) > board_size:
+        raise hand.MaximumCardError("Board already has more than {0} cards".format(
+            board_size))
+
+    for hole_cards in hands:
+        if len(hole_cards) + board_size < hand.Hand.MAXIMUM_CARDS:
+            raise hand.MissingCardError("Each player must end with at least five cards")
+        elif len(hole_cards) + board_size > hand.SevenCardHand.MAXIMUM_CARDS:
+            raise hand.MaximumCardError("Each player can have at most seven cards")
+
+    used_indices = set(all_indices)
+    hole_indices = [[card_obj.index for card_obj in hole_cards] for hole_cards in hands]
+    deck = [card_index for card_index in range(0, 52) if card_index not in used_indices]
+
+    return (hole_indices, [card_obj.index for card_obj in board], deck,
+            board_size - len(board))
+
+
+def _simulate(task):
+    """
+    Worker: simulate a number of random deals and return an EquityResult.
+    task is a tuple of (hole indices, board indices, deck, cards to deal, trials, seed)
+    and every task uses its own seeded random number generator.
+    """
+    (hole_indices, board, deck, needed, trials, seed) = task
+
+    rng = random.Random(seed)
+    evaluate = evaluator.get_lookup_evaluator().evaluate_best_indices
+    result = EquityResult(len(hole_indices))
+
+    for trial in xrange(0, trials):
+        full_board = board + rng.sample(deck, needed)
+        result.add_deal([evaluate(hole + full_board)[3] for hole in hole_indices])
+
+    return result
+
+
+def monte_carlo(hands, board=None, dead=None, trials=100000, target_error=None,
+                processes=None, seed=None, board_size=BOARD_SIZE):
+    """
+    Estimate the equity of each hand by dealing random completions of the board from
+    the remaining deck and ranking every player's best five card hand.
+
+    hands: list of lists of known Card objects, one list per player
+    board: list of Card objects already on the board
+    dead: list of Card objects known to be out of the deck
+    trials: number of deals to simulate; with target_error, the maximum number
+    target_error: stop once the standard error of every player's equity is at or
+                  below this value (checked after every chunk, in order)
+    processes: number of worker processes; None uses every core, 1 runs in-process
+    seed: base seed; chunk N of the run is simulated with seed + N
+
+    Returns an EquityResult. Throws a ValueError if trials or processes is less than
+    one.
+    """
+    if trials < 1:
+        raise ValueError("At least one trial is required to estimate equity")
+
+    (hole_indices, board_indices, deck, needed) = prepare_deal(
+        hands, board, dead, board_size)
+
+    if seed is None:
+        seed = random.randrange(0, 2 ** 31)
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    if processes < 1:
+        raise ValueError("At least one process is required to estimate equity")
+
+    # Split the trials into fixed size chunks, each with its own seed
+    tasks = []
+    for chunk_start in range(0, trials, CHUNK_SIZE):
+        tasks.append((hole_indices, board_indices, deck, needed,
+                      min(CHUNK_SIZE, trials - chunk_start), seed + len(tasks)))
+
+    # Build the lookup tables before forking so workers inherit them
+    evaluator.get_lookup_evaluator()
+
+    result = EquityResult(len(hands))
+    pool = None
+    if processes > 1:
+        pool = multiprocessing.Pool(processes)
+
+    try:
+        if pool:
+            chunk_results = pool.imap(_simulate, tasks)
+        else:
+            chunk_results = (_simulate(task) for task in tasks)
+
+        # Chunks are merged and checked in order, so the stopping point does not
+        # depend on the number of processes; chunks simulated past it are discarded
+        for chunk_result in chunk_results:
+            result.merge(chunk_result)
+
+            if target_error is not None and max(
+                    result.get_standard_error(player)
+                    for player in range(0, len(hands))) <= target_error:
+                break
+    finally:
+        if pool:
+            pool.terminate()
+            pool.join()
+
+    return result
+
+
+def count_deals(hands, board=None, dead=None, board_size=BOARD_SIZE):
+    """Return the number of distinct board completions for a partial deal."""
+    (hole_indices, board_indices, deck, needed) = prepare_deal(
+        hands, board, dead, board_size)
+    return combinatorics.BINOMIALS[len(deck)][needed]
+
+
+def _enumerate(task):
+    """
+    Worker: evaluate every board completion with an index from start (inclusive) to
+    stop (exclusive) and return an EquityResult.
+    task is a tuple of (hole indices, board indices, deck, cards to deal, start, stop).
+    """
+    (hole_indices, board, deck, needed, start, stop) = task
+
+    evaluate = evaluator.get_lookup_evaluator().evaluate_best_indices
+    result = EquityResult(len(hole_indices))
+    known = [hole + board for hole in hole_indices]
+
+    positions = combinatorics.unrank_combination(start, needed)
+    for deal_index in xrange(start, stop):
+        dealt = [deck[position] for position in positions]
+        result.add_deal([evaluate(cards + dealt)[3] for cards in known])
+        combinatorics.next_combination(positions)
+
+    return result
+
+
+def enumerate_range(hands, board=None, dead=None, start=0, stop=None,
+                    board_size=BOARD_SIZE):
+    """
+    Evaluate board completions start (inclusive) to stop (exclusive), numbered by the
+    combinatorial number system over the cards remaining in the deck, in this
+    process. Ranges from several processes or hosts can be combined with
+    EquityResult.merge(). Returns an EquityResult.
+    """
+    (hole_indices, board_indices, deck, needed) = prepare_deal(
+        hands, board, dead, board_size)
+
+    if stop is None:
+        stop = combinatorics.BINOMIALS[len(deck)][needed]
+
+    return _enumerate((hole_indices, board_indices, deck, needed, start, stop))
+
+
+def exhaustive(hands, board=None, dead=None, processes=None, chunk_size=CHUNK_SIZE,
+               board_size=BOARD_SIZE):
+    """
+    Calculate exact equity by evaluating every possible completion of the board.
+    Parameters are as for monte_carlo(). The index range of all completions is split
+    into chunks of chunk_size which are evaluated across processes and merged in
+    order, so results are identical for any number of processes.
+
+    Returns an EquityResult, with trials equal to the number of completions.
+    """
+    (hole_indices, board_indices, deck, needed) = prepare_deal(
+        hands, board, dead, board_size)
+    total = combinatorics.BINOMIALS[len(deck)][needed]
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+
+    tasks = []
+    for chunk_start in range(0, total, chunk_size):
+        tasks.append((hole_indices, board_indices, deck, needed, chunk_start,
+                      min(chunk_start + chunk_size, total)))
+
+    # Build the lookup tables before forking so workers inherit them
+    evaluator.get_lookup_evaluator()
+
+    result = EquityResult(len(hands))
+    if processes > 1 and len(tasks) > 1:
+        pool = multiprocessing.Pool(processes)
+        try:
+            chunk_results = pool.map(_enumerate, tasks)
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        chunk_results = [_enumerate(task) for task in tasks]
+
+    for chunk_result in chunk_results:
+        result.merge(chunk_result)
+
+    return result
@@ -0,0 +1,258 @@
+"""
+This script is not directly executable and forms part of the objects for
+the handcompare application.
+"""
+
+# LookupEvaluator: Resolves hand type, multiple and rank with a precomputed table.
+
+import itertools
+
+import card
+import hand
+
+
+class LookupEvaluator(object):
+    """
+    Alternate evaluation engine for five card hands.
+
+    Every five card hand falls into one of 7,462 equivalence classes, determined only by
+    the multiset of card values and whether all cards share a suit. Each card value is
+    assigned a prime number so that the product of the five primes is unique for every
+    multiset of values (prime-product hashing). Two tables are kept: one for flushes
+    and one for everything else.
+
+    The tables are populated by running one representative hand for every class through
+    the reference check_() chain in Hand, so the results are exactly what the reference
+    implementation would produce for any hand in that class.
+    """
+
+    # One prime per card value, 2 through A.
+    PRIMES = {
+        2: 2,
+        3: 3,
+        4: 5,
+        5: 7,
+        6: 11,
+        7: 13,
+        8: 17,
+        9: 19,
+        10: 23,
+        11: 29,
+        12: 31,
+        13: 37,
+        14: 41,
+    }
+
+    # Suits are only used when building representative hands; the first suit is used
+    # for flushes, and the others let repeated values be dealt without duplicates.
+    REPRESENTATIVE_SUITS = ("C", "D", "H", "S")
+
+    # Card objects only accept letters for J-A, so map values back to their letters.
+    VALUE_LETTERS = dict(
+        (value, letter) for (letter, value) in card.Card.LETTER_CARD_VALUES.items())
+
+    def __init__(self):
+        """Constructor: build both lookup tables."""
+        # key=prime product, value=(type, multiple, rank tuple, score)
+        self.flush_table = {}
+        self.rank_table = {}
+        self._build_tables()
+
+    def _build_tables(self):
+        """Populate the flush and non-flush tables from representative hands."""
+        values = sorted(self.PRIMES.keys())
+
+        # Flushes: five distinct values in a single suit
+        for hand_values in itertools.combinations(values, hand.Hand.MAXIMUM_CARDS):
+            suits = [self.REPRESENTATIVE_SUITS[0]] * len(hand_values)
+            self.flush_table[self.get_key(hand_values)] = self._evaluate_representative(
+                hand_values, suits)
+
+        # Everything else: any multiset of values with at most four of each value
+        for hand_values in itertools.combinations_with_replacement(
+                values, hand.Hand.MAXIMUM_CARDS):
+            # Five of a kind cannot exist in a single deck
+            if any(hand_values.count(value) > len(self.REPRESENTATIVE_SUITS)
+                   for value in hand_values):
+                continue
+
+            suits = []
+            for value_index in range(0, len(hand_values)):
+                # Deal repeated values into successive suits so cards never repeat
+                suits.append(self.REPRESENTATIVE_SUITS[
+                    hand_values[:value_index].count(hand_values[value_index])])
+
+            if suits.count(self.REPRESENTATIVE_SUITS[0]) == len(suits):
+                # Five distinct values would be dealt as a flush; change one suit
+                suits[0] = self.REPRESENTATIVE_SUITS[1]
+
+            self.rank_table[self.get_key(hand_values)] = self._evaluate_representative(
+                hand_values, suits)
+
+    def _evaluate_representative(self, hand_values, suits):
+        """Evaluate a single representative hand with the reference check_() chain."""
+        representative = hand.Hand()
+
+        # Always build tables with the reference implementation, regardless of
+        # which evaluator is currently selected for Hand objects.
+        representative.evaluator = "check"
+
+        for value, suit in zip(hand_values, suits):
+            representative.add_card(
+                card.Card(self.VALUE_LETTERS.get(value, value), suit))
+
+        return (
+            representative.get_type(),
+            representative.get_multiple(),
+            tuple(representative.get_rank()),
+            representative.get_score(),
+        )
+
+    def get_key(self, card_values):
+        """Return the prime product for a sequence of card values."""
+        key = 1
+        for value in card_values:
+            key *= self.PRIMES[value]
+
+        return key
+
+    def evaluate_values(self, card_values, flush):
+        """
+        Return a (type, multiple, rank tuple, score) for five card values.
+        flush specifies whether all five cards share a single suit.
+        """
+        if flush:
+            return self.flush_table[self.get_key(card_values)]
+
+        return self.rank_table[self.get_key(card_values)]
+
+    def evaluate_key(self, key, flush):
+        """
+        Return a (type, multiple, rank tuple, score) for a prime product key.
+        flush specifies whether all five cards share a single suit.
+        """
+        if flush:
+            return self.flush_table[key]
+
+        return self.rank_table[key]
+
+    def evaluate_best_indices(self, card_indices):
+        """
+        Return a (type, multiple, rank tuple, score) for the best five card hand that can
+        be made from five to seven card indices (see Card.index).
+
+        Rather than evaluating all 21 five card subsets of seven cards, the best five
+        card values are picked directly from the value and suit counts, then resolved
+        with one lookup. Throws a MissingCardError or MaximumCardError if there are
+        fewer than five or more than seven cards.
+        """
+        if len(card_indices) < hand.Hand.MAXIMUM_CARDS:
+            raise hand.MissingCardError("Must have at least five cards in hand")
+        elif len(card_indices) > hand.SevenCardHand.MAXIMUM_CARDS:
+            raise hand.MaximumCardError("Cannot evaluate more than seven cards")
+
+        rank_counts = [0] * 15
+        suit_values = ([], [], [], [])
+        for card_index in card_indices:
+            value = (card_index >> 2) + 2
+            rank_counts[value] += 1
+            suit_values[card_index & 3].append(value)
+
+        """
+        With seven or fewer cards, a hand containing a flush cannot also contain four of
+        a kind or a full house (either would need at least three cards outside the flush
+        suit), so the best hand is the best straight flush or flush in that suit.
+        """
+        for values in suit_values:
+            if len(values) >= hand.Hand.MAXIMUM_CARDS:
+                best_values = self._best_straight(set(values))
+                if not best_values:
+                    best_values = sorted(values, reverse=True)[:hand.Hand.MAXIMUM_CARDS]
+                return self.flush_table[self.get_key(best_values)]
+
+        return self.rank_table[self.get_key(self._best_values(rank_counts))]
+
+    def _best_straight(self, values):
+        """Return the five values of the highest straight in a set of values, if any."""
+        for high_value in range(14, 5, -1):
+            straight = range(high_value - 4, high_value + 1)
+            if values.issuperset(straight):
+                return straight
+
+        # Ace low straight
+        if values.issuperset((14, 2, 3, 4, 5)):
+            return [14, 2, 3, 4, 5]
+
+        return None
+
+    def _best_values(self, rank_counts):
+        """
+        Return the five card values making up the best non-flush hand from a list of
+        counts indexed by card value, checking hand types in descending order.
+        """
+        # (count, value) for every value present, most frequent then highest first
+        groups = sorted([(rank_counts[value], value) for value in range(2, 15)
+                         if rank_counts[value]], reverse=True)
+        (top_count, top_value) = groups[0]
+
+        if top_count == 4:
+            # four of a kind and the highest remaining card
+            return [top_value] * 4 + [max(value for (count, value) in groups[1:])]
+
+        if top_count == 3 and len(groups) > 1 and groups[1][0] >= 2:
+            # full house: highest three of a kind and highest other pair (or better)
+            pair_value = max(value for (count, value) in groups[1:] if count >= 2)
+            return [top_value] * 3 + [pair_value] * 2
+
+        straight = self._best_straight(set(value for (count, value) in groups))
+        if straight:
+            return straight
+
+        # Remaining types: the largest groups first, filled up with the highest kickers
+        if top_count == 3:
+            grouped = [top_value]
+        else:
+            grouped = sorted([value for (count, value) in groups if count == 2],
+                             reverse=True)[:2]
+
+        best_values = []
+        for value in grouped:
+            best_values += [value] * rank_counts[value]
+
+        kickers = sorted([value for (count, value) in groups if value not in grouped],
+                         reverse=True)
+        return best_values + kickers[:hand.Hand.MAXIMUM_CARDS - len(best_values)]
+
+    def evaluate_best(self, cards):
+        """
+        Return a (type, multiple, rank tuple, score) for the best five card hand that
+        can be made from a list of five to seven Card objects.
+        """
+        return self.evaluate_best_indices([card_obj.index for card_obj in cards])
+
+    def evaluate(self, cards):
+        """Return a (type, multiple, rank tuple, score) for a list of five Cards."""
+        key = 1
+        suits = set()
+        for card_obj in cards:
+            key *= self.PRIMES[card_obj.get_value()]
+            suits.add(card_obj.get_suit())
+
+        if len(suits) == 1:
+            return self.flush_table[key]
+
+        return self.rank_table[key]
+
+
+# Shared evaluator instance; tables are only built the first time they are needed.
+_lookup_evaluator = None
+
+
+def get_lookup_evaluator():
+    """Return the shared LookupEvaluator, building its tables on first use."""
+    global _lookup_evaluator
+
+    if _lookup_evaluator is None:
+        _lookup_evaluator = LookupEvaluator()
+
+    return _lookup_evaluator
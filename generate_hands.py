@@ -1,12 +1,18 @@
 #!/usr/bin/env python
 
-# This script generates command lines appropriate for hand comparison
+# This script generates command lines appropriate for hand comparison.
+# With --batch, it instead generates input lines for handcompare.py --batch.
+
+import sys
 
 import default_hands
 
 if __name__ == '__main__':
     hand_values = default_hands.DEFAULT_HANDS.values()
     for i in range(0, len(hand_values) - 1):
-        print "./handcompare.py {0} {1} --verbose --no-sanity".format(
-            hand_values[i], hand_values[i+1])
+        if "--batch" in sys.argv:
+            print "{0} {1}".format(hand_values[i], hand_values[i+1])
+        else:
+            print "./handcompare.py {0} {1} --verbose --no-sanity".format(
+                hand_values[i], hand_values[i+1])
         i = i+1
@@ -5,7 +5,26 @@ the handcompare application.
 
 # Hand: Represents a single hand of Card objects.
 
+import heapq
+import itertools
+
 import card
+import cache
+import evaluator
+
+try:
+    import numpy
+except ImportError:
+    # NumPy is optional and only required by evaluate_array()
+    numpy = None
+
+# Available evaluators for Hand.get_hand_type():
+# check: reference implementation, runs the check_() functions in order
+# lookup: single lookup into the precomputed tables of evaluator.LookupEvaluator
+EVALUATORS = ("check", "lookup")
+
+# Shared EvaluationCache used by get_hand_type(), if enabled; see enable_cache()
+_cache = None
 
 
 class DuplicateCardError(Exception):
@@ -42,8 +61,18 @@ class Hand(object):
     * If type is equal, winning hand is greater of multiple property
     * If multiple is equal, winning hand is greater of rank property
     * If rank is equal, hands are a draw
+
+    All three properties are packed into the score property once the hand is
+    evaluated, so every comparison operator is a single integer comparison. Sorting
+    with key=Hand.get_score avoids calling the operators at all.
+
+    Cards are held as a set of card bitmasks (mask property) along with per-value and
+    per-suit counts, all maintained as each card is added. The sorted list of Card
+    objects is only built when the cards property is used.
     """
-    cards = []
+
+    # mask: bitwise or of Card.mask for every card in this hand
+    mask = 0
 
     # type: hand type (flush, straight, pair, etc...)
     type = 0
@@ -54,8 +83,17 @@ class Hand(object):
     # multiple: in pair+ situations, contains the value of pair+s (3x 8's = 8)
     multiple = 0
 
-    # Specifies maximum number of cards in a hand
+    # score: type, multiple and rank packed into one integer; see pack_score()
+    score = 0
+
+    # Specifies maximum number of cards in a hand, and the number of cards
+    # at which the hand is evaluated
     MAXIMUM_CARDS = 5
+    MINIMUM_CARDS = 5
+
+    # Evaluator used by get_hand_type(); see EVALUATORS and set_evaluator(). A hand
+    # created with its own evaluator uses that one instead.
+    evaluator = "check"
 
     # Defines hand types. Larger type values win over smaller ones.
     HAND_TYPES = (
@@ -84,8 +122,18 @@ class Hand(object):
         """Representation: return the card list as a string for parsing"""
         return str(self.cards)
 
-    def __init__(self):
-        """Constructor: Clear the card list at initialization"""
+    def __init__(self, evaluator_name=None):
+        """
+        Constructor: Clear the card list at initialization. evaluator_name selects the
+        evaluator for this hand only; None uses the one chosen with set_evaluator().
+        Throws a ValueError if the evaluator is not defined.
+        """
+        if evaluator_name is not None:
+            if evaluator_name not in EVALUATORS:
+                raise ValueError("Unknown evaluator {0}; must be one of {1}".format(
+                    evaluator_name, ", ".join(EVALUATORS)))
+            self.evaluator = evaluator_name
+
         self.clear()
         self._create_hand_type_cache()
 
@@ -96,104 +144,31 @@ class Hand(object):
 
     def __gt__(self, other):
         """> operator: Determine if this hand wins over another."""
-
-        # check hand type first
-        if self.get_type() > other.get_type():
-            return True
-        elif self.get_type() < other.get_type():
-            return False
-
-        # at this point hand types are equal, check multiple (single digit)
-        if self.get_multiple() > other.get_multiple():
-            return True
-        elif self.get_multiple() < other.get_multiple():
-            return False
-
-        # stop-gap: raise exception if the comparison functions would fail
-        # this ensures data integrity and is a good way to find problems in batch runs
-        if not self.check_rank_consistency(other):
-            return False
-
-        # at this point hand multiples are equal, check rank (list)
-        self_rank = self.get_rank()
-        other_rank = other.get_rank()
-
-        # find the first element that doesn't match
-        for rank_index in range(0, len(self_rank)):
-            if self_rank[rank_index] > other_rank[rank_index]:
-                # self > other
-                return True
-            elif self_rank[rank_index] < other_rank[rank_index]:
-                # other > self
-                return False
-            # otherwise, rank items are equal - continue loop
-
-        # Finally, return false - they are equal in all categories
-        # so self is not greater than other (but __eq__ operator should deliver True)
-        return False
+        return self.score > other.score
 
     def __lt__(self, other):
         """< operator: determine if this hand loses to another."""
-
-        # check hand type first
-        if other.get_type() > self.get_type():
-            return True
-        elif other.get_type() < self.get_type():
-            return False
-
-        # at this point hand types are equal, check multiple (single digit)
-        if other.get_multiple() > self.get_multiple():
-            return True
-        elif other.get_multiple() < self.get_multiple():
-            return False
-
-        # stop-gap: raise exception if the comparison functions would fail
-        # this ensures data integrity and is a good way to find problems in batch runs
-        if not self.check_rank_consistency(other):
-            return False
-
-        # at this point hand multiples are equal, check rank (list)
-        self_rank = self.get_rank()
-        other_rank = other.get_rank()
-
-        # find the first element that doesn't match
-        for rank_index in range(0, len(self_rank)):
-            if other_rank[rank_index] > self_rank[rank_index]:
-                # other > self
-                return True
-            elif other_rank[rank_index] < self_rank[rank_index]:
-                # self > other
-                return False
-            # otherwise, rank items are equal - continue loop
-
-        # Finally, return false - they are equal in all categories
-        # so self is not greater than other (but __eq__ operator should deliver True)
-        return False
+        return self.score < other.score
 
     def __eq__(self, other):
-        """== operator: Check type, multiple and rank separately for readability"""
-        if self.get_type() != other.get_type():
-            return False
-
-        if self.get_multiple() != other.get_multiple():
-            return False
-
-        if self.get_rank() != other.get_rank():
-            return False
-
-        return True
+        """== operator: hands are equal when type, multiple and rank all match"""
+        return self.score == other.score
 
     def __le__(self, other):
-        """<= operator: Check equality and __lt__ with inclusive or"""
-        return (self.__eq__(other) or self.__lt__(other))
+        """<= operator: compare packed scores"""
+        return self.score <= other.score
 
     def __ge__(self, other):
-        """>= operator: check equality and __gt__ with inclusive or"""
-        return (self.__eq__(other) or self.__gt__(other))
+        """>= operator: compare packed scores"""
+        return self.score >= other.score
 
     def __ne__(self, other):
-        """!= operator: convenience function - just return inverse of __eq__"""
-        return not (self.__eq__(other))
+        """!= operator: compare packed scores"""
+        return self.score != other.score
+
+    def __hash__(self):
+        """Hash: equal hands (by score) hash equally, consistent with __eq__"""
+        return hash(self.score)
 
     def check_rank_consistency(self, other):
         """Stop-gap in case comparison functions would not be able to compute rank"""
@@ -207,17 +182,46 @@ class Hand(object):
 
         return True
 
+    @property
+    def cards(self):
+        """Sorted list of Card objects in this hand, sorted on first use."""
+        if self._sorted_cards is None:
+            self.sort_cards()
+
+        return self._sorted_cards
+
     def clear(self):
         """Helper: Reset hand and return it to zero cards with no rank"""
-        self.cards = []
+        # Cards in the order they were added; cards property provides the sorted list
+        self._cards = []
+        self._sorted_cards = []
+        self.mask = 0
+
+        # Number of cards for each value (indexed 2-14) and suit (Card.SUIT_ORDER)
+        self.rank_counts = [0] * 15
+        self.suit_counts = [0] * len(card.Card.SUIT_ORDER)
+
         self.type = 0
         self.multiple = 0
         self.rank = [0]
+        self.score = 0
 
     def get_cards(self):
         """Accessor: get list of Card objects"""
         return self.cards
 
+    def get_mask(self):
+        """Accessor: get card bitmask property"""
+        return self.mask
+
+    def get_rank_counts(self):
+        """Accessor: get number of cards of each value, as a list indexed by value"""
+        return self.rank_counts
+
+    def get_suit_counts(self):
+        """Accessor: get number of cards of each suit, in Card.SUIT_ORDER order"""
+        return self.suit_counts
+
     def get_type(self):
         """Accessor: get type property"""
         return self.type
@@ -239,6 +243,10 @@ class Hand(object):
         """Accessor: return rank property"""
         return self.rank
 
+    def get_score(self):
+        """Accessor: return packed score property"""
+        return self.score
+
     def get_card_values(self):
         """Return values of cards in a list; list will be sorted"""
         card_values = []
@@ -252,14 +260,14 @@ class Hand(object):
         return set(self.get_card_values())
 
     def sort_cards(self):
-        """Sort cards in this hand. Occurs automatically on add_card()."""
+        """Sort cards in this hand. Occurs automatically when the cards are used."""
 
         # Using the object representation of Card, Python's built in sorted() function
         # will ensure the cards get sorted by value, then suit.
-        if not self.cards:
+        if not self._cards:
             return False
 
-        self.cards = sorted(self.cards, key=lambda test_card: test_card.value)
+        self._sorted_cards = sorted(self._cards, key=lambda test_card: test_card.value)
         return True
 
     def has_exact_card(self, card_obj):
@@ -267,15 +275,7 @@ class Hand(object):
         Returns a boolean specifying whether this hand already contains
         this exact card (value and suit).
         """
-
-        for test_card in self.cards:
-            if (
-                test_card.value == card_obj.get_value() and
-                test_card.suit == card_obj.get_suit()
-            ):
-                return True
-
-        return False
+        return (self.mask & card_obj.mask) != 0
 
     def add_card(self, card_obj):
         """
@@ -293,32 +293,127 @@ class Hand(object):
         if not isinstance(card_obj, card.Card):
             raise ValueError("Must provide Card object to Hand")
 
-        # Check if card is already in list and raise error if so
-        if self.has_exact_card(card_obj):
+        # Check if card is already in the hand and raise error if so
+        if self.mask & card_obj.mask:
             raise DuplicateCardError("Card already exists in this hand")
 
         # Check if the maximum number of cards has been reached
-        if len(self.cards) == self.MAXIMUM_CARDS:
+        if len(self._cards) == self.MAXIMUM_CARDS:
             raise MaximumCardError("Already have {0} cards in this hand".format(
                 self.MAXIMUM_CARDS))
 
-        self.cards.append(card_obj)
-        self.sort_cards()
+        self._cards.append(card_obj)
+        self.mask |= card_obj.mask
+        self.rank_counts[card_obj.value] += 1
+        self.suit_counts[card_obj.index & 3] += 1
+
+        # Sorted list is rebuilt the next time it is needed
+        self._sorted_cards = None
 
-        # If the maximum number of cards is reached now, determine hand type.
+        # If enough cards are present now, determine hand type.
         # This sets ranking and multiple as well.
-        if len(self.cards) == self.MAXIMUM_CARDS:
+        if len(self._cards) >= self.MINIMUM_CARDS:
+            self.get_hand_type()
+
+        return True
+
+    def add_cards(self, cards):
+        """
+        Add several Card objects to this hand, validating all of them in a single pass
+        before any are added. Throws the same exceptions as add_card(); if any card is
+        rejected, the hand is left unchanged. The hand is evaluated at most once.
+        """
+        mask = self.mask
+        for card_obj in cards:
+            if not isinstance(card_obj, card.Card):
+                raise ValueError("Must provide Card object to Hand")
+
+            if mask & card_obj.mask:
+                raise DuplicateCardError("Card already exists in this hand")
+            mask |= card_obj.mask
+
+        if len(self._cards) + len(cards) > self.MAXIMUM_CARDS:
+            raise MaximumCardError("Cannot have more than {0} cards in this hand".format(
+                self.MAXIMUM_CARDS))
+
+        for card_obj in cards:
+            self._cards.append(card_obj)
+            self.rank_counts[card_obj.value] += 1
+            self.suit_counts[card_obj.index & 3] += 1
+
+        self.mask = mask
+        self._sorted_cards = None
+
+        if cards and len(self._cards) >= self.MINIMUM_CARDS:
             self.get_hand_type()
 
         return True
 
     def get_hand_type(self):
+        """
+        Find the type of hand represented by this object, using the currently selected
+        evaluator. Sets the object's type, multiple and rank properties.
+        If enable_cache() has been called, results are remembered and reused.
+        """
+        if not len(self._cards) == self.MAXIMUM_CARDS:
+            raise MissingCardError("Must have exactly five cards in hand")
+
+        if _cache is not None:
+            return self._get_cached_hand_type()
+
+        return self._evaluate()
+
+    def _evaluate(self):
+        """Evaluate the hand with the currently selected evaluator."""
+        if self.evaluator == "lookup":
+            return self.get_hand_type_lookup()
+
+        return self.get_hand_type_check()
+
+    def _get_cached_hand_type(self):
+        """
+        Set type, multiple, rank and score from the shared EvaluationCache, evaluating
+        the hand and storing the result on a miss.
+        """
+        key = _cache.get_key(self._cards)
+        result = _cache.get(key)
+
+        if result is None:
+            self._evaluate()
+            _cache.put(key, (self.type, self.multiple, tuple(self.rank), self.score))
+            return self.type
+
+        (self.type, self.multiple, rank, self.score) = result
+        self.rank = list(rank)
+        return self.type
+
+    def get_hand_type_lookup(self):
+        """
+        Find the type of hand represented by this object with a single lookup into the
+        precomputed tables of the LookupEvaluator. Results are identical to
+        get_hand_type_check().
+        """
+        lookup = evaluator.get_lookup_evaluator()
+
+        # Insertion order is fine here; the key does not depend on card order
+        key = 1
+        for card_obj in self._cards:
+            key *= lookup.PRIMES[card_obj.value]
+
+        (self.type, self.multiple, rank, self.score) = lookup.evaluate_key(
+            key, max(self.suit_counts) == self.MAXIMUM_CARDS)
+
+        # Tables hold tuples; callers expect a list they are free to modify
+        self.rank = list(rank)
+
+        return self.type
+
+    def get_hand_type_check(self):
         """
         Find the type of hand represented by this object, using the check_() functions
         in descending order. Sets the object's type property to the highest hand type.
+        This is the reference implementation used to build the lookup tables.
         """
-        if not self.cards or not len(self.cards) == self.MAXIMUM_CARDS:
-            raise MissingCardError("Must have exactly five cards in hand")
 
         # Dynamically check hand types based on dictionary definitions
         for type_definitions in self.HAND_TYPES:
@@ -344,6 +439,7 @@ class Hand(object):
                 self.type = type_value
                 break
 
+        self.score = pack_score(self.type, self.multiple, self.rank)
         return self.type
 
     def set_rank_by_values(self):
@@ -593,3 +689,276 @@ class Hand(object):
         self.rank = card_values
 
         return True
+
+
+class SevenCardHand(Hand):
+    """
+    Defines a hand of five to seven Card objects, such as two hole cards and a five
+    card board in Texas Hold-Em. Type, multiple, rank and score are those of the best
+    five card hand that can be made from the cards, and are updated as each card from
+    the fifth onwards is added, so SevenCardHand objects compare with each other (and
+    with Hand objects) exactly like five card hands.
+
+    The check_() functions only apply to five card hands and are not used here.
+    """
+
+    MAXIMUM_CARDS = 7
+
+    def get_hand_type(self):
+        """
+        Find the type of the best five card hand in this object, using
+        LookupEvaluator.evaluate_best(). Sets the type, multiple, rank and score
+        properties, using the shared cache if enabled.
+        """
+        if len(self._cards) < self.MINIMUM_CARDS:
+            raise MissingCardError("Must have at least five cards in hand")
+
+        if _cache is not None:
+            return self._get_cached_hand_type()
+
+        return self._evaluate()
+
+    def _evaluate(self):
+        """Evaluate the best five card hand with the LookupEvaluator."""
+        (self.type, self.multiple, rank, self.score) = \
+            evaluator.get_lookup_evaluator().evaluate_best(self._cards)
+        self.rank = list(rank)
+
+        return self.type
+
+
+def pack_score(hand_type, multiple, rank):
+    """
+    Pack a hand type, multiple and rank list into a single integer. The type occupies
+    the highest bits, followed by the multiple, then each rank value in a nibble
+    (highest rank element first). Card values never exceed 14, so each fits in 4 bits.
+
+    Rank lists are the same length for any two hands of the same type, so comparing
+    two scores gives the same result as comparing type, multiple and rank in order.
+    """
+    score = (hand_type << 24) | (multiple << 20)
+    for rank_index in range(0, len(rank)):
+        score |= rank[rank_index] << (16 - 4 * rank_index)
+
+    return score
+
+
+def _get_tie_groups(ordered_indexes, hands):
+    """Split indexes of hands, strongest first, into groups of equal score."""
+    groups = []
+    previous_score = None
+    for hand_index in ordered_indexes:
+        if not groups or hands[hand_index].score != previous_score:
+            groups.append([])
+            previous_score = hands[hand_index].score
+        groups[-1].append(hand_index)
+
+    return groups
+
+
+def sort_hand_indexes(hands):
+    """
+    Order a list of evaluated Hand objects from strongest to weakest. Returns a list of
+    groups of indexes into hands; hands in the same group draw with each other and
+    keep their original order. Each hand's packed score is used as its sort key, so no
+    comparison operators are called.
+    """
+    return _get_tie_groups(
+        sorted(range(0, len(hands)), key=lambda hand_index: hands[hand_index].score,
+               reverse=True), hands)
+
+
+def sort_hands(hands):
+    """
+    Order a list of evaluated Hand objects from strongest to weakest. Returns a list of
+    groups of Hand objects, as sort_hand_indexes().
+    """
+    return [[hands[hand_index] for hand_index in group]
+            for group in sort_hand_indexes(hands)]
+
+
+def top_k(hands, k, include_ties=False):
+    """
+    Return the k strongest of a list of evaluated Hand objects, strongest first, as
+    groups of Hand objects that draw with each other (see sort_hands()). Uses a heap,
+    so only k hands are ever kept in order. Where hands tie for the last place, those
+    earliest in the list are kept unless include_ties is set, in which case every hand
+    drawing with the kth hand is included.
+    """
+    if k <= 0:
+        return []
+
+    def score(hand_index):
+        return hands[hand_index].score
+
+    top = heapq.nlargest(k, range(0, len(hands)), key=score)
+
+    if include_ties and top:
+        lowest_score = hands[top[-1]].score
+        kept = set(top)
+        top += [hand_index for hand_index in range(0, len(hands))
+                if hands[hand_index].score == lowest_score and hand_index not in kept]
+        top.sort(key=score, reverse=True)
+
+    return [[hands[hand_index] for hand_index in group]
+            for group in _get_tie_groups(top, hands)]
+
+
+def set_evaluator(evaluator_name):
+    """
+    Select the evaluator used by all Hand objects. The lookup evaluator is intended
+    for hot batch runs. Throws a ValueError if the evaluator is not defined.
+    """
+    if evaluator_name not in EVALUATORS:
+        raise ValueError("Unknown evaluator {0}; must be one of {1}".format(
+            evaluator_name, ", ".join(EVALUATORS)))
+
+    Hand.evaluator = evaluator_name
+    return True
+
+
+def enable_cache(maxsize=cache.DEFAULT_MAXSIZE, suit_isomorphism=False):
+    """
+    Remember evaluation results for all Hand objects in a shared EvaluationCache of up
+    to maxsize results, replacing any cache already enabled. Returns the cache, whose
+    counters show how effective it is.
+    """
+    global _cache
+
+    _cache = cache.EvaluationCache(maxsize, suit_isomorphism)
+    return _cache
+
+
+def disable_cache():
+    """Stop using the shared EvaluationCache and discard its results."""
+    global _cache
+
+    _cache = None
+    return True
+
+
+def get_cache():
+    """Return the shared EvaluationCache, or None if it is not enabled."""
+    return _cache
+
+
+# Arrays derived from the LookupEvaluator tables for evaluate_array(); built on first use
+_array_tables = None
+
+
+def _get_array_tables():
+    """
+    Return NumPy lookup arrays built from the LookupEvaluator tables:
+    flush_scores: score of a flush, indexed by its 13 bit mask of card values
+    distinct_scores: score of a non-flush hand of five distinct values, by value mask
+    paired_keys: sorted prime products of hands with repeated values
+    paired_scores: score for each of paired_keys
+    primes: prime for each value index (0 = 2, 12 = A)
+    """
+    global _array_tables
+
+    if _array_tables is not None:
+        return _array_tables
+
+    lookup = evaluator.get_lookup_evaluator()
+    values = sorted(lookup.PRIMES.keys())
+    primes = numpy.array([lookup.PRIMES[value] for value in values], dtype=numpy.int64)
+
+    flush_scores = numpy.zeros(1 << len(values), dtype=numpy.int64)
+    distinct_scores = numpy.zeros(1 << len(values), dtype=numpy.int64)
+    paired = []
+
+    for hand_values in itertools.combinations_with_replacement(
+            values, Hand.MAXIMUM_CARDS):
+        key = lookup.get_key(hand_values)
+        if key not in lookup.rank_table:
+            # five of a kind
+            continue
+
+        if len(set(hand_values)) < len(hand_values):
+            paired.append((key, lookup.rank_table[key][3]))
+            continue
+
+        value_mask = 0
+        for value in hand_values:
+            value_mask |= 1 << (value - 2)
+        flush_scores[value_mask] = lookup.flush_table[key][3]
+        distinct_scores[value_mask] = lookup.rank_table[key][3]
+
+    paired.sort()
+    _array_tables = {
+        "flush_scores": flush_scores,
+        "distinct_scores": distinct_scores,
+        "paired_keys": numpy.array([key for (key, score) in paired], dtype=numpy.int64),
+        "paired_scores": numpy.array([score for (key, score) in paired],
+                                     dtype=numpy.int64),
+        "primes": primes,
+    }
+    return _array_tables
+
+
+def evaluate_array(card_indices):
+    """
+    Evaluate many five card hands at once with vectorized NumPy operations.
+
+    card_indices is an (N, 5) integer array of Card.index values (0-51), one row per
+    hand. Returns a tuple of three length N arrays: type (uint8), multiple (uint8) and
+    rank packed into nibbles as in pack_score() (uint32). Results are identical to
+    Hand.get_hand_type(), so that pack_score(type, multiple, []) | rank == score.
+
+    Throws an ImportError if NumPy is not installed, a ValueError for a badly shaped
+    array or card index out of range, and a DuplicateCardError if a card repeats
+    within a hand.
+    """
+    if numpy is None:
+        raise ImportError("NumPy is required for evaluate_array()")
+
+    card_indices = numpy.asarray(card_indices)
+    if card_indices.ndim != 2 or card_indices.shape[1] != Hand.MAXIMUM_CARDS:
+        raise ValueError("Expected an (N, 5) array of card indices")
+
+    hand_count = card_indices.shape[0]
+    if not hand_count:
+        return (numpy.zeros(0, dtype=numpy.uint8), numpy.zeros(0, dtype=numpy.uint8),
+                numpy.zeros(0, dtype=numpy.uint32))
+
+    if card_indices.min() < 0 or card_indices.max() > 51:
+        raise ValueError("Card indices must be between 0 and 51")
+
+    card_indices = card_indices.astype(numpy.int64)
+    if numpy.any(numpy.diff(numpy.sort(card_indices, axis=1), axis=1) == 0):
+        raise DuplicateCardError("Card already exists in this hand")
+
+    tables = _get_array_tables()
+
+    # Value index 0-12 (2-A) and suit index 0-3 of every card
+    values = card_indices >> 2
+    suits = card_indices & 3
+
+    # Rank histogram: number of cards of each value in each hand
+    rank_counts = numpy.bincount(
+        (values + 13 * numpy.arange(hand_count)[:, numpy.newaxis]).ravel(),
+        minlength=13 * hand_count).reshape(hand_count, 13)
+
+    # Flush: every suit equal to the suit of the first card
+    flush = numpy.all(suits == suits[:, :1], axis=1)
+
+    # Bitmask of values present; straights and high cards are resolved by mask
+    value_masks = numpy.dot(rank_counts > 0, 1 << numpy.arange(13, dtype=numpy.int64))
+    distinct = rank_counts.max(axis=1) == 1
+
+    # Hands with repeated values are resolved by prime product
+    keys = tables["primes"][values].prod(axis=1)
+    paired_positions = numpy.searchsorted(tables["paired_keys"], keys)
+    paired_positions = numpy.minimum(paired_positions, len(tables["paired_keys"]) - 1)
+
+    scores = numpy.where(
+        flush, tables["flush_scores"][value_masks],
+        numpy.where(distinct, tables["distinct_scores"][value_masks],
+                    tables["paired_scores"][paired_positions]))
+
+    return (
+        (scores >> 24).astype(numpy.uint8),
+        ((scores >> 20) & 0xF).astype(numpy.uint8),
+        (scores & 0xFFFFF).astype(numpy.uint32),
+    )
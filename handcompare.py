@@ -30,6 +30,49 @@ class InvalidHandError(Exception):
     """Exception thrown when a hand is inconsistent."""
     pass
 
+
+class SharedCardError(InvalidHandError):
+    """
+    Exception thrown when the same card appears in more than one hand (or in the board
+    or dead cards). shared_cards maps each such Card to the names of the hands, board
+    or dead cards containing it.
+    """
+    def __init__(self, message, shared_cards=None):
+        InvalidHandError.__init__(self, message)
+        self.shared_cards = shared_cards or {}
+
+# Record class for the streaming pipeline
+
+
+class PipelineRecord(object):
+    """
+    One record (input line) passing through the HandCompare.iter_*() pipeline.
+
+    line_number: line number of the record in the input, starting from 1
+    hands: list of Hand objects parsed from the line
+    scores: packed score of each hand, set by iter_evaluate()
+    result: HAND1_WINS, HAND2_WINS or HANDS_DRAW, set by iter_compare()
+    error: the exception raised while processing this record, or None; records with
+           an error are passed through the remaining stages untouched
+    """
+    __slots__ = ("line_number", "hands", "scores", "result", "error")
+
+    def __init__(self, line_number, hands=None, error=None):
+        """Constructor: a record with no scores or result yet."""
+        self.line_number = line_number
+        self.hands = hands or []
+        self.scores = None
+        self.result = None
+        self.error = error
+
+    def __repr__(self):
+        """Representation: line number and either the result or error"""
+        if self.error is not None:
+            return "PipelineRecord({0}, error={1!r})".format(self.line_number, self.error)
+
+        return "PipelineRecord({0}, result={1})".format(self.line_number, self.result)
+
+
 # HandCompare main class
 
 
@@ -44,6 +87,10 @@ class HandCompare(object):
     # Define verbose output string for verbosity testing.
     verbose_output = ""
 
+    # Evaluator for hands parsed by this object (see hand.EVALUATORS); None uses the
+    # evaluator selected with hand.set_evaluator().
+    evaluator = None
+
     def check_argcount(self, system_args):
         """
         Checks the number of arguments passed on the command line.
@@ -61,6 +108,15 @@ class HandCompare(object):
         """
         Given a string, parses a card and returns a Card objects.
         """
+        # Fast path: one lookup in the table of valid card strings (card.from_token
+        # also accepts lowercase, padded and "T" variants)
+        try:
+            return card.from_token(card_string)
+        except card.InvalidCardError:
+            pass
+
+        # Otherwise parse the string piece by piece for a detailed error
+
         # check if string is None
         if not card_string or not card_string.strip():
             raise card.InvalidCardError("Specified card was None or empty")
@@ -86,44 +142,162 @@ class HandCompare(object):
         """
         Given a string, uses parse_card_string to turn that string into Card objects,
         and then assembles a Hand object from those cards. Can throw an InvalidHandError
-        when the hand_string does not parse properly.
+        when the hand_string does not parse properly, an InvalidCardError for an invalid
+        card or a DuplicateCardError when the same card appears twice.
         """
 
         if not hand_string or not hand_string.strip():
             raise InvalidHandError("Specified hand was None or empty")
 
-        if hand_string.count(",") != (self.CARDS_IN_HAND - 1):
-            raise InvalidHandError("Hand did not contain correct number of comma-separated cards; original hand: {0}".format(hand_string))
-
-        # Split hand; our count precondition ensures the result list has enough elements
+        # Split hand once; the number of pieces gives the number of cards
         split_cards = hand_string.split(",")
+        if len(split_cards) != self.CARDS_IN_HAND:
+            raise InvalidHandError("Hand did not contain correct number of comma-separated cards; original hand: {0}".format(hand_string))
 
-        # create Hand object and populate it with cards; this will throw exceptions
-        # on any invalid conditions (duplicate cards, etc)
-        create_hand = hand.Hand()
+        # Parse every card; valid card strings need only one table lookup
+        cards = []
         for card_string in split_cards:
-            create_hand.add_card(self.parse_card_string(card_string))
+            try:
+                cards.append(card.CARD_TOKENS[card_string])
+            except KeyError:
+                cards.append(self.parse_card_string(card_string))
+
+        # create Hand object and populate it; add_cards() rejects duplicate cards
+        create_hand = hand.Hand(self.evaluator)
+        create_hand.add_cards(cards)
 
         return create_hand
 
+    def iter_parse_hands(self, lines, hands_per_line=2, sanity=True):
+        """
+        Generator: parse an iterable of lines, each holding hands_per_line hand strings
+        separated by whitespace, and yield a PipelineRecord per non-blank line.
+
+        Nothing is read ahead, so memory use does not depend on the size of the input.
+        Invalid lines (wrong number of hands, invalid or duplicate cards, or cards
+        shared between hands when sanity is set) yield a record with its error set
+        rather than stopping the stream.
+        """
+        line_number = 0
+        for line in lines:
+            line_number += 1
+            hand_strings = line.split()
+            if not hand_strings:
+                continue
+
+            try:
+                if len(hand_strings) != hands_per_line:
+                    raise InvalidHandError("Expected {0} hands, found {1}".format(
+                        hands_per_line, len(hand_strings)))
+
+                hands = [self.parse_hand_string(hand_string)
+                         for hand_string in hand_strings]
+                if sanity:
+                    self.deck_sanity(hands)
+            except (InvalidHandError, card.InvalidCardError,
+                    hand.DuplicateCardError) as e:
+                yield PipelineRecord(line_number, error=e)
+                continue
+
+            yield PipelineRecord(line_number, hands)
+
+    def iter_evaluate(self, records):
+        """
+        Generator: set the scores of every hand in each PipelineRecord, evaluating
+        hands that have not been evaluated yet, and yield the records.
+        """
+        for record in records:
+            if record.error is None:
+                try:
+                    for hand_obj in record.hands:
+                        if not hand_obj.get_score():
+                            hand_obj.get_hand_type()
+                except hand.MissingCardError as e:
+                    record.error = e
+                else:
+                    record.scores = [hand_obj.get_score() for hand_obj in record.hands]
+
+            yield record
+
+    def iter_compare(self, records):
+        """
+        Generator: compare the two evaluated hands of each PipelineRecord, setting its
+        result to HAND1_WINS, HAND2_WINS or HANDS_DRAW, and yield the records.
+        """
+        for record in records:
+            if record.error is None:
+                if len(record.scores) != 2:
+                    record.error = InvalidHandError("Expected 2 hands, found {0}".format(
+                        len(record.scores)))
+                elif record.scores[0] > record.scores[1]:
+                    record.result = HAND1_WINS
+                elif record.scores[1] > record.scores[0]:
+                    record.result = HAND2_WINS
+                else:
+                    record.result = HANDS_DRAW
+
+            yield record
+
     def hand_sanity(self, hand1, hand2):
         """
         Perform a sanity test given two Hand objects - that they do not contain the
         same cards. The Hand object itself ensures the same card does not appear twice,
         but this optional function enforces a "52-card deck" constraint.
         """
+        return self.deck_sanity([hand1, hand2])
 
-        h1_cards = hand1.get_cards()
-        h2_cards = hand2.get_cards()
-
-        # use defined __eq__ method to check card equality
-        for card in h1_cards:
-            for comp_card in h2_cards:
-                if card == comp_card:
-                    raise InvalidHandError(
-                        "Same card ({0}) exists in both hands".format(card))
-
-        return True
+    def deck_sanity(self, hands, board=None, dead=None):
+        """
+        Check that no card appears more than once across any number of Hand objects,
+        a board and dead cards (each a list of Card objects or a Hand), as if every card
+        had been dealt from a single 52-card deck.
+
+        Each hand is reduced to its card bitmask, and the masks are combined in one
+        pass: any bit set in both a mask and the union of the masks before it is a
+        shared card. Throws a SharedCardError naming every shared card and where it
+        appears; returns True otherwise.
+        """
+        groups = [("hand {0}".format(hand_index + 1), hands[hand_index])
+                  for hand_index in range(0, len(hands))]
+        if board:
+            groups.append(("board", board))
+        if dead:
+            groups.append(("dead cards", dead))
+
+        masks = []
+        seen = 0
+        shared = 0
+        for (group_name, cards) in groups:
+            if isinstance(cards, hand.Hand):
+                mask = cards.get_mask()
+            else:
+                # Lists of cards may repeat a card themselves
+                mask = 0
+                for card_obj in cards:
+                    shared |= mask & card_obj.mask
+                    mask |= card_obj.mask
+
+            shared |= seen & mask
+            seen |= mask
+            masks.append(mask)
+
+        if not shared:
+            return True
+
+        # Only on failure: find every shared card and the groups containing it
+        shared_cards = {}
+        descriptions = []
+        for card_index in range(0, 52):
+            card_obj = card.from_index(card_index)
+            if shared & card_obj.mask:
+                shared_cards[card_obj] = [
+                    groups[group_index][0] for group_index in range(0, len(groups))
+                    if masks[group_index] & card_obj.mask]
+                descriptions.append("{0} ({1})".format(
+                    card.to_token(card_obj), ", ".join(shared_cards[card_obj])))
+
+        raise SharedCardError("Same card found more than once: {0}".format(
+            ", ".join(descriptions)), shared_cards)
 
     def main(self):
         """
@@ -134,6 +308,12 @@ class HandCompare(object):
         # Verbosity; use integer in case multiple levels needed later (--debug, etc).
         verbosity = 0
 
+        if "--batch" in sys.argv:
+            return self.main_batch()
+
+        if "--showdown" in sys.argv:
+            return self.main_showdown()
+
         # Check argument count passed on command line
         try:
             self.check_argcount(sys.argv)
@@ -167,18 +347,187 @@ class HandCompare(object):
             verbosity = 1
 
         # Compare hands and print output
-        if hand1 > hand2:
+        result = self.compare_hands(hand1, hand2)
+        if result == HAND1_WINS:
             print "Hand 1 is the winning hand"
-            self.verbose_hand_details(verbosity, hand1, hand2)
-            return HAND1_WINS
-        elif hand2 > hand1:
+        elif result == HAND2_WINS:
             print "Hand 2 is the winning hand"
-            self.verbose_hand_details(verbosity, hand1, hand2)
-            return HAND2_WINS
         else:
             print "Hand 1 and 2 draw"
-            self.verbose_hand_details(verbosity, hand1, hand2)
-            return HANDS_DRAW
+
+        self.verbose_hand_details(verbosity, hand1, hand2)
+        return result
+
+    def main_batch(self):
+        """
+        Entry point for --batch mode. Reads hand pairs from the file named on the
+        command line (before or after any options), or from stdin if no file (or "-")
+        is given. Exits with a usage message if more than one file is given.
+        """
+        verbosity = 0
+        if "--verbose" in sys.argv:
+            verbosity = 1
+
+        # Every argument other than an option names the input file
+        input_paths = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+        if len(input_paths) > 1:
+            print "Error: --batch accepts at most one input file."
+            self.usage()
+
+        input_path = "-"
+        if input_paths:
+            input_path = input_paths[0]
+
+        if input_path == "-":
+            return self.batch(sys.stdin, sys.stdout, verbosity,
+                              not "--no-sanity" in sys.argv)
+
+        try:
+            input_file = open(input_path)
+        except IOError:
+            print "Error: Could not open batch file {0}.".format(input_path)
+            self.usage()
+
+        try:
+            return self.batch(input_file, sys.stdout, verbosity,
+                              not "--no-sanity" in sys.argv)
+        finally:
+            input_file.close()
+
+    def main_showdown(self):
+        """
+        Entry point for --showdown mode. Compares every hand given on the command line
+        and outputs the winning hand(s); with --verbose, the full ordering of hands.
+        """
+        hand_strings = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+        if len(hand_strings) < 2:
+            print "Error: Missing argument; please specify at least two hands."
+            self.usage()
+
+        try:
+            hands = [self.parse_hand_string(hand_string) for hand_string in hand_strings]
+        except (InvalidHandError, card.InvalidCardError):
+            print "Error: One or more hands was invalid."
+            self.usage()
+        except hand.DuplicateCardError:
+            print "Error: The same card was specified more than once in a hand."
+            self.usage()
+
+        if not "--no-sanity" in sys.argv:
+            try:
+                self.deck_sanity(hands)
+            except SharedCardError as e:
+                print ("Error: Duplicate cards found across hands ({0}). To disable, "
+                       "use the --no-sanity option.".format(e))
+                self.usage()
+
+        result = self.showdown(hands)
+
+        # Hands are numbered from 1 on output
+        winners = [str(hand_index + 1) for hand_index in result["winners"]]
+        if len(winners) == 1:
+            print "Hand {0} is the winning hand".format(winners[0])
+        else:
+            print "Hands {0} draw".format(", ".join(winners))
+
+        if "--verbose" in sys.argv:
+            self.verbose_output = ""
+            for place in range(0, len(result["ordering"])):
+                for hand_index in result["ordering"][place]:
+                    self.verbose_output += "{0}. Hand {1}: {2}\n".format(
+                        place + 1, hand_index + 1, self.describe_hand(hands[hand_index]))
+            print self.verbose_output
+
+        return result
+
+    def showdown(self, hands):
+        """
+        Compare any number of Hand objects at once. Returns a dict containing:
+        winners: list of indexes (into hands) of the winning hand(s)
+        ordering: list of groups of indexes, strongest group first; hands in the same
+                  group draw with each other, and keep their original order
+        ties: the groups in ordering that contain more than one hand
+
+        The packed score orders hands by type, then multiple, then ranks, so one sort
+        on it gives the full ordering, and the winners are its first group.
+        Throws an InvalidHandError if no hands are given.
+        """
+        if not hands:
+            raise InvalidHandError("Showdown requires at least one hand")
+
+        # Stable sort on the packed score, then group equal scores
+        ordering = hand.sort_hand_indexes(hands)
+
+        return {
+            "winners": ordering[0],
+            "ordering": ordering,
+            "ties": [group for group in ordering if len(group) > 1],
+        }
+
+    def compare_hands(self, hand1, hand2):
+        """Compare two Hand objects and return HAND1_WINS, HAND2_WINS or HANDS_DRAW."""
+        if hand1 > hand2:
+            return HAND1_WINS
+        elif hand2 > hand1:
+            return HAND2_WINS
+
+        return HANDS_DRAW
+
+    def batch(self, input_file, output_file, verbosity=0, sanity=True):
+        """
+        Compare many pairs of hands in one process. Each non-blank line of input_file
+        holds two hand strings separated by whitespace; one result line is written to
+        output_file per pair, containing the HAND1_WINS/HAND2_WINS/HANDS_DRAW code and,
+        if verbosity is set, tab separated details on each hand.
+
+        Lines that cannot be parsed produce a result code of 1 (as for usage errors)
+        and a message on stderr, so output lines always correspond to input lines.
+        Lines are read one at a time and each result is flushed as soon as it is
+        written, so a caller feeding a pipe gets every answer straight away.
+        Returns a dict of result code to number of occurrences.
+        """
+        totals = {HAND1_WINS: 0, HAND2_WINS: 0, HANDS_DRAW: 0, 1: 0}
+
+        # Hot loop: use the lookup evaluator, restoring the previous choice afterwards
+        previous_evaluator = hand.Hand.evaluator
+        hand.set_evaluator("lookup")
+
+        try:
+            # Iterating a file reads ahead in blocks, which would stall a coprocess
+            lines = iter(input_file.readline, "")
+            records = self.iter_compare(self.iter_evaluate(
+                self.iter_parse_hands(lines, sanity=sanity)))
+
+            for record in records:
+                if record.error is not None:
+                    sys.stderr.write("Error on line {0}: {1}\n".format(
+                        record.line_number, record.error))
+                    output_file.write("1\n")
+                    output_file.flush()
+                    totals[1] += 1
+                    continue
+
+                totals[record.result] += 1
+
+                if verbosity == 0:
+                    output_file.write("{0}\n".format(record.result))
+                else:
+                    output_file.write("{0}\t{1}\t{2}\n".format(
+                        record.result, self.describe_hand(record.hands[0]),
+                        self.describe_hand(record.hands[1])))
+                output_file.flush()
+        finally:
+            hand.set_evaluator(previous_evaluator)
+
+        return totals
+
+    def describe_hand(self, hand_obj):
+        """Return a readable summary of the type, multiple and rank of a Hand."""
+        return "{0}, multiple {1}, rank {2}".format(
+            hand_obj.get_type_text().replace("_", " ").title(),
+            hand_obj.get_multiple(),
+            hand_obj.get_rank()
+        )
 
     def verbose_hand_details(self, verbosity, hand1, hand2):
         """Print verbose information about contents (types) of hands."""
@@ -189,17 +538,8 @@ class HandCompare(object):
         # won in this context, just the attributes that caused a win. Also, replace
         # underscores with spaces and title case for readability.
 
-        self.verbose_output = "Hand 1: {0}, multiple {1}, rank {2}\n".format(
-            hand1.get_type_text().replace("_", " ").title(),
-            hand1.get_multiple(),
-            hand1.get_rank()
-        )
-
-        self.verbose_output += "Hand 2: {0}, multiple {1}, rank {2}\n\n".format(
-            hand2.get_type_text().replace("_", " ").title(),
-            hand2.get_multiple(),
-            hand2.get_rank()
-        )
+        self.verbose_output = "Hand 1: {0}\n".format(self.describe_hand(hand1))
+        self.verbose_output += "Hand 2: {0}\n\n".format(self.describe_hand(hand2))
 
         print self.verbose_output
 
@@ -212,6 +552,8 @@ class HandCompare(object):
         print """
 Usage:
 {0} [hand1] [hand2] <options>
+{0} --batch [file] <options>
+{0} --showdown [hand1] [hand2] ... [handN] <options>
 
 Current options include:
 
@@ -224,6 +566,14 @@ Current options include:
 
 --verbose       Output details on hand comparison, including attributes,
                 multiple and type for each of the hands.
+
+--batch [file]  Compare many pairs of hands in one process. Each line of the
+                file (or stdin if no file is given) holds two hands separated
+                by whitespace. One result code is written per line: 2 (hand 1
+                wins), 3 (hand 2 wins), 4 (draw) or 1 (invalid line).
+
+--showdown      Compare any number of hands and output the winning hand(s).
+                With --verbose, every hand is listed in finishing order.
         """.format(sys.argv[0])
 
         sys.exit(1)
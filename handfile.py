@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+
+"""
+handfile
+
+Compact binary storage for hand records, converted once from the comma separated
+text format so archives do not have to be re-parsed on every run.
+
+File layout (little endian):
+    header: magic "HCRD", format version (uint16), cards per record (uint16),
+            number of records (uint64)
+    records: one byte per card (Card.index, 0-51), cards_per_record bytes each
+
+A record holds every card from one line of text: for example, a "hand1 hand2" line
+becomes a 10 byte record.
+"""
+
+import os
+import mmap
+import struct
+import sys
+
+import card
+import hand
+
+try:
+    import numpy
+except ImportError:
+    # NumPy is optional and only required by HandFileReader.as_array()
+    numpy = None
+
+MAGIC = "HCRD"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQ")
+
+
+class InvalidHandFileError(Exception):
+    """Thrown when a hand file or its input cannot be read or written properly."""
+    pass
+
+
+class HandFileWriter(object):
+    """
+    Writes fixed size records of cards to a binary hand file. The record count in the
+    header is filled in when the writer is closed.
+    """
+
+    def __init__(self, path, cards_per_record):
+        """Constructor: create the file and write a provisional header."""
+        if cards_per_record < 1:
+            raise InvalidHandFileError("Records must contain at least one card")
+
+        self.cards_per_record = cards_per_record
+        self.record_count = 0
+        self.output_file = open(path, "wb")
+        self.output_file.write(HEADER.pack(MAGIC, VERSION, cards_per_record, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write_record(self, cards):
+        """Append one record, given as a list of Card objects."""
+        if len(cards) != self.cards_per_record:
+            raise InvalidHandFileError("Expected {0} cards in record, found {1}".format(
+                self.cards_per_record, len(cards)))
+
+        self.output_file.write(bytearray(card_obj.index for card_obj in cards))
+        self.record_count += 1
+
+    def close(self):
+        """Write the final record count to the header and close the file."""
+        if self.output_file.closed:
+            return
+
+        self.output_file.seek(0)
+        self.output_file.write(HEADER.pack(
+            MAGIC, VERSION, self.cards_per_record, self.record_count))
+        self.output_file.close()
+
+
+class HandFileReader(object):
+    """
+    Reads a binary hand file through a read-only memory map, so records are only
+    paged in as they are used and NumPy views share the mapped memory.
+    """
+
+    def __init__(self, path):
+        """Constructor: map the file and validate its header."""
+        self.input_file = open(path, "rb")
+        try:
+            self.map = mmap.mmap(self.input_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, mmap.error):
+            self.input_file.close()
+            raise InvalidHandFileError("Hand file {0} is empty".format(path))
+
+        if len(self.map) < HEADER.size:
+            self.close()
+            raise InvalidHandFileError("Hand file {0} has no header".format(path))
+
+        (magic, version, self.cards_per_record, self.record_count) = \
+            HEADER.unpack_from(self.map, 0)
+
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise InvalidHandFileError("{0} is not a version {1} hand file".format(
+                path, VERSION))
+
+        if len(self.map) < HEADER.size + self.record_count * self.cards_per_record:
+            self.close()
+            raise InvalidHandFileError("Hand file {0} is truncated".format(path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        """Number of records in the file."""
+        return self.record_count
+
+    def close(self):
+        """Unmap and close the file."""
+        self.map.close()
+        self.input_file.close()
+
+    def get_record(self, record_index):
+        """Return the card indices of one record as a bytearray."""
+        if record_index < 0 or record_index >= self.record_count:
+            raise IndexError("Record {0} out of range".format(record_index))
+
+        offset = HEADER.size + record_index * self.cards_per_record
+        return bytearray(self.map[offset:offset + self.cards_per_record])
+
+    def iter_records(self):
+        """Yield the card indices of every record, as bytearrays, in file order."""
+        for record_index in xrange(0, self.record_count):
+            yield self.get_record(record_index)
+
+    def iter_hands(self, hand_size=hand.Hand.MAXIMUM_CARDS):
+        """
+        Yield a list of Hand objects for every record, splitting each record into
+        hands of hand_size cards (a SevenCardHand is used for more than five cards).
+        Throws an InvalidHandFileError for a record holding a byte that is not a card.
+        """
+        hand_class = hand.Hand
+        if hand_size > hand.Hand.MAXIMUM_CARDS:
+            hand_class = hand.SevenCardHand
+
+        if self.cards_per_record % hand_size:
+            raise InvalidHandFileError("Records of {0} cards cannot be split into "
+                                       "hands of {1}".format(self.cards_per_record,
+                                                             hand_size))
+
+        for (record_index, record) in enumerate(self.iter_records()):
+            if max(record) > 51:
+                raise InvalidHandFileError("Record {0} holds invalid card index "
+                                           "{1}".format(record_index, max(record)))
+
+            hands = []
+            for start in range(0, len(record), hand_size):
+                record_hand = hand_class()
+                record_hand.add_cards([card.from_index(card_index)
+                                       for card_index in record[start:start + hand_size]])
+                hands.append(record_hand)
+            yield hands
+
+    def as_array(self):
+        """
+        Return every record as a read-only (records, cards per record) uint8 NumPy
+        array of card indices. The array is a view of the mapped file, not a copy, and
+        must not be used after the reader is closed.
+        """
+        if numpy is None:
+            raise ImportError("NumPy is required for HandFileReader.as_array()")
+
+        return numpy.frombuffer(
+            self.map, dtype=numpy.uint8,
+            count=self.record_count * self.cards_per_record,
+            offset=HEADER.size).reshape(self.record_count, self.cards_per_record)
+
+
+def convert_text(input_file, path):
+    """
+    Convert text hand records to a binary hand file. Every non-blank line of
+    input_file holds one or more comma separated hands separated by whitespace (for
+    example, the input format of handcompare.py --batch) and must contain the same
+    number of cards as the first line, with no card repeated within a hand. Returns
+    the number of records written.
+
+    If the input cannot be converted, no partly written output file is left behind.
+    """
+    writer = None
+    try:
+        line_number = 0
+        for line in input_file:
+            line_number += 1
+            if not line.strip():
+                continue
+
+            cards = []
+            try:
+                for hand_string in line.split():
+                    hand_cards = [card.from_token(card_string)
+                                  for card_string in hand_string.split(",")]
+                    if len(set(hand_cards)) != len(hand_cards):
+                        raise InvalidHandFileError("Line {0}: Hand {1} repeats a "
+                                                   "card".format(line_number,
+                                                                 hand_string))
+                    cards.extend(hand_cards)
+            except card.InvalidCardError as e:
+                raise InvalidHandFileError("Line {0}: {1}".format(line_number, e))
+
+            if writer is None:
+                writer = HandFileWriter(path, len(cards))
+
+            try:
+                writer.write_record(cards)
+            except InvalidHandFileError as e:
+                raise InvalidHandFileError("Line {0}: {1}".format(line_number, e))
+
+        if writer is None:
+            raise InvalidHandFileError("No hands found to convert")
+    except BaseException:
+        if writer is not None:
+            # Remove the partial file rather than give it a valid header
+            writer.output_file.close()
+            os.remove(path)
+        raise
+
+    writer.close()
+    return writer.record_count
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print "Usage: {0} [text input file] [binary output file]".format(sys.argv[0])
+        sys.exit(1)
+
+    with open(sys.argv[1]) as text_file:
+        print "Wrote {0} records".format(convert_text(text_file, sys.argv[2]))
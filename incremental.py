@@ -0,0 +1,253 @@
+"""
+This script is not directly executable and forms part of the objects for
+the handcompare application.
+"""
+
+# IncrementalEvaluator: Tracks the best hand class as cards are dealt and removed.
+
+import card
+import hand
+import evaluator
+
+# Hand type values by name, for example TYPES["flush"] == 5, and names by value
+TYPES = dict(hand.Hand.HAND_TYPES)
+TYPE_NAMES = dict((type_value, type_name) for (type_name, type_value) in TYPES.items())
+
+# Most cards held at once: two hole cards and a five card board
+MAXIMUM_CARDS = hand.SevenCardHand.MAXIMUM_CARDS
+
+# Number of distinct card values; bit (value - 2) of a value mask is set for each
+VALUE_COUNT = 13
+
+# Values of the ace low straight (A,2,3,4,5) as a value mask
+WHEEL_MASK = (1 << 12) | 0xf
+
+# Highest straight value for every value mask (0 if none); built on first use
+_straight_table = None
+
+
+class CardNotFoundError(Exception):
+    """Thrown when removing a card that is not held by an IncrementalEvaluator."""
+    pass
+
+
+def _get_straight_table():
+    """Return the list of highest straight values, indexed by value mask."""
+    global _straight_table
+
+    if _straight_table is None:
+        table = [0] * (1 << VALUE_COUNT)
+        for value_mask in range(0, 1 << VALUE_COUNT):
+            for high_value in range(14, 5, -1):
+                straight_mask = 0x1f << (high_value - 6)
+                if value_mask & straight_mask == straight_mask:
+                    table[value_mask] = high_value
+                    break
+            else:
+                if value_mask & WHEEL_MASK == WHEEL_MASK:
+                    table[value_mask] = 5
+
+        _straight_table = table
+
+    return _straight_table
+
+
+class IncrementalEvaluator(object):
+    """
+    Holds up to seven cards and keeps the counts needed to classify them up to date as
+    each card is added or removed, so the best hand type is known after every street
+    without building Hand objects:
+    * rank_counts: number of cards of each value (indexed 2-14)
+    * count_counts: number of values held 0, 1, 2, 3 and 4 times
+    * suit_counts: number of cards of each suit, in Card.SUIT_ORDER order
+    * value_mask and suit_value_masks: values held overall and in each suit, which
+      resolve straights and straight flushes with one table lookup
+
+    get_type() uses only these counts, so it works for any number of cards: with fewer
+    than five cards it gives the class made so far (a pair, two pair, three or four of
+    a kind, or high card). evaluate() returns the full result of the best five card
+    hand once there are at least five cards.
+    """
+
+    def __init__(self, cards=None):
+        """Constructor: start with no cards, then add any cards given."""
+        self.clear()
+        if cards:
+            self.add_cards(cards)
+
+    def clear(self):
+        """Helper: remove every card"""
+        self.mask = 0
+        self.card_indices = []
+
+        self.rank_counts = [0] * 15
+        self.count_counts = [VALUE_COUNT, 0, 0, 0, 0]
+        self.suit_counts = [0] * len(card.Card.SUIT_ORDER)
+
+        self.value_mask = 0
+        self.suit_value_masks = [0] * len(card.Card.SUIT_ORDER)
+
+    def get_mask(self):
+        """Accessor: get bitmask of every card held (see Card.mask)"""
+        return self.mask
+
+    def get_cards(self):
+        """Accessor: get list of Card objects held, in the order they were added"""
+        return [card.from_index(card_index) for card_index in self.card_indices]
+
+    def add_card(self, card_obj):
+        """
+        Add a Card object. Throws a DuplicateCardError if the card is already held, or
+        a MaximumCardError if seven cards are already held.
+        """
+        if self.mask & card_obj.mask:
+            raise hand.DuplicateCardError("Card already exists in this hand")
+
+        if len(self.card_indices) == MAXIMUM_CARDS:
+            raise hand.MaximumCardError("Already have {0} cards in this hand".format(
+                MAXIMUM_CARDS))
+
+        self.add_index(card_obj.index)
+        return True
+
+    def add_cards(self, cards):
+        """Add several Card objects, in order; see add_card()."""
+        for card_obj in cards:
+            self.add_card(card_obj)
+
+        return True
+
+    def remove_card(self, card_obj):
+        """Remove a Card object. Throws a CardNotFoundError if the card is not held."""
+        if not self.mask & card_obj.mask:
+            raise CardNotFoundError("Card {0} is not in this hand".format(
+                card.to_token(card_obj)))
+
+        self.remove_index(card_obj.index)
+        return True
+
+    def add_index(self, card_index):
+        """Add a card by index (see Card.index) without validating it."""
+        value = (card_index >> 2) + 2
+        suit = card_index & 3
+
+        self.mask |= 1 << card_index
+        self.card_indices.append(card_index)
+
+        count = self.rank_counts[value]
+        self.rank_counts[value] = count + 1
+        self.count_counts[count] -= 1
+        self.count_counts[count + 1] += 1
+
+        self.suit_counts[suit] += 1
+        self.value_mask |= 1 << (value - 2)
+        self.suit_value_masks[suit] |= 1 << (value - 2)
+
+    def remove_index(self, card_index):
+        """Remove a held card by index (see Card.index) without validating it."""
+        value = (card_index >> 2) + 2
+        suit = card_index & 3
+
+        self.mask &= ~(1 << card_index)
+        self.card_indices.remove(card_index)
+
+        count = self.rank_counts[value]
+        self.rank_counts[value] = count - 1
+        self.count_counts[count] -= 1
+        self.count_counts[count - 1] += 1
+
+        self.suit_counts[suit] -= 1
+        if count == 1:
+            self.value_mask &= ~(1 << (value - 2))
+        self.suit_value_masks[suit] &= ~(1 << (value - 2))
+
+    def get_type(self):
+        """
+        Return the type (see Hand.HAND_TYPES) of the best hand that can be made from the
+        cards held so far, from the counts alone.
+        """
+        straights = _straight_table or _get_straight_table()
+        count_counts = self.count_counts
+
+        # Seven cards hold at most one suit five or more times
+        flush = max(self.suit_counts) >= hand.Hand.MAXIMUM_CARDS
+        if flush:
+            suit = self.suit_counts.index(max(self.suit_counts))
+            if straights[self.suit_value_masks[suit]]:
+                return TYPES["straight_flush"]
+
+        if count_counts[4]:
+            return TYPES["four_of_a_kind"]
+
+        if count_counts[3] and (count_counts[3] > 1 or count_counts[2]):
+            return TYPES["full_house"]
+
+        if flush:
+            return TYPES["flush"]
+
+        if straights[self.value_mask]:
+            return TYPES["straight"]
+
+        if count_counts[3]:
+            return TYPES["three_of_a_kind"]
+
+        if count_counts[2] > 1:
+            return TYPES["two_pair"]
+
+        if count_counts[2]:
+            return TYPES["pair"]
+
+        return TYPES["high_card"]
+
+    def get_type_text(self):
+        """Return the text version of get_type(), for example "two_pair"."""
+        return TYPE_NAMES[self.get_type()]
+
+    def evaluate(self):
+        """
+        Return a (type, multiple, rank tuple, score) for the best five card hand that
+        can be made from the cards held, using LookupEvaluator.evaluate_best_indices().
+        Throws a MissingCardError if fewer than five cards are held.
+        """
+        return evaluator.get_lookup_evaluator().evaluate_best_indices(self.card_indices)
+
+    def get_score(self):
+        """Return the packed score of the best five card hand; see evaluate()."""
+        return self.evaluate()[3]
+
+    def get_type_with(self, card_obj):
+        """
+        Return the type the hand would have with one more card, leaving the cards held
+        unchanged. Throws the same exceptions as add_card().
+        """
+        self.add_card(card_obj)
+        try:
+            return self.get_type()
+        finally:
+            self.remove_index(card_obj.index)
+
+    def get_out_types(self, dead_cards=None):
+        """
+        Return a dict of key=card index, value=hand type for every card that could be
+        dealt next: every card not held and not among dead_cards (a list of Card
+        objects, such as other players' known cards). Throws a MaximumCardError if
+        seven cards are already held.
+        """
+        if len(self.card_indices) == MAXIMUM_CARDS:
+            raise hand.MaximumCardError("Already have {0} cards in this hand".format(
+                MAXIMUM_CARDS))
+
+        unavailable = self.mask
+        for card_obj in dead_cards or ():
+            unavailable |= card_obj.mask
+
+        out_types = {}
+        for card_index in range(0, len(card.Card.SUIT_ORDER) * VALUE_COUNT):
+            if unavailable >> card_index & 1:
+                continue
+
+            self.add_index(card_index)
+            out_types[card_index] = self.get_type()
+            self.remove_index(card_index)
+
+        return out_types
@@ -0,0 +1,345 @@
+"""
+This script is not directly executable and forms part of the objects for
+the handcompare application.
+"""
+
+# Isomorphism: Canonical suit relabelling and dense indexes for sets of cards.
+
+import math
+import bisect
+import itertools
+
+import card
+import combinatorics
+
+# Number of suits and of card values
+SUITS = len(card.Card.SUIT_ORDER)
+VALUES = 13
+
+"""
+Suits carry no ranking, so any two deals that differ only by a relabelling of suits
+(for example, AC,KC against AD,KD, or AC,KD against AH,KS) are equivalent. Deals are
+given as a list of groups of cards, such as [hand, board, dead cards]; suits are only
+relabelled consistently across every group, and cards never move between groups.
+
+Each suit is described by a signature: a tuple holding, for every group, a bitmask of
+the card values of that suit in the group. Sorting the four signatures gives a key that
+is identical for every equivalent deal, and the canonical form assigns suits in
+Card.SUIT_ORDER to signatures in descending order.
+"""
+
+
+def _get_signatures(index_groups):
+    """Return the signature of every suit for groups of card indices."""
+    signatures = [[0] * len(index_groups) for suit in range(0, SUITS)]
+    for group_index in range(0, len(index_groups)):
+        for card_index in index_groups[group_index]:
+            signatures[card_index & 3][group_index] |= 1 << (card_index >> 2)
+
+    return [tuple(signature) for signature in signatures]
+
+
+def _get_index_groups(groups):
+    """Return groups of Card objects as groups of card indices."""
+    return [[card_obj.index for card_obj in cards] for cards in groups]
+
+
+def get_key(groups):
+    """
+    Return a hashable key for groups of Card objects, equal for two deals exactly when
+    one is a suit relabelling of the other.
+    """
+    return tuple(sorted(_get_signatures(_get_index_groups(groups)), reverse=True))
+
+
+def get_suit_map(groups):
+    """
+    Return the canonical relabelling for groups of Card objects: a list mapping each
+    suit index (see Card.SUIT_ORDER) to its canonical suit index.
+    """
+    signatures = _get_signatures(_get_index_groups(groups))
+    suit_order = sorted(range(0, SUITS), key=lambda suit: signatures[suit], reverse=True)
+
+    suit_map = [0] * SUITS
+    for canonical_suit in range(0, SUITS):
+        suit_map[suit_order[canonical_suit]] = canonical_suit
+
+    return suit_map
+
+
+def invert_suit_map(suit_map):
+    """Return the suit map undoing a relabelling made with suit_map."""
+    inverse = [0] * SUITS
+    for suit in range(0, SUITS):
+        inverse[suit_map[suit]] = suit
+
+    return inverse
+
+
+def relabel(cards, suit_map):
+    """Return a list of Card objects with suits relabelled, sorted by Card.index."""
+    return [card.from_index(card_index) for card_index in sorted(
+        (card_obj.index & ~3) | suit_map[card_obj.index & 3] for card_obj in cards)]
+
+
+def canonicalize(groups):
+    """
+    Return a tuple of (canonical groups, suit map) for groups of Card objects. The
+    canonical groups are lists of Card objects sorted by Card.index, identical for every
+    equivalent deal; relabel(group, invert_suit_map(suit map)) restores the original
+    cards of a group.
+    """
+    suit_map = get_suit_map(groups)
+    return ([relabel(cards, suit_map) for cards in groups], suit_map)
+
+
+def _decode_key(key, groups):
+    """Return the canonical groups of card indices described by a key."""
+    index_groups = [[] for group_index in range(0, groups)]
+    for canonical_suit in range(0, SUITS):
+        for group_index in range(0, groups):
+            value_mask = key[canonical_suit][group_index]
+            for value_index in range(0, VALUES):
+                if value_mask & (1 << value_index):
+                    index_groups[group_index].append(value_index * 4 + canonical_suit)
+
+    return [sorted(index_group) for index_group in index_groups]
+
+
+def _rank_suit(signature):
+    """
+    Return the index of one suit's cards among every way of dealing as many cards of
+    the suit to each group: the values in each group are ranked in the combinatorial
+    number system among the values not taken by earlier groups, in mixed radix.
+    """
+    index = 0
+    multiplier = 1
+    used = 0
+    available = VALUES
+    for value_mask in signature:
+        rank = 0
+        position = 0
+        chosen = 0
+        for value_index in range(0, VALUES):
+            if used >> value_index & 1:
+                continue
+            if value_mask >> value_index & 1:
+                chosen += 1
+                rank += combinatorics.BINOMIALS[position][chosen]
+            position += 1
+
+        index += rank * multiplier
+        multiplier *= combinatorics.BINOMIALS[available][chosen]
+        available -= chosen
+        used |= value_mask
+
+    return index
+
+
+def _unrank_suit(index, counts):
+    """Return the signature of a suit index from _rank_suit(), given its group counts."""
+    signature = []
+    used = 0
+    available = VALUES
+    for count in counts:
+        size = combinatorics.BINOMIALS[available][count]
+        (index, rank) = (index // size, index % size)
+
+        free_values = [value_index for value_index in range(0, VALUES)
+                       if not used >> value_index & 1]
+        value_mask = 0
+        for position in combinatorics.unrank_combination(rank, count):
+            value_mask |= 1 << free_values[position]
+
+        signature.append(value_mask)
+        used |= value_mask
+        available -= count
+
+    return tuple(signature)
+
+
+def _rank_multiset(ranks):
+    """
+    Return the index of a multiset of ranks among all multisets of the same size: with
+    the ranks ascending, rank i is shifted up by i and the result ranked as a
+    combination.
+    """
+    return sum(combinatorics.binomial(rank + position, position + 1)
+               for (position, rank) in enumerate(sorted(ranks)))
+
+
+def _unrank_multiset(index, count):
+    """Return the ascending list of count ranks with the given _rank_multiset() index."""
+    ranks = [0] * count
+    for size in range(count, 0, -1):
+        # largest shifted rank whose binomial does not exceed the remaining index
+        low = size - 1
+        high = size
+        while combinatorics.binomial(high, size) <= index:
+            high *= 2
+        while high - low > 1:
+            middle = (low + high) // 2
+            if combinatorics.binomial(middle, size) <= index:
+                low = middle
+            else:
+                high = middle
+
+        ranks[size - 1] = low - (size - 1)
+        index -= combinatorics.binomial(low, size)
+
+    return ranks
+
+
+class IsomorphismIndex(object):
+    """
+    Dense index over every class of equivalent deals of a given shape: a list of group
+    sizes, such as (2,) for a two card starting hand (169 classes), (2, 1) for a
+    starting hand and one more card (5,083 classes) or (2, 3) for a starting hand and a
+    flop (1,286,792 classes).
+
+    Indexes are computed combinatorially, without enumerating deals (following Waugh's
+    hand isomorphism algorithm). A configuration lists the number of cards of each
+    suit in every group, sorted. Each suit's cards are ranked with _rank_suit(), and
+    suits with the same counts can be relabelled into each other, so their ranks are
+    ranked together as a multiset. Classes are numbered by configuration, then by those
+    ranks in mixed radix. Only the configurations are enumerated, so any shape that
+    fits in one deck is supported.
+    """
+
+    def __init__(self, group_sizes):
+        """Constructor: Throws a ValueError if the groups do not fit in one deck."""
+        self.group_sizes = tuple(group_sizes)
+
+        deals = 1
+        remaining = SUITS * VALUES
+        for group_size in self.group_sizes:
+            if group_size < 0 or group_size > remaining:
+                raise ValueError("Cannot deal groups of {0} cards from one deck".format(
+                    list(self.group_sizes)))
+            deals *= combinatorics.BINOMIALS[remaining][group_size]
+            remaining -= group_size
+
+        self.deals = deals
+
+        # Counts of cards in each group that one suit can hold, largest first
+        suit_counts = [counts for counts in itertools.product(
+            *[range(0, min(group_size, VALUES) + 1) for group_size in self.group_sizes])
+            if sum(counts) <= VALUES]
+        suit_counts.sort(reverse=True)
+
+        # configurations: every configuration in index order; positions: key=
+        # configuration, value=its position; offsets: index of the first class of each
+        # configuration, with the number of classes last; blocks: for each
+        # configuration, a (counts, suits, suit ranks) tuple for each distinct counts
+        self.configurations = sorted(self._iter_configurations(
+            suit_counts, self.group_sizes, SUITS))
+        self.positions = dict((configuration, position) for (position, configuration)
+                              in enumerate(self.configurations))
+        self.offsets = [0]
+        self.blocks = []
+
+        for configuration in self.configurations:
+            blocks = []
+            size = 1
+            for counts in sorted(set(configuration), reverse=True):
+                suit_ranks = 1
+                available = VALUES
+                for count in counts:
+                    suit_ranks *= combinatorics.BINOMIALS[available][count]
+                    available -= count
+
+                suits = configuration.count(counts)
+                blocks.append((counts, suits, suit_ranks))
+                size *= combinatorics.binomial(suit_ranks + suits - 1, suits)
+
+            self.blocks.append(blocks)
+            self.offsets.append(self.offsets[-1] + size)
+
+    def __len__(self):
+        """Number of classes."""
+        return self.offsets[-1]
+
+    def _iter_configurations(self, suit_counts, remaining, suits):
+        """
+        Yield every configuration for the remaining group sizes: a tuple of the counts
+        of each suit's cards, taken from suit_counts in descending order.
+        """
+        if suits == 1:
+            if tuple(remaining) in suit_counts:
+                yield (tuple(remaining),)
+            return
+
+        for position in range(0, len(suit_counts)):
+            counts = suit_counts[position]
+            if any(count > left for (count, left) in zip(counts, remaining)):
+                continue
+
+            left = [left - count for (count, left) in zip(counts, remaining)]
+            for configuration in self._iter_configurations(suit_counts[position:], left,
+                                                           suits - 1):
+                yield (counts,) + configuration
+
+    def get_index(self, groups):
+        """
+        Return the class index for groups of Card objects of this shape. Throws a
+        ValueError if the groups do not match the shape or repeat a card.
+        """
+        if tuple(len(cards) for cards in groups) != self.group_sizes:
+            raise ValueError("Expected groups of {0} cards".format(
+                list(self.group_sizes)))
+
+        mask = 0
+        for cards in groups:
+            for card_obj in cards:
+                if mask & card_obj.mask:
+                    raise ValueError("Cards cannot repeat between groups")
+                mask |= card_obj.mask
+
+        signatures = _get_signatures(_get_index_groups(groups))
+        suit_counts = [tuple(bin(value_mask).count("1") for value_mask in signature)
+                       for signature in signatures]
+        position = self.positions[tuple(sorted(suit_counts, reverse=True))]
+
+        index = 0
+        multiplier = 1
+        for (counts, suits, suit_ranks) in self.blocks[position]:
+            index += multiplier * _rank_multiset(
+                [_rank_suit(signatures[suit]) for suit in range(0, SUITS)
+                 if suit_counts[suit] == counts])
+            multiplier *= combinatorics.binomial(suit_ranks + suits - 1, suits)
+
+        return self.offsets[position] + index
+
+    def _get_signatures(self, index):
+        """Return the canonical signature of every suit for a class index."""
+        if index < 0 or index >= len(self):
+            raise IndexError("Class {0} out of range".format(index))
+
+        position = bisect.bisect_right(self.offsets, index) - 1
+        index -= self.offsets[position]
+
+        signatures = []
+        for (counts, suits, suit_ranks) in self.blocks[position]:
+            size = combinatorics.binomial(suit_ranks + suits - 1, suits)
+            (index, block_index) = (index // size, index % size)
+            for suit_rank in reversed(_unrank_multiset(block_index, suits)):
+                signatures.append(_unrank_suit(suit_rank, counts))
+
+        return signatures
+
+    def get_groups(self, index):
+        """Return the canonical groups of Card objects for a class index."""
+        return [[card.from_index(card_index) for card_index in index_group]
+                for index_group in _decode_key(
+                    sorted(self._get_signatures(index), reverse=True),
+                    len(self.group_sizes))]
+
+    def get_weight(self, index):
+        """Accessor: number of deals in the class with this index"""
+        # Suit relabellings that only swap identical suits give the same deal
+        signatures = self._get_signatures(index)
+        weight = math.factorial(SUITS)
+        for signature in set(signatures):
+            weight //= math.factorial(signatures.count(signature))
+
+        return weight
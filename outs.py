@@ -0,0 +1,237 @@
+"""
+This script is not directly executable and forms part of the objects for
+the handcompare application.
+"""
+
+# Outs: Finds the unseen cards that improve a partial hand, and to which hand type.
+
+import card
+import hand
+import equity
+import evaluator
+import incremental
+import combinatorics
+
+
+class OutsResult(object):
+    """
+    Outs for a player's cards and board, as found by analyze().
+
+    type: hand type (see Hand.HAND_TYPES) made by the cards already dealt
+    unseen: card indices of every card that could be dealt next
+    out_types: dict of key=card index, value=hand type made with that card, for every
+               card that improves the hand type beyond what the board makes with it
+    board_types: as out_types, for cards that only improve the hand type by improving
+                 the board (such as pairing a board card), which every player shares
+    winning: card indices of the unseen cards after which the player wins or ties
+             against every opponent (None when there are no opponents)
+    runner_runner: dict of key=hand type, value=number of pairs of unseen cards that
+                   reach that type together but not with either card alone, nor
+                   on the board (None unless requested)
+    """
+
+    def __init__(self, hand_type, unseen):
+        """Constructor: no outs found yet."""
+        self.type = hand_type
+        self.unseen = unseen
+        self.out_types = {}
+        self.board_types = {}
+        self.winning = None
+        self.runner_runner = None
+
+    def __repr__(self):
+        """Representation: current type and number of outs to each type"""
+        return "OutsResult(type={0}, outs={1})".format(
+            incremental.TYPE_NAMES[self.type], self.get_counts())
+
+    def get_outs(self, type_name=None):
+        """
+        Accessor: sorted list of Card objects that improve the hand, or only those
+        making the named hand type (for example "flush").
+        """
+        return [card.from_index(card_index)
+                for (card_index, out_type) in sorted(self.out_types.items())
+                if type_name is None or out_type == incremental.TYPES[type_name]]
+
+    def get_board_outs(self):
+        """Accessor: sorted list of Card objects that only improve the board"""
+        return [card.from_index(card_index) for card_index in sorted(self.board_types)]
+
+    def get_counts(self):
+        """Accessor: dict of key=hand type name, value=number of outs to that type"""
+        counts = {}
+        for out_type in self.out_types.values():
+            type_name = incremental.TYPE_NAMES[out_type]
+            counts[type_name] = counts.get(type_name, 0) + 1
+
+        return counts
+
+    def get_probability(self, type_name=None):
+        """
+        Accessor: probability that the next card improves the hand, or improves it to
+        the named hand type.
+        """
+        if not self.unseen:
+            return 0.0
+
+        return len(self.get_outs(type_name)) / float(len(self.unseen))
+
+    def get_winning_outs(self):
+        """Accessor: sorted list of Card objects that win or tie against every opponent"""
+        return [card.from_index(card_index) for card_index in sorted(self.winning or ())]
+
+    def get_winning_probability(self):
+        """Accessor: probability that the next card wins or ties against every opponent"""
+        if not self.unseen:
+            return 0.0
+
+        return len(self.winning or ()) / float(len(self.unseen))
+
+    def get_runner_runner_counts(self):
+        """
+        Accessor: dict of key=hand type name, value=number of pairs of cards reaching
+        that type only with both cards
+        """
+        return dict((incremental.TYPE_NAMES[runner_type], count)
+                    for (runner_type, count) in (self.runner_runner or {}).items())
+
+    def get_runner_runner_probability(self, type_name=None):
+        """
+        Accessor: probability that the next two cards reach a better hand type (or the
+        named hand type) only with both cards.
+        """
+        runouts = combinatorics.BINOMIALS[len(self.unseen)][2]
+        if not runouts or self.runner_runner is None:
+            return 0.0
+
+        if type_name is None:
+            return sum(self.runner_runner.values()) / float(runouts)
+
+        return self.runner_runner.get(incremental.TYPES[type_name], 0) / float(runouts)
+
+
+def _wins_against(state, opponent_states, evaluate):
+    """
+    Return True if the player's cards (state) win or tie against every opponent.
+    Hand types decide most matchups; full scores are only evaluated on equal types.
+    """
+    player_type = state.get_type()
+    player_score = None
+
+    for opponent_state in opponent_states:
+        opponent_type = opponent_state.get_type()
+        if opponent_type < player_type:
+            continue
+        if opponent_type > player_type:
+            return False
+
+        if player_score is None:
+            player_score = evaluate(state.card_indices)[3]
+        if evaluate(opponent_state.card_indices)[3] > player_score:
+            return False
+
+    return True
+
+
+def analyze(hole_cards, board=None, opponents=None, dead=None, runner_runner=False):
+    """
+    Find the outs for a player's hole cards and the board so far.
+
+    hole_cards and board are lists of Card objects; opponents is a list of lists of
+    each opponent's known hole cards, and dead is a list of other Card objects that
+    cannot be dealt. Every card not among them is unseen. Returns an OutsResult with
+    the hand type made by each unseen card that improves the hand and, with opponents,
+    the unseen cards after which the player wins or ties against all of them. With
+    runner_runner, pairs of unseen cards are counted by the hand type they reach only
+    together. A card is only an out if the player's hand type beats the type the board
+    makes with it, so cards that pair the board are kept apart in board_types.
+
+    Throws a DuplicateCardError if a card is given twice, a MaximumCardError if the
+    player could not receive another card (or two, with runner_runner) or an opponent
+    has more than two hole cards, and a MissingCardError if an opponent has fewer than
+    two hole cards, or if there are opponents but the player would have fewer than
+    five cards after the next card.
+    """
+    board = list(board or [])
+    opponents = [list(opponent_cards) for opponent_cards in opponents or []]
+
+    for (number, opponent_cards) in enumerate(opponents, 1):
+        if len(opponent_cards) < 2:
+            raise hand.MissingCardError("Opponent {0} needs two hole cards, found "
+                                        "{1}".format(number, len(opponent_cards)))
+        if len(opponent_cards) > 2:
+            raise hand.MaximumCardError("Opponent {0} can have at most two hole cards, "
+                                        "found {1}".format(number, len(opponent_cards)))
+
+    # Checks every known card for duplicates across the player, board and opponents
+    known_indices = set(equity.get_card_indices(
+        list(hole_cards) + board + [card_obj for opponent_cards in opponents
+                                    for card_obj in opponent_cards] + list(dead or [])))
+
+    next_cards = 2 if runner_runner else 1
+    if len(hole_cards) + len(board) + next_cards > incremental.MAXIMUM_CARDS:
+        raise hand.MaximumCardError("Player cannot receive {0} more cards".format(
+            next_cards))
+
+    if opponents and len(hole_cards) + len(board) + 1 < hand.Hand.MAXIMUM_CARDS:
+        raise hand.MissingCardError("Need at least five cards to compare with opponents")
+
+    state = incremental.IncrementalEvaluator(list(hole_cards) + board)
+    board_state = incremental.IncrementalEvaluator(board)
+    unseen = [card_index for card_index in range(0, 52)
+              if card_index not in known_indices]
+    result = OutsResult(state.get_type(), unseen)
+
+    opponent_states = [incremental.IncrementalEvaluator(opponent_cards + board)
+                       for opponent_cards in opponents]
+    evaluate = evaluator.get_lookup_evaluator().evaluate_best_indices
+    if opponents:
+        result.winning = []
+
+    # Type made by each single unseen card, kept for the runner-runner pass
+    single_types = {}
+    for card_index in unseen:
+        state.add_index(card_index)
+        out_type = state.get_type()
+        single_types[card_index] = out_type
+        if out_type > result.type:
+            board_state.add_index(card_index)
+            if out_type > board_state.get_type():
+                result.out_types[card_index] = out_type
+            else:
+                result.board_types[card_index] = out_type
+            board_state.remove_index(card_index)
+
+        if opponents:
+            for opponent_state in opponent_states:
+                opponent_state.add_index(card_index)
+            if _wins_against(state, opponent_states, evaluate):
+                result.winning.append(card_index)
+            for opponent_state in opponent_states:
+                opponent_state.remove_index(card_index)
+
+        state.remove_index(card_index)
+
+    if runner_runner:
+        result.runner_runner = {}
+        for first in range(0, len(unseen)):
+            state.add_index(unseen[first])
+            for second in range(first + 1, len(unseen)):
+                state.add_index(unseen[second])
+                runner_type = state.get_type()
+                state.remove_index(unseen[second])
+
+                if runner_type <= max(result.type, single_types[unseen[first]],
+                                      single_types[unseen[second]]):
+                    continue
+
+                board_state.add_index(unseen[first])
+                board_state.add_index(unseen[second])
+                if runner_type > board_state.get_type():
+                    result.runner_runner[runner_type] = \
+                        result.runner_runner.get(runner_type, 0) + 1
+                board_state.remove_index(unseen[second])
+                board_state.remove_index(unseen[first])
+            state.remove_index(unseen[first])
+
+    return result
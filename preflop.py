@@ -0,0 +1,428 @@
+#!/usr/bin/env python
+
+"""
+preflop
+
+Precomputed heads-up preflop all-in equities, so odds can be looked up rather than
+simulated.
+
+build_table() simulates every matchup in parallel with the LookupEvaluator and writes
+the equity matrix to a compact binary file; EquityTable memory-maps a file and answers
+each query with a single read. Two table sizes are supported:
+
+    169: one row and column per starting hand class (see STARTING_HAND_SHAPE), as
+         numbered by isomorphism.IsomorphismIndex
+    1326: one row and column per pair of cards, numbered by get_combo_index()
+
+File layout (little endian):
+    header: magic "HCEQ", format version (uint16), table size (uint16),
+            trials per matchup (uint32)
+    equities: table size x table size float32 values, row by row; the value at row i,
+              column j is the equity of hand i against hand j (NaN where the two
+              hands share a card)
+
+Usage:
+    preflop.py build [output file] [--trials N] [--processes N] [--seed N] [--combos]
+    preflop.py query [table file] [--queries N]
+"""
+
+import sys
+import math
+import time
+import array
+import mmap
+import random
+import struct
+import multiprocessing
+
+import card
+import evaluator
+import isomorphism
+
+MAGIC = "HCEQ"
+VERSION = 2
+HEADER = struct.Struct("<4sHHI")
+EQUITY = struct.Struct("<f")
+
+# Starting hands: a single group of two cards
+STARTING_HAND_SHAPE = (2,)
+CLASSES = 169
+COMBOS = 1326
+
+# Default number of simulated boards for every matchup
+TRIALS = 1000
+
+# Card value letters used in class names such as AKs, T9o and 22
+VALUE_NAMES = dict((value, str(value)) for value in range(2, 10))
+VALUE_NAMES.update({10: "T", 11: "J", 12: "Q", 13: "K", 14: "A"})
+
+# Shared index of starting hand classes, and the class of every combo index; both are
+# only built on first use
+_starting_hands = None
+_combo_classes = None
+
+
+class InvalidEquityTableError(Exception):
+    """Thrown when an equity table cannot be read properly."""
+    pass
+
+
+def get_starting_hands():
+    """Return the shared IsomorphismIndex of starting hand classes."""
+    global _starting_hands
+
+    if _starting_hands is None:
+        _starting_hands = isomorphism.IsomorphismIndex(STARTING_HAND_SHAPE)
+
+    return _starting_hands
+
+
+def get_class_index(cards):
+    """Return the starting hand class (0-168) of two Card objects."""
+    global _combo_classes
+
+    if _combo_classes is None:
+        starting_hands = get_starting_hands()
+        _combo_classes = [
+            starting_hands.get_index([[card.from_index(card_index)
+                                       for card_index in get_combo_cards(combo_index)]])
+            for combo_index in range(0, COMBOS)]
+
+    return _combo_classes[get_combo_index(cards)]
+
+
+def get_combo_index(cards):
+    """
+    Return the index (0-1325) of two Card objects among all pairs of cards, numbered
+    in colexicographic order of their Card.index values.
+    """
+    (low, high) = sorted(card_obj.index for card_obj in cards)
+    if low == high:
+        raise ValueError("Cards cannot repeat in a starting hand")
+
+    return high * (high - 1) // 2 + low
+
+
+def get_combo_cards(combo_index):
+    """Return the two card indices, ascending, of a combo index."""
+    high = int((1 + math.sqrt(1 + 8 * combo_index)) // 2)
+    while high * (high - 1) // 2 > combo_index:
+        high -= 1
+
+    return (combo_index - high * (high - 1) // 2, high)
+
+
+def get_class_name(class_index):
+    """Return the name of a starting hand class, such as AKs, T9o or 22."""
+    (card1, card2) = get_starting_hands().get_groups(class_index)[0]
+    (low, high) = sorted((card1.value, card2.value))
+
+    if low == high:
+        return VALUE_NAMES[high] * 2
+    elif card1.suit == card2.suit:
+        return VALUE_NAMES[high] + VALUE_NAMES[low] + "s"
+
+    return VALUE_NAMES[high] + VALUE_NAMES[low] + "o"
+
+
+def _simulate_matchups(task):
+    """
+    Worker: return the equity of the first hand for each of a list of matchups.
+    task is a tuple of (matchups, trials, seed). Every matchup is a tuple of two lists
+    of combos (pairs of card indices); trials are spread evenly over every pair of one
+    combo from each list that does not share a card.
+    """
+    (matchups, trials, seed) = task
+
+    rng = random.Random(seed)
+    evaluate = evaluator.get_lookup_evaluator().evaluate_best_indices
+    deck = range(0, 52)
+    equities = []
+
+    for (combos1, combos2) in matchups:
+        deals = [(list(combo1), list(combo2), set(combo1 + combo2))
+                 for combo1 in combos1 for combo2 in combos2
+                 if not set(combo1) & set(combo2)]
+
+        shares = 0.0
+        for trial in range(0, trials):
+            (hand1, hand2, used) = deals[trial % len(deals)]
+
+            # At most four of nine random cards are in use, so the first five others
+            # are a random board from the remaining deck
+            board = [card_index for card_index in rng.sample(deck, 9)
+                     if card_index not in used][:5]
+
+            score1 = evaluate(hand1 + board)[3]
+            score2 = evaluate(hand2 + board)[3]
+            if score1 > score2:
+                shares += 1.0
+            elif score1 == score2:
+                shares += 0.5
+
+        equities.append(shares / trials)
+
+    return equities
+
+
+def _get_class_matchups():
+    """
+    Return lists of (row, column) pairs and matchups for every pair of distinct
+    starting hand classes with row < column. Each matchup holds every combo of the two
+    classes.
+    """
+    class_combos = [[] for class_index in range(0, CLASSES)]
+    for combo_index in range(0, COMBOS):
+        combo = get_combo_cards(combo_index)
+        class_combos[get_class_index([card.from_index(card_index)
+                                      for card_index in combo])].append(combo)
+
+    positions = []
+    matchups = []
+    for row in range(0, CLASSES):
+        for column in range(row + 1, CLASSES):
+            positions.append((row, column))
+            matchups.append((class_combos[row], class_combos[column]))
+
+    return (positions, matchups)
+
+
+def _get_combo_matchups(combo_indexes=None):
+    """
+    Return lists of (row, column) pairs and matchups for every pair of combos that do
+    not share a card, with row < column. Combo pairs that are suit relabellings of each
+    other have the same equity, so one pair per isomorphism class is simulated and the
+    result is shared by every pair in the class.
+
+    All 1326 combos give 812,175 pairs in 50,258 classes. combo_indexes restricts the
+    pairs to a sorted list of combo indexes.
+    """
+    if combo_indexes is None:
+        combo_indexes = range(0, COMBOS)
+
+    classes = {}
+    for (position, column) in enumerate(combo_indexes):
+        hand2 = get_combo_cards(column)
+        for row in combo_indexes[:position]:
+            hand1 = get_combo_cards(row)
+            if set(hand1) & set(hand2):
+                continue
+
+            key = isomorphism.get_key(
+                [[card.from_index(card_index) for card_index in hand1],
+                 [card.from_index(card_index) for card_index in hand2]])
+            classes.setdefault(key, []).append((row, column))
+
+    positions = []
+    matchups = []
+    for key in sorted(classes.keys()):
+        class_positions = classes[key]
+        (row, column) = class_positions[0]
+        positions.append(class_positions)
+        matchups.append(([get_combo_cards(row)], [get_combo_cards(column)]))
+
+    return (positions, matchups)
+
+
+def build_table(path, trials=TRIALS, processes=None, seed=None, combos=False):
+    """
+    Simulate every heads-up preflop matchup with trials random boards each and write
+    the equity table to path. With combos, the 1326 x 1326 table is built instead of
+    the 169 x 169 table.
+
+    The 169 x 169 table simulates 14,196 matchups. The combos table simulates 50,258,
+    at roughly 0.03-0.05 seconds each with 1000 trials: about half an hour to an hour
+    of CPU time, divided between the processes.
+
+    processes: number of worker processes; None uses every core, 1 runs in-process
+    seed: base seed; task N is simulated with seed + N
+
+    Returns a dict with the table size, the number of matchups simulated and the
+    number of seconds taken.
+    """
+    start = time.time()
+
+    if seed is None:
+        seed = random.randrange(0, 2 ** 31)
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+
+    if combos:
+        size = COMBOS
+        (positions, matchups) = _get_combo_matchups()
+    else:
+        size = CLASSES
+        (positions, matchups) = _get_class_matchups()
+
+    # Several matchups per task keeps inter-process overhead small
+    tasks = []
+    for task_start in range(0, len(matchups), size):
+        tasks.append((matchups[task_start:task_start + size], trials,
+                      seed + len(tasks)))
+
+    # Build the lookup tables before forking so workers inherit them
+    evaluator.get_lookup_evaluator()
+
+    if processes > 1:
+        pool = multiprocessing.Pool(processes)
+        try:
+            task_results = pool.map(_simulate_matchups, tasks)
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        task_results = [_simulate_matchups(task) for task in tasks]
+
+    equities = [equity for task_result in task_results for equity in task_result]
+
+    # Hands sharing a card have no equity; a hand against its own class has exactly
+    # half, as both players are in the same position.
+    table = array.array("f", [float("nan")] * (size * size))
+    if not combos:
+        for class_index in range(0, size):
+            table[class_index * size + class_index] = 0.5
+
+    for (matchup_positions, equity) in zip(positions, equities):
+        if not combos:
+            matchup_positions = [matchup_positions]
+
+        for (row, column) in matchup_positions:
+            table[row * size + column] = equity
+            table[column * size + row] = 1.0 - equity
+
+    if sys.byteorder != "little":
+        table.byteswap()
+
+    with open(path, "wb") as output_file:
+        output_file.write(HEADER.pack(MAGIC, VERSION, size, trials))
+        table.tofile(output_file)
+
+    return {
+        "size": size,
+        "matchups": len(matchups),
+        "seconds": time.time() - start,
+    }
+
+
+class EquityTable(object):
+    """
+    Reads an equity table built by build_table() through a read-only memory map. Each
+    query reads a single value from the mapped file.
+    """
+
+    def __init__(self, path):
+        """Constructor: map the file and validate its header."""
+        self.input_file = open(path, "rb")
+        try:
+            self.map = mmap.mmap(self.input_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, mmap.error):
+            self.input_file.close()
+            raise InvalidEquityTableError("Equity table {0} is empty".format(path))
+
+        if len(self.map) < HEADER.size:
+            self.close()
+            raise InvalidEquityTableError("Equity table {0} has no header".format(path))
+
+        (magic, version, self.size, self.trials) = HEADER.unpack_from(self.map, 0)
+
+        if magic != MAGIC or version != VERSION or self.size not in (CLASSES, COMBOS):
+            self.close()
+            raise InvalidEquityTableError("{0} is not a version {1} equity table".format(
+                path, VERSION))
+
+        if len(self.map) < HEADER.size + self.size * self.size * EQUITY.size:
+            self.close()
+            raise InvalidEquityTableError("Equity table {0} is truncated".format(path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Unmap and close the file."""
+        self.map.close()
+        self.input_file.close()
+
+    def get_index(self, cards):
+        """Return the row or column for two Card objects in this table."""
+        if self.size == COMBOS:
+            return get_combo_index(cards)
+
+        return get_class_index(cards)
+
+    def get_equity(self, row, column):
+        """Return the equity of the hand with index row against the hand column."""
+        return EQUITY.unpack_from(
+            self.map, HEADER.size + (row * self.size + column) * EQUITY.size)[0]
+
+    def query(self, cards1, cards2):
+        """
+        Return the equity of two Card objects against two others. In a 169 x 169
+        table, this is the average over every pair of hands in the two classes.
+        """
+        return self.get_equity(self.get_index(cards1), self.get_index(cards2))
+
+
+def benchmark_queries(table, queries=100000, seed=0):
+    """
+    Time random queries against an EquityTable. Returns a dict with the mean time in
+    microseconds of a query by index (get_equity()) and by cards (query()).
+    """
+    rng = random.Random(seed)
+    deck = [card.from_index(card_index) for card_index in range(0, 52)]
+
+    indexes = [(rng.randrange(0, table.size), rng.randrange(0, table.size))
+               for query in range(0, queries)]
+    start = time.time()
+    for (row, column) in indexes:
+        table.get_equity(row, column)
+    index_seconds = time.time() - start
+
+    hands = [rng.sample(deck, 4) for query in range(0, queries)]
+    start = time.time()
+    for cards in hands:
+        table.query(cards[:2], cards[2:])
+    card_seconds = time.time() - start
+
+    return {
+        "queries": queries,
+        "index_us": index_seconds / queries * 1000000,
+        "cards_us": card_seconds / queries * 1000000,
+    }
+
+
+def get_option(name, default):
+    """Return the integer value following a command line option, or a default."""
+    if name in sys.argv:
+        try:
+            return int(sys.argv[sys.argv.index(name) + 1])
+        except (IndexError, ValueError):
+            print "Error: {0} requires an integer value".format(name)
+            sys.exit(1)
+
+    return default
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3 or sys.argv[1] not in ("build", "query"):
+        print "Usage: {0} build [output file] [--trials N] [--processes N] " \
+              "[--seed N] [--combos]".format(sys.argv[0])
+        print "       {0} query [table file] [--queries N]".format(sys.argv[0])
+        sys.exit(1)
+
+    if sys.argv[1] == "build":
+        stats = build_table(sys.argv[2], get_option("--trials", TRIALS),
+                            get_option("--processes", None), get_option("--seed", None),
+                            "--combos" in sys.argv)
+        print "Built {0} x {0} table ({1} matchups) in {2:.1f} seconds".format(
+            stats["size"], stats["matchups"], stats["seconds"])
+    else:
+        with EquityTable(sys.argv[2]) as table:
+            # Build the class of every combo before timing queries
+            get_class_index([card.from_index(0), card.from_index(1)])
+            stats = benchmark_queries(table, get_option("--queries", 100000))
+            print "{0} queries: {1:.2f} us by index, {2:.2f} us by cards".format(
+                stats["queries"], stats["index_us"], stats["cards_us"])
@@ -0,0 +1,497 @@
+#!/usr/bin/env python
+
+"""
+ranges
+
+Hand ranges in the usual shorthand, and equity of one range against another.
+
+A range is a comma separated list of entries, each optionally followed by a weight
+(the fraction of its combos that are played, 1 by default):
+    AA, AKs, AKo, AK        a pair, suited, offsuit, or both
+    TT+, A9s+, KTo+         a pair and every higher pair, or a fixed high card with
+                            every higher kicker below it
+    TT-77, 98s-65s, A9s-A6s every pair, connector or kicker between the two ends
+    AhKh                    a single combo of two exact cards
+    AKs:0.5, 22+:0.25       a weighted entry
+Later entries replace the weights of combos already in the range.
+
+Every combo is a pair of card indices (see Card.index), so combos blocked by known
+cards and combos sharing a card with each other are removed with a single bitmask
+test. range_equity() deals every remaining board when there are few enough of them,
+and random boards otherwise, split across processes. Each board is evaluated once for
+every combo it does not block, then shared by every compatible pair of combos.
+
+Usage:
+    ranges.py [range 1] [range 2] [--board AH,KD,2C] [--trials N] [--processes N]
+              [--seed N]
+"""
+
+import sys
+import random
+import multiprocessing
+
+import card
+import hand
+import equity
+import preflop
+import evaluator
+import combinatorics
+
+# Default number of random boards, when not dealing every possible board; any flop
+# has fewer possible turn and river cards than this
+TRIALS = 2000
+
+# Number of boards dealt by one worker task. Boards are always split into chunks of
+# this size regardless of the number of processes, so results for a given seed do not
+# depend on how many processes were used.
+CHUNK_SIZE = 250
+
+# Card values by range letter, such as T for 10
+RANGE_VALUES = dict((name, value) for (value, name) in preflop.VALUE_NAMES.items())
+
+
+class InvalidRangeError(Exception):
+    """Thrown when a range string cannot be parsed."""
+    pass
+
+
+def get_class_combos(high, low, suited=None):
+    """
+    Return the combos (ascending pairs of card indices) of a starting hand class given
+    its two card values. suited is True for suited combos only, False for offsuit combos
+    only, and None for both; it is ignored for pairs.
+    """
+    combos = []
+    suits = range(0, len(card.Card.SUIT_ORDER))
+    for high_suit in suits:
+        for low_suit in suits:
+            if high == low and low_suit <= high_suit:
+                continue
+            if high != low and suited is not None and suited != (high_suit == low_suit):
+                continue
+
+            combos.append(tuple(sorted(((high - 2) * 4 + high_suit,
+                                        (low - 2) * 4 + low_suit))))
+
+    return combos
+
+
+def _parse_class(text):
+    """
+    Parse a starting hand class such as AKs, T9o, 22 or AK. Returns a tuple of
+    (high value, low value, suited), with suited as for get_class_combos().
+    """
+    if len(text) not in (2, 3) or text[0] not in RANGE_VALUES or \
+            text[1] not in RANGE_VALUES:
+        raise InvalidRangeError("Invalid starting hand {0}".format(text))
+
+    (high, low) = sorted((RANGE_VALUES[text[0]], RANGE_VALUES[text[1]]), reverse=True)
+    suited = None
+    if len(text) == 3:
+        if text[2] not in ("S", "O") or high == low:
+            raise InvalidRangeError("Invalid starting hand {0}".format(text))
+        suited = text[2] == "S"
+
+    return (high, low, suited)
+
+
+def _parse_entry(text):
+    """Return the list of combos for a single range entry without its weight."""
+    # A single combo of two exact cards, such as AhKh
+    if len(text) == 4 and text[1] in card.Card.SUIT_ORDER and \
+            text[3] in card.Card.SUIT_ORDER:
+        try:
+            cards = [card.from_token(text[:2]), card.from_token(text[2:])]
+        except card.InvalidCardError:
+            raise InvalidRangeError("Invalid combo {0}".format(text))
+        if cards[0] is cards[1]:
+            raise InvalidRangeError("Invalid combo {0}".format(text))
+        return [tuple(sorted(card_obj.index for card_obj in cards))]
+
+    classes = []
+    if text.endswith("+"):
+        (high, low, suited) = _parse_class(text[:-1])
+        if high == low:
+            classes = [(value, value) for value in range(low, 15)]
+        else:
+            classes = [(high, value) for value in range(low, high)]
+    elif "-" in text:
+        (first, last) = [_parse_class(end) for end in text.split("-", 1)]
+        suited = first[2]
+        if first[2] != last[2]:
+            raise InvalidRangeError("Both ends of {0} must match".format(text))
+
+        (top, bottom) = sorted((first, last), reverse=True)
+        if top[0] == top[1] and bottom[0] == bottom[1]:
+            # TT-77: every pair between
+            classes = [(value, value) for value in range(bottom[0], top[0] + 1)]
+        elif top[0] == bottom[0] and top[1] != top[0] and bottom[1] != bottom[0]:
+            # A9s-A6s: one high card, every kicker between
+            classes = [(top[0], value) for value in range(bottom[1], top[1] + 1)]
+        elif top[0] - top[1] == bottom[0] - bottom[1] and top[0] != top[1]:
+            # 98s-65s: both cards step down together
+            classes = [(bottom[0] + step, bottom[1] + step)
+                       for step in range(0, top[0] - bottom[0] + 1)]
+        else:
+            raise InvalidRangeError("Cannot expand {0}".format(text))
+    else:
+        (high, low, suited) = _parse_class(text)
+        classes = [(high, low)]
+
+    combos = []
+    for (high, low) in classes:
+        combos += get_class_combos(high, low, suited)
+
+    return combos
+
+
+def parse_range(range_string):
+    """
+    Parse a range string and return a dict of key=combo (an ascending pair of card
+    indices), value=weight. Throws an InvalidRangeError if any entry is invalid.
+    """
+    combos = {}
+    for entry in range_string.split(","):
+        entry = entry.strip().upper()
+        if not entry:
+            continue
+
+        weight = 1.0
+        if ":" in entry:
+            (entry, weight_text) = entry.split(":", 1)
+            try:
+                weight = float(weight_text)
+            except ValueError:
+                raise InvalidRangeError("Invalid weight {0}".format(weight_text))
+            if not 0.0 <= weight <= 1.0:
+                raise InvalidRangeError("Weight {0} must be from 0 to 1".format(weight))
+
+        for combo in _parse_entry(entry.strip()):
+            combos[combo] = weight
+
+    return combos
+
+
+class HandRange(object):
+    """A weighted set of two card combos, parsed from a range string."""
+
+    def __init__(self, range_string):
+        """Constructor: parse the range string; see parse_range()."""
+        self.range_string = range_string
+        self.combos = parse_range(range_string)
+
+    def __repr__(self):
+        """Representation: the original range string"""
+        return "HandRange({0!r})".format(self.range_string)
+
+    def __len__(self):
+        """Number of combos with a weight above zero"""
+        return len([weight for weight in self.combos.values() if weight > 0])
+
+    def get_combos(self, dead=None):
+        """
+        Return a sorted list of (combo, mask, weight) for every combo with a weight above
+        zero that does not use any of the Card objects in dead, such as the board.
+        """
+        dead_mask = 0
+        for card_obj in dead or ():
+            dead_mask |= card_obj.mask
+
+        combos = []
+        for (combo, weight) in sorted(self.combos.items()):
+            mask = (1 << combo[0]) | (1 << combo[1])
+            if weight > 0 and not mask & dead_mask:
+                combos.append((combo, mask, weight))
+
+        return combos
+
+    def get_weight(self, dead=None):
+        """Return the total weight of the combos not blocked by dead cards."""
+        return sum(weight for (combo, mask, weight) in self.get_combos(dead))
+
+
+def get_combo_name(combo):
+    """Return the name of a combo, such as AhKh or Td9d."""
+    return "".join(preflop.VALUE_NAMES[(card_index >> 2) + 2] +
+                   card.Card.SUIT_ORDER[card_index & 3].lower()
+                   for card_index in sorted(combo, reverse=True))
+
+
+class RangeEquityResult(object):
+    """
+    Equity of every pair of compatible combos from two ranges, as found by
+    range_equity().
+
+    combos1, combos2: lists of (combo, mask, weight) for each range
+    pairs: list of (index into combos1, index into combos2) for every pair of combos
+           that do not share a card
+    shares: for each pair, the first combo's share of the pot summed over every board
+            played (1 for a win, 0.5 for a split)
+    boards: for each pair, the number of boards played
+    """
+
+    def __init__(self, combos1, combos2, pairs):
+        """Constructor: no boards played yet."""
+        self.combos1 = combos1
+        self.combos2 = combos2
+        self.pairs = pairs
+        self.shares = [0.0] * len(pairs)
+        self.boards = [0] * len(pairs)
+
+    def __repr__(self):
+        """Representation: equity of each range and number of matchups"""
+        return "RangeEquityResult(matchups={0}, equity={1})".format(
+            len(self.pairs), [round(self.get_equity(player), 4) for player in (0, 1)])
+
+    def merge(self, shares, boards):
+        """Add the shares and board counts of each pair, such as from one worker."""
+        for pair_index in range(0, len(self.pairs)):
+            self.shares[pair_index] += shares[pair_index]
+            self.boards[pair_index] += boards[pair_index]
+
+        return self
+
+    def get_pair_equity(self, pair_index):
+        """Accessor: equity of the first combo of a pair against the second"""
+        if not self.boards[pair_index]:
+            return 0.0
+
+        return self.shares[pair_index] / self.boards[pair_index]
+
+    def get_matchups(self):
+        """
+        Accessor: list of (first combo name, second combo name, equity of the first)
+        for every pair of compatible combos; see get_combo_name()
+        """
+        return [(get_combo_name(self.combos1[index1][0]),
+                 get_combo_name(self.combos2[index2][0]),
+                 self.get_pair_equity(pair_index))
+                for (pair_index, (index1, index2)) in enumerate(self.pairs)]
+
+    def _get_totals(self, player):
+        """
+        Return lists of the weighted equity and of the total opposing weight for every
+        combo of the first (0) or second (1) range.
+        """
+        combos = (self.combos1, self.combos2)
+        totals = [0.0] * len(combos[player])
+        weights = [0.0] * len(combos[player])
+
+        for pair_index in range(0, len(self.pairs)):
+            index = self.pairs[pair_index][player]
+            other_weight = combos[1 - player][self.pairs[pair_index][1 - player]][2]
+            pair_equity = self.get_pair_equity(pair_index)
+            if player:
+                pair_equity = 1.0 - pair_equity
+
+            totals[index] += other_weight * pair_equity
+            weights[index] += other_weight
+
+        return (totals, weights)
+
+    def get_equity(self, player=0):
+        """
+        Accessor: equity of the first range (player 0) or second range (player 1),
+        weighting every pair by the weights of both its combos
+        """
+        combos = (self.combos1, self.combos2)[player]
+        (totals, weights) = self._get_totals(player)
+
+        total_weight = sum(weights[index] * combos[index][2]
+                           for index in range(0, len(combos)))
+        if not total_weight:
+            return 0.0
+
+        return sum(totals[index] * combos[index][2]
+                   for index in range(0, len(combos))) / total_weight
+
+    def get_combo_equities(self, player=0):
+        """
+        Accessor: dict of key=combo name (see get_combo_name()), value=equity against
+        the other range, for every combo of the first (0) or second (1) range with at
+        least one compatible opposing combo
+        """
+        combos = (self.combos1, self.combos2)[player]
+        (totals, weights) = self._get_totals(player)
+
+        return dict((get_combo_name(combos[index][0]), totals[index] / weights[index])
+                    for index in range(0, len(combos)) if weights[index])
+
+
+def _play_boards(task):
+    """
+    Worker: play a chunk of boards for every pair of compatible combos. task is a tuple
+    of (first range combos, second range combos, pairs, board indices, indices of the
+    cards left in the deck, cards to deal, exhaustive, start, stop, seed).
+
+    With exhaustive, boards start (inclusive) to stop (exclusive) are dealt, numbered by
+    the combinatorial number system over the deck (see
+    combinatorics.unrank_combination()); otherwise stop - start random boards are dealt with the given seed. Each board is
+    evaluated once for every combo it does not block, and every compatible pair is then
+    settled by comparing scores. Returns a tuple of (shares, boards played) per pair.
+    """
+    (combos1, combos2, pairs, board, deck, needed, exhaustive, start, stop, seed) = task
+
+    rng = random.Random(seed)
+    evaluate = evaluator.get_lookup_evaluator().evaluate_best_indices
+    shares = [0.0] * len(pairs)
+    boards = [0] * len(pairs)
+
+    positions = combinatorics.unrank_combination(start, needed)
+    for deal_index in range(start, stop):
+        if exhaustive:
+            dealt = [deck[position] for position in positions]
+            combinatorics.next_combination(positions)
+        else:
+            dealt = rng.sample(deck, needed)
+
+        full_board = board + dealt
+        board_mask = 0
+        for card_index in dealt:
+            board_mask |= 1 << card_index
+
+        # Score of every combo not blocked by the dealt cards, or None
+        scores = [[None if mask & board_mask else evaluate(list(combo) + full_board)[3]
+                   for (combo, mask, weight) in combos]
+                  for combos in (combos1, combos2)]
+        (scores1, scores2) = scores
+
+        for pair_index in range(0, len(pairs)):
+            (index1, index2) = pairs[pair_index]
+            score1 = scores1[index1]
+            score2 = scores2[index2]
+            if score1 is None or score2 is None:
+                continue
+
+            if score1 > score2:
+                shares[pair_index] += 1.0
+            elif score1 == score2:
+                shares[pair_index] += 0.5
+            boards[pair_index] += 1
+
+    return (shares, boards)
+
+
+def range_equity(range1, range2, board=None, dead=None, trials=TRIALS, processes=None,
+                 seed=None):
+    """
+    Calculate the equity of every pair of combos from two ranges, and of each combo and
+    range against the other range.
+
+    range1, range2: HandRange objects or range strings
+    board: list of Card objects already on the board (zero to five cards)
+    dead: list of Card objects known to be out of the deck
+    trials: number of random boards to deal; every possible board is dealt instead
+            when there are no more than this many
+    processes: number of worker processes; None uses every core, 1 runs in-process
+    seed: base seed; chunk N of the random boards is dealt with seed + N
+
+    Combos blocked by the board or dead cards are removed first. Every board is shared
+    by all pairs of combos it does not block, and boards are split into chunks of
+    CHUNK_SIZE across processes. Returns a RangeEquityResult. Throws an
+    InvalidRangeError if a range cannot be parsed, and a DuplicateCardError if a card
+    is both on the board and dead.
+    """
+    if not isinstance(range1, HandRange):
+        range1 = HandRange(range1)
+    if not isinstance(range2, HandRange):
+        range2 = HandRange(range2)
+
+    board = list(board or [])
+    known = board + list(dead or [])
+    if len(board) > equity.BOARD_SIZE:
+        raise ValueError("Board cannot have more than {0} cards".format(
+            equity.BOARD_SIZE))
+
+    # Also checks the board and dead cards for duplicates
+    known_indices = set(equity.get_card_indices(known))
+    deck = [card_index for card_index in range(0, 52) if card_index not in known_indices]
+
+    combos1 = range1.get_combos(known)
+    combos2 = range2.get_combos(known)
+    pairs = [(index1, index2)
+             for index1 in range(0, len(combos1)) for index2 in range(0, len(combos2))
+             if not combos1[index1][1] & combos2[index2][1]]
+
+    if seed is None:
+        seed = random.randrange(0, 2 ** 31)
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+
+    needed = equity.BOARD_SIZE - len(board)
+    total = combinatorics.BINOMIALS[len(deck)][needed]
+    exhaustive = total <= trials
+    if not exhaustive:
+        total = trials
+
+    board_indices = [card_obj.index for card_obj in board]
+    tasks = []
+    for chunk_start in range(0, total, CHUNK_SIZE):
+        tasks.append((combos1, combos2, pairs, board_indices, deck, needed, exhaustive,
+                      chunk_start, min(chunk_start + CHUNK_SIZE, total),
+                      seed + len(tasks)))
+
+    # Build the lookup tables before forking so workers inherit them
+    evaluator.get_lookup_evaluator()
+
+    if processes > 1 and len(tasks) > 1:
+        pool = multiprocessing.Pool(processes)
+        try:
+            task_results = pool.map(_play_boards, tasks)
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        task_results = [_play_boards(task) for task in tasks]
+
+    result = RangeEquityResult(combos1, combos2, pairs)
+    for (shares, boards) in task_results:
+        result.merge(shares, boards)
+
+    return result
+
+
+def get_option(name, default):
+    """Return the integer value following a command line option, or a default."""
+    if name in sys.argv:
+        try:
+            return int(sys.argv[sys.argv.index(name) + 1])
+        except (IndexError, ValueError):
+            print "Error: {0} requires an integer value".format(name)
+            sys.exit(1)
+
+    return default
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print "Usage: {0} [range 1] [range 2] [--board AH,KD,2C] [--trials N] " \
+              "[--processes N] [--seed N]".format(sys.argv[0])
+        sys.exit(1)
+
+    board = []
+    if "--board" in sys.argv:
+        try:
+            board = [card.from_token(token) for token in
+                     sys.argv[sys.argv.index("--board") + 1].split(",")]
+        except (IndexError, card.InvalidCardError):
+            print "Error: --board requires a comma separated list of cards"
+            sys.exit(1)
+
+    try:
+        result = range_equity(sys.argv[1], sys.argv[2], board,
+                              trials=get_option("--trials", TRIALS),
+                              processes=get_option("--processes", None),
+                              seed=get_option("--seed", None))
+    except (InvalidRangeError, hand.DuplicateCardError, ValueError) as e:
+        print "Error: {0}".format(e)
+        sys.exit(1)
+
+    print "{0} matchups: range 1 {1:.4f}, range 2 {2:.4f}".format(
+        len(result.pairs), result.get_equity(0), result.get_equity(1))
+    for player in (0, 1):
+        print "Range {0}:".format(player + 1)
+        for (name, combo_equity) in sorted(result.get_combo_equities(player).items(),
+                                           key=lambda item: -item[1]):
+            print "    {0} {1:.4f}".format(name, combo_equity)
@@ -0,0 +1,476 @@
+#!/usr/bin/env python
+
+"""
+server
+
+Long-lived hand comparison service, so callers do not need to start a new
+handcompare.py process for every comparison.
+
+Requests are JSON objects, accepted either as newline-delimited JSON over TCP (one
+request per line, one response per line, in order) or as the body of an HTTP POST:
+
+    {"id": 1, "op": "compare", "hands": ["2C,3H,4D,5S,10C", "10D,JD,QD,KD,AD"]}
+    {"id": 2, "op": "showdown", "hands": ["...", "...", "..."], "sanity": false}
+
+Compare responses hold the handcompare result code (HAND1_WINS, HAND2_WINS or
+HANDS_DRAW); showdown responses hold the winners, ordering and ties from
+HandCompare.showdown(). Invalid requests get an "error" message instead.
+
+Connections are handled on their own threads, but every request is evaluated by a
+single worker thread that collects concurrent requests into micro-batches. Each
+distinct hand string in a batch is parsed and evaluated once, however many requests
+hold it, and hands are evaluated through the lookup tables without changing the
+evaluator used elsewhere in the process.
+"""
+
+import sys
+import json
+import time
+import socket
+import threading
+import Queue
+import SocketServer
+import BaseHTTPServer
+
+import card
+import hand
+import handcompare
+
+# Defaults for micro-batching: the most requests evaluated together, and how long
+# (in seconds) the worker waits for more requests once it has received one.
+MAX_BATCH = 256
+MAX_DELAY = 0.001
+
+
+class RequestBatcher(object):
+    """
+    Collects requests from any number of threads and evaluates them in batches on a
+    single worker thread. submit() blocks until its request has been evaluated.
+    """
+
+    def __init__(self, max_batch=MAX_BATCH, max_delay=MAX_DELAY):
+        """Constructor: set up the queue; call start() to begin evaluating."""
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue = Queue.Queue()
+        self.worker = None
+
+        # Every hand in the service is evaluated through the lookup tables
+        self.hc = handcompare.HandCompare()
+        self.hc.evaluator = "lookup"
+
+        # Counters for monitoring: number of batches and requests evaluated
+        self.batches = 0
+        self.requests = 0
+
+    def start(self):
+        """Start the worker thread."""
+        self.worker = threading.Thread(target=self._run)
+        self.worker.daemon = True
+        self.worker.start()
+
+    def stop(self):
+        """Stop the worker thread once queued requests have been evaluated."""
+        self.queue.put(None)
+        self.worker.join()
+
+    def submit(self, request):
+        """Evaluate a request dict and return its response dict."""
+        pending = [request, None, threading.Event()]
+        self.queue.put(pending)
+        pending[2].wait()
+        return pending[1]
+
+    def _run(self):
+        """Worker: evaluate queued requests in batches until stopped."""
+        while True:
+            batch = [self.queue.get()]
+
+            # Collect whatever else arrives within max_delay, up to max_batch
+            deadline = time.time() + self.max_delay
+            while batch[-1] is not None and len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get(
+                        timeout=max(deadline - time.time(), 0)))
+                except Queue.Empty:
+                    break
+
+            stopping = batch[-1] is None
+            if stopping:
+                batch.pop()
+
+            try:
+                responses = self.process_batch([pending[0] for pending in batch])
+                for (pending, response) in zip(batch, responses):
+                    pending[1] = response
+
+                # Counters are updated before any caller is released
+                if batch:
+                    self.batches += 1
+                    self.requests += len(batch)
+            finally:
+                for pending in batch:
+                    pending[2].set()
+
+            if stopping:
+                return
+
+    def process_batch(self, requests):
+        """
+        Evaluate a list of request dicts together and return their response dicts, in
+        order. Hands are shared between the requests, so a hand string repeated across
+        the batch is only parsed and evaluated once.
+        """
+        parsed_hands = {}
+        responses = []
+        for request in requests:
+            try:
+                responses.append(process_request(self.hc, request, parsed_hands))
+            except Exception as e:
+                # Never let one request stop the only worker thread
+                responses.append({"error": "Could not process request: {0!r}".format(e)})
+
+        return responses
+
+
+def parse_hand(hc, hand_string, parsed_hands=None):
+    """
+    Return the Hand object for a hand string, parsed with a HandCompare object. With
+    parsed_hands, a dict of hand string to Hand object (or the exception raised while
+    parsing it), each distinct string is only parsed once. Throws the same exceptions
+    as HandCompare.parse_hand_string().
+    """
+    if parsed_hands is None or not isinstance(hand_string, basestring):
+        return hc.parse_hand_string(hand_string)
+
+    try:
+        parsed = parsed_hands[hand_string]
+    except KeyError:
+        try:
+            parsed = hc.parse_hand_string(hand_string)
+        except (handcompare.InvalidHandError, card.InvalidCardError,
+                hand.DuplicateCardError, UnicodeError) as e:
+            parsed = e
+        parsed_hands[hand_string] = parsed
+
+    if isinstance(parsed, Exception):
+        raise parsed
+
+    return parsed
+
+
+def process_request(hc, request, parsed_hands=None):
+    """
+    Evaluate a single request dict with a HandCompare object and return the response
+    dict. Errors are reported in the response rather than raised. parsed_hands is an
+    optional dict of hands already parsed, shared between requests; see parse_hand().
+    """
+    if not isinstance(request, dict):
+        return {"error": "Request must be a JSON object"}
+
+    response = {}
+    if "id" in request:
+        response["id"] = request["id"]
+
+    op = request.get("op", "compare")
+    hand_strings = request.get("hands")
+
+    try:
+        if op not in ("compare", "showdown"):
+            raise handcompare.InvalidHandError("Unknown op {0!r}".format(op))
+
+        if not isinstance(hand_strings, list) or len(hand_strings) < 2:
+            raise handcompare.InvalidHandError("Provide at least two hands to compare")
+
+        if op == "compare" and len(hand_strings) != 2:
+            raise handcompare.InvalidHandError("Compare requires exactly two hands")
+
+        hands = [parse_hand(hc, hand_string, parsed_hands)
+                 for hand_string in hand_strings]
+
+        if request.get("sanity", True):
+            hc.deck_sanity(hands)
+    except (handcompare.InvalidHandError, card.InvalidCardError,
+            hand.DuplicateCardError, AttributeError, UnicodeError) as e:
+        # AttributeError occurs when a hand is not a string, and UnicodeError when a
+        # hand holds non-ASCII characters
+        response["error"] = str(e)
+        return response
+
+    if op == "compare":
+        response["result"] = hc.compare_hands(hands[0], hands[1])
+    else:
+        response.update(hc.showdown(hands))
+
+    return response
+
+
+def process_line(batcher, line):
+    """Evaluate one line of newline-delimited JSON and return the response line."""
+    try:
+        request = json.loads(line)
+    except ValueError:
+        return json.dumps({"error": "Request is not valid JSON"})
+
+    return json.dumps(batcher.submit(request))
+
+
+class ThreadingTCPServer(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+    """TCP server handling each connection on its own thread."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class ThreadingHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """HTTP server handling each connection on its own thread."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class LineRequestHandler(SocketServer.StreamRequestHandler):
+    """Handles newline-delimited JSON requests on a TCP connection."""
+
+    def handle(self):
+        for line in iter(self.rfile.readline, ""):
+            if not line.strip():
+                continue
+            self.wfile.write(process_line(self.server.batcher, line) + "\n")
+            self.wfile.flush()
+
+
+class HTTPRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Handles JSON requests POSTed to /compare or /showdown."""
+
+    # Keep connections open between requests
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.getheader("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = 1
+            return self.send_json(400, {"error": "Content-Length must be a non-negative "
+                                                 "integer"})
+
+        body = self.rfile.read(length)
+
+        try:
+            request = json.loads(body)
+        except ValueError:
+            return self.send_json(400, {"error": "Request is not valid JSON"})
+
+        # The path selects the operation unless the request specifies one
+        if isinstance(request, dict) and self.path.strip("/") in ("compare", "showdown"):
+            request.setdefault("op", self.path.strip("/"))
+
+        response = self.server.batcher.submit(request)
+        self.send_json(400 if "error" in response else 200, response)
+
+    def send_json(self, status, response):
+        """Write a JSON response with the given HTTP status."""
+        body = json.dumps(response)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Do not log every request to stderr."""
+        pass
+
+
+class ComparisonService(object):
+    """
+    Runs a RequestBatcher with a TCP server and an HTTP server in background threads.
+    Port 0 picks a free port; the ports in use are available after start().
+    """
+
+    def __init__(self, host="127.0.0.1", tcp_port=0, http_port=0,
+                 max_batch=MAX_BATCH, max_delay=MAX_DELAY):
+        """Constructor: create (but do not start) the batcher and servers."""
+        self.batcher = RequestBatcher(max_batch, max_delay)
+        self.tcp_server = ThreadingTCPServer((host, tcp_port), LineRequestHandler)
+        self.http_server = ThreadingHTTPServer((host, http_port), HTTPRequestHandler)
+        self.tcp_server.batcher = self.batcher
+        self.http_server.batcher = self.batcher
+        self.threads = []
+
+    def start(self):
+        """Start the batcher and both servers."""
+        self.batcher.start()
+        for server in (self.tcp_server, self.http_server):
+            thread = threading.Thread(target=server.serve_forever)
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        """Stop both servers and the batcher."""
+        for server in (self.tcp_server, self.http_server):
+            server.shutdown()
+            server.server_close()
+        self.batcher.stop()
+
+    def get_tcp_address(self):
+        """Accessor: (host, port) of the TCP server"""
+        return self.tcp_server.server_address
+
+    def get_http_address(self):
+        """Accessor: (host, port) of the HTTP server"""
+        return self.http_server.server_address
+
+
+class ComparisonClient(object):
+    """Client for the newline-delimited JSON protocol over one TCP connection."""
+
+    def __init__(self, host, port):
+        """Constructor: connect to the service."""
+        self.connection = socket.create_connection((host, port))
+        self.stream = self.connection.makefile("rwb")
+
+    def close(self):
+        """Close the connection."""
+        self.stream.close()
+        self.connection.close()
+
+    def request(self, request):
+        """Send a request dict and return the response dict."""
+        self.stream.write(json.dumps(request) + "\n")
+        self.stream.flush()
+        return json.loads(self.stream.readline())
+
+    def compare(self, hand1, hand2):
+        """Compare two hand strings; returns the response dict."""
+        return self.request({"op": "compare", "hands": [hand1, hand2]})
+
+    def showdown(self, hand_strings):
+        """Rank any number of hand strings; returns the response dict."""
+        return self.request({"op": "showdown", "hands": list(hand_strings)})
+
+
+class LocalClient(object):
+    """In-process client submitting requests straight to a RequestBatcher."""
+
+    def __init__(self, batcher):
+        """Constructor: use the given (started) batcher."""
+        self.batcher = batcher
+
+    def close(self):
+        """Nothing to release; present for compatibility with ComparisonClient."""
+        pass
+
+    def request(self, request):
+        """Submit a request dict and return the response dict."""
+        return self.batcher.submit(request)
+
+
+def run_load(client_factory, requests, concurrency=8):
+    """
+    Load generator: send every request dict in requests using concurrency threads,
+    each with its own client from client_factory(), and return a dict with the
+    number of requests, errors, elapsed seconds, requests per second and p50/p99
+    latency in milliseconds.
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    request_iterator = iter(requests)
+
+    def worker():
+        client = client_factory()
+        try:
+            while True:
+                with lock:
+                    try:
+                        request = next(request_iterator)
+                    except StopIteration:
+                        return
+
+                start = time.time()
+                response = client.request(request)
+                elapsed = time.time() - start
+
+                with lock:
+                    latencies.append(elapsed)
+                    if "error" in response:
+                        errors[0] += 1
+        finally:
+            client.close()
+
+    start = time.time()
+    threads = [threading.Thread(target=worker) for i in range(0, concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - start
+
+    latencies.sort()
+
+    def percentile(fraction):
+        if not latencies:
+            return 0.0
+        return latencies[min(int(len(latencies) * fraction), len(latencies) - 1)] * 1000
+
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "seconds": elapsed,
+        "requests_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(0.50),
+        "p99_ms": percentile(0.99),
+    }
+
+
+def get_option(name, default):
+    """Return the integer value following a command line option, or a default."""
+    if name in sys.argv:
+        try:
+            return int(sys.argv[sys.argv.index(name) + 1])
+        except (IndexError, ValueError):
+            print "Error: {0} requires an integer value".format(name)
+            sys.exit(1)
+
+    return default
+
+
+if __name__ == '__main__':
+    if "--loadgen" in sys.argv:
+        # Measure throughput and latency against an in-process service on free ports
+        service = ComparisonService()
+    else:
+        service = ComparisonService(tcp_port=get_option("--port", 8765),
+                                    http_port=get_option("--http-port", 8766))
+
+    service.start()
+
+    if "--loadgen" not in sys.argv:
+        print "Listening on TCP {0} and HTTP {1}".format(
+            service.get_tcp_address(), service.get_http_address())
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            service.stop()
+            sys.exit(0)
+
+    import default_hands
+    hand_strings = sorted(default_hands.DEFAULT_HANDS.values())
+    load = [{"op": "compare", "sanity": False,
+             "hands": [hand_strings[i % len(hand_strings)],
+                       hand_strings[(i * 7 + 3) % len(hand_strings)]]}
+            for i in range(0, get_option("--requests", 20000))]
+
+    (host, port) = service.get_tcp_address()
+    results = {
+        "local": run_load(lambda: LocalClient(service.batcher), load,
+                          get_option("--concurrency", 8)),
+        "tcp": run_load(lambda: ComparisonClient(host, port), load,
+                        get_option("--concurrency", 8)),
+        "batches": service.batcher.batches,
+    }
+    service.stop()
+    print json.dumps(results, indent=2, sort_keys=True)
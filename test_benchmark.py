@@ -0,0 +1,67 @@
+"""
+This script is not directly executable and forms part of the test suite for
+the handcompare application.
+"""
+
+# TestBenchmark: Test cases to deal with the benchmark harness.
+
+import unittest
+import random
+
+import hand
+import benchmark
+import handcompare
+
+
+class TestBenchmark(unittest.TestCase):
+    def setUp(self):
+        """Create a HandCompare object for parsing workloads."""
+        self.hc = handcompare.HandCompare()
+
+    def tearDown(self):
+        del self.hc
+
+    def test_workloads(self):
+        """Check that workloads are reproducible and contain valid hands."""
+        for (workload_name, get_workload) in benchmark.WORKLOADS:
+            hand_strings = get_workload(50, random.Random(1))
+            self.assertEqual(len(hand_strings), 50)
+            self.assertEqual(hand_strings, get_workload(50, random.Random(1)))
+
+            for hand_string in hand_strings:
+                self.hc.parse_hand_string(hand_string)
+
+        worst_case = benchmark.get_worst_case_workload(50, random.Random(2))
+        self.assertEqual(
+            set(self.hc.parse_hand_string(hand_string).get_type_text()
+                for hand_string in worst_case), set(["straight", "two_pair"]))
+
+    def test_run_benchmarks(self):
+        """Check the layout of a small benchmark report and its comparison."""
+        hand.set_evaluator("lookup")
+        try:
+            report = benchmark.run_benchmarks(hands=24, repeat=1, seed=3,
+                                              cold_start=False)
+            # The evaluator in use before the run is restored
+            self.assertEqual(hand.Hand.evaluator, "lookup")
+        finally:
+            hand.set_evaluator("check")
+
+        self.assertEqual(report["meta"]["hands"], 24)
+        self.assertTrue(report["peak_memory"] > 0)
+        self.assertFalse("cold_start" in report)
+
+        for name in ("parse", "evaluate_check", "evaluate_lookup", "compare",
+                     "compare_operator", "sort", "sort_score", "sort_hands", "top_k",
+                     "showdown"):
+            for (workload_name, get_workload) in benchmark.WORKLOADS:
+                result = report["results"]["{0}.{1}".format(name, workload_name)]
+                self.assertTrue(result["count"] > 0)
+                self.assertTrue(result["per_second"] >= 0)
+
+        report["cold_start"] = benchmark.measure_cold_start(1)
+        self.assertEqual(report["cold_start"]["runs"], 1)
+
+        lines = benchmark.compare_reports(report, report)
+        self.assertEqual(len(lines), len(report["results"]) + 3)
+        self.assertTrue(lines[1].endswith("+0.0%"))
@@ -0,0 +1,120 @@
+"""
+This script is not directly executable and forms part of the test suite for
+the handcompare application.
+"""
+
+# TestBulkCompare: Test cases to deal with parallel bulk comparison.
+
+import unittest
+import os
+import sys
+import random
+import tempfile
+from StringIO import StringIO
+
+import bulkcompare
+import benchmark
+import handcompare
+
+
+class TestBulkCompare(unittest.TestCase):
+    def setUp(self):
+        """Write a temporary file of hand pairs, including blank and invalid lines."""
+        self.hc = handcompare.HandCompare()
+        rng = random.Random(25)
+        hand_strings = benchmark.get_random_workload(400, rng)
+
+        lines = [" ".join(hand_strings[index:index + 2])
+                 for index in range(0, len(hand_strings), 2)]
+        lines[10] = ""
+        lines[50] = "2C,3C,4C,5C,6C"
+        lines[120] = "2C,2C,4C,5C,6C 3D,4D,5D,6D,7D"
+        # Whitespace that str.splitlines() would treat as a line break
+        lines[150] = lines[150].replace(" ", "\r")
+        lines[151] = lines[151].replace(" ", "\x0c")
+        self.text = "\n".join(lines) + "\n"
+
+        (handle, self.path) = tempfile.mkstemp()
+        with os.fdopen(handle, "w") as input_file:
+            input_file.write(self.text)
+
+        # Batch mode reports errors on sys.stderr
+        self.devnull = open(os.devnull, 'w')
+        self.stderr = sys.stderr
+        sys.stderr = self.devnull
+
+    def tearDown(self):
+        """Remove the temporary input file and reset stderr."""
+        sys.stderr = self.stderr
+        self.devnull.close()
+        os.remove(self.path)
+        del self.hc
+
+    def test_get_chunks(self):
+        """Check that chunks cover the file exactly and start at line boundaries."""
+        for chunk_size in (1, 100, 1000, len(self.text), 10 ** 6):
+            chunks = bulkcompare.get_chunks(self.path, chunk_size)
+            self.assertEqual(chunks[0][0], 0)
+            self.assertEqual(chunks[-1][1], len(self.text))
+
+            for ((start, stop), (next_start, next_stop)) in zip(chunks, chunks[1:]):
+                self.assertEqual(stop, next_start)
+                self.assertEqual(self.text[next_start - 1], "\n")
+
+        # A chunk per line when chunks are smaller than lines
+        self.assertEqual(len(bulkcompare.get_chunks(self.path, 1)),
+                         self.text.count("\n"))
+
+        output = StringIO()
+        for chunk_size in (0, -1):
+            self.assertRaises(ValueError, bulkcompare.bulk_compare, self.path, output,
+                              processes=1, chunk_size=chunk_size)
+
+    def test_ordered(self):
+        """Check that ordered output and totals match batch mode exactly."""
+        expected = StringIO()
+        expected_totals = self.hc.batch(StringIO(self.text), expected, verbosity=1,
+                                        sanity=False)
+
+        for (processes, chunk_size) in ((1, 1000), (2, 1000), (3, 64)):
+            output = StringIO()
+            errors = StringIO()
+            totals = bulkcompare.bulk_compare(self.path, output, processes, verbosity=1,
+                                              sanity=False, chunk_size=chunk_size,
+                                              error_file=errors)
+            self.assertEqual(output.getvalue(), expected.getvalue())
+            self.assertEqual(totals, expected_totals)
+            self.assertEqual(totals[1], 2)
+
+            # Line numbers count from the start of the file, not the chunk
+            self.assertEqual([error.split(":")[0]
+                              for error in errors.getvalue().splitlines()],
+                             ["Error on line 51", "Error on line 121"])
+
+    def test_unordered(self):
+        """Check that unordered output holds every result with its byte offset."""
+        expected = StringIO()
+        expected_totals = self.hc.batch(StringIO(self.text), expected)
+
+        output = StringIO()
+        errors = StringIO()
+        totals = bulkcompare.bulk_compare(self.path, output, 2, ordered=False,
+                                          chunk_size=500, error_file=errors)
+        self.assertEqual(totals, expected_totals)
+
+        # Errors are reported in input order, as they are in one process
+        expected_errors = StringIO()
+        bulkcompare.bulk_compare(self.path, StringIO(), 1, error_file=expected_errors)
+        self.assertEqual(errors.getvalue(), expected_errors.getvalue())
+
+        results = {}
+        for line in output.getvalue().splitlines():
+            (offset, result) = line.split("\t")
+            results[int(offset)] = result
+
+        # Offsets are the starts of the non-blank input lines, in order
+        offsets = sorted(results.keys())
+        for offset in offsets:
+            self.assertTrue(offset == 0 or self.text[offset - 1] == "\n")
+        self.assertEqual([results[offset] for offset in offsets],
+                         expected.getvalue().splitlines())
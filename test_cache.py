@@ -0,0 +1,112 @@
+"""
+This script is not directly executable and forms part of the test suite for
+the handcompare application.
+"""
+
+# TestCache: Test cases to deal with the evaluation result cache.
+
+import unittest
+import random
+
+import card
+import hand
+import cache
+import handcompare
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        """Create a HandCompare object for parsing hands."""
+        self.hc = handcompare.HandCompare()
+
+    def tearDown(self):
+        """Disable the shared cache."""
+        hand.disable_cache()
+        del self.hc
+
+    def test_lru(self):
+        """Check least recently used eviction and the counters."""
+        evaluation_cache = cache.EvaluationCache(maxsize=2)
+        self.assertRaises(ValueError, cache.EvaluationCache, 0)
+
+        evaluation_cache.put(1, "one")
+        evaluation_cache.put(2, "two")
+        self.assertEqual(evaluation_cache.get(1), "one")
+
+        # 2 is now the least recently used and is evicted
+        evaluation_cache.put(3, "three")
+        self.assertEqual(evaluation_cache.get(2), None)
+        self.assertEqual(evaluation_cache.get(3), "three")
+        self.assertEqual(len(evaluation_cache), 2)
+
+        self.assertEqual(evaluation_cache.get_stats(), {
+            "size": 2, "maxsize": 2, "hits": 2, "misses": 1, "evictions": 1,
+            "hit_rate": 2.0 / 3})
+
+        evaluation_cache.clear()
+        self.assertEqual(len(evaluation_cache), 0)
+        self.assertEqual(evaluation_cache.get_hit_rate(), 0.0)
+
+    def test_keys(self):
+        """Check that keys ignore card order, and suits with suit_isomorphism."""
+        hand1 = self.hc.parse_hand_string("AC,KC,2D,3H,4S")
+        hand2 = self.hc.parse_hand_string("4S,3H,2D,KC,AC")
+        hand3 = self.hc.parse_hand_string("AD,KD,2S,3C,4H")
+        hand4 = self.hc.parse_hand_string("AD,KC,2S,3C,4H")
+
+        exact = cache.EvaluationCache()
+        self.assertEqual(exact.get_key(hand1.cards), exact.get_key(hand2.cards))
+        self.assertNotEqual(exact.get_key(hand1.cards), exact.get_key(hand3.cards))
+
+        isomorphic = cache.EvaluationCache(suit_isomorphism=True)
+        self.assertEqual(isomorphic.get_key(hand1.cards), isomorphic.get_key(hand3.cards))
+        self.assertNotEqual(isomorphic.get_key(hand1.cards),
+                            isomorphic.get_key(hand4.cards))
+
+    def test_hand_cache(self):
+        """Check that cached results match uncached results for every evaluator."""
+        deck = [card.from_index(card_index) for card_index in range(0, 52)]
+        rng = random.Random(15)
+        deals = [rng.sample(deck, 5) for deal in range(0, 300)]
+        deals += [rng.sample(deck, 7) for deal in range(0, 100)]
+
+        def evaluate_deals():
+            results = []
+            for cards in deals:
+                if len(cards) > hand.Hand.MAXIMUM_CARDS:
+                    deal_hand = hand.SevenCardHand()
+                else:
+                    deal_hand = hand.Hand()
+                deal_hand.add_cards(cards)
+                results.append((deal_hand.get_type(), deal_hand.get_multiple(),
+                                deal_hand.get_rank(), deal_hand.get_score()))
+            return results
+
+        expected = evaluate_deals()
+
+        for suit_isomorphism in (False, True):
+            evaluation_cache = hand.enable_cache(suit_isomorphism=suit_isomorphism)
+            self.assertTrue(hand.get_cache() is evaluation_cache)
+
+            self.assertEqual(evaluate_deals(), expected)
+            self.assertEqual(evaluation_cache.misses, len(evaluation_cache))
+
+            # The second pass is answered entirely from the cache
+            misses = evaluation_cache.misses
+            self.assertEqual(evaluate_deals(), expected)
+            self.assertEqual(evaluation_cache.misses, misses)
+
+        # Ranks from the cache are independent lists
+        hand1 = self.hc.parse_hand_string("AC,KC,2D,3H,4S")
+        hand1.get_rank().append(99)
+        hand2 = self.hc.parse_hand_string("AC,KC,2D,3H,4S")
+        self.assertEqual(hand2.get_rank(), [14, 13, 4, 3, 2])
+
+        hand.set_evaluator("lookup")
+        try:
+            self.assertEqual(evaluate_deals(), expected)
+        finally:
+            hand.set_evaluator("check")
+
+        self.assertTrue(hand.disable_cache())
+        self.assertEqual(hand.get_cache(), None)
@@ -6,6 +6,7 @@ the handcompare application.
 # TestCardValue: Test cases to deal with checking individual card values.
 
 import unittest
+import pickle
 
 import handcompare
 import card
@@ -76,3 +77,58 @@ class TestCardValue(unittest.TestCase):
         # check equal for same values
         card2 = card.Card(2, "H")
         self.assertEqual(card1, card2)
+
+    def test_card_interning(self):
+        """Check that equal cards are the same interned, immutable object."""
+        self.assertIs(card.Card("A", "S"), card.Card("A", "S"))
+        self.assertIs(card.Card(10, "H"), card.Card("10", "H"))
+        self.assertIsNot(card.Card(10, "H"), card.Card(10, "D"))
+
+        # other spellings are not remembered, so only the 52 cards are held
+        for spelling in ("10", u"10", 10L, 10.0, "010", " 10"):
+            self.assertIs(card.Card(spelling, "H"), card.Card(10, "H"))
+        self.assertEqual(len(card.Card._interned), 52)
+        self.assertRaises(card.InvalidCardError, card.Card, 14, "S")
+
+        # cards cannot be modified once created
+        self.assertRaises(AttributeError, setattr, self.card, "value", 3)
+        self.assertRaises(AttributeError, setattr, self.card, "other", 3)
+
+        # pickled cards are restored as the interned object
+        ace = card.Card("A", "S")
+        self.assertIs(pickle.loads(pickle.dumps(ace, 2)), ace)
+
+    def test_card_encoding(self):
+        """Check the index and mask encodings of cards."""
+        self.assertEqual(card.Card(2, "C").get_index(), 0)
+        self.assertEqual(card.Card(2, "S").get_index(), 3)
+        self.assertEqual(card.Card("A", "S").get_index(), 51)
+        self.assertEqual(card.Card(3, "D").get_mask(), 1 << 5)
+
+        # every index maps back to a distinct card
+        cards = [card.from_index(index) for index in range(0, 52)]
+        self.assertEqual(len(set(cards)), 52)
+        for index in range(0, 52):
+            self.assertEqual(cards[index].get_index(), index)
+            self.assertEqual(hash(cards[index]), index)
+
+    def test_from_token(self):
+        """Check parsing of card strings through the token table."""
+        self.assertEqual(len(card.CARD_TOKENS), 56)
+        self.assertIs(card.from_token("10C"), card.Card(10, "C"))
+        self.assertIs(card.from_token("TC"), card.Card(10, "C"))
+        self.assertIs(card.from_token("AS"), card.Card("A", "S"))
+
+        # lowercase and padded variants
+        self.assertIs(card.from_token(" qh "), card.Card("Q", "H"))
+        self.assertIs(card.from_token("2d"), card.Card(2, "D"))
+
+        for invalid_token in ["1H", "11H", "AX", "A", "", "1 H", None, 10]:
+            self.assertRaises(card.InvalidCardError, card.from_token, invalid_token)
+
+        # to_token is the inverse of from_token for every card
+        for card_index in range(0, 52):
+            card_obj = card.from_index(card_index)
+            self.assertIs(card.from_token(card.to_token(card_obj)), card_obj)
+        self.assertEqual(card.to_token(card.Card(10, "C")), "10C")
+        self.assertEqual(card.to_token(card.Card("A", "S")), "AS")
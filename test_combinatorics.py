@@ -0,0 +1,40 @@
+"""
+This script is not directly executable and forms part of the test suite for
+the handcompare application.
+"""
+
+# TestCombinatorics: Test cases to deal with binomials and combination indexes.
+
+import unittest
+import itertools
+
+import combinatorics
+
+
+class TestCombinatorics(unittest.TestCase):
+    def test_binomials(self):
+        """Check the table of binomial coefficients."""
+        self.assertEqual(combinatorics.BINOMIALS[52][5], 2598960)
+        self.assertEqual(combinatorics.BINOMIALS[7][0], 1)
+        self.assertEqual(combinatorics.BINOMIALS[3][5], 0)
+
+        for (n, k) in ((52, 5), (60, 3), (100, 50), (1000, 2), (7, 9), (70, -1)):
+            expected = 0
+            if 0 <= k <= n:
+                expected = reduce(lambda product, i: product * (n - i) // (i + 1),
+                                  range(0, k), 1)
+            self.assertEqual(combinatorics.binomial(n, k), expected)
+
+    def test_combinations(self):
+        """Check ranking and stepping through combinations by index."""
+        positions = combinatorics.unrank_combination(0, 3)
+        self.assertEqual(positions, [0, 1, 2])
+
+        seen = []
+        for index in range(0, combinatorics.BINOMIALS[7][3]):
+            self.assertEqual(combinatorics.unrank_combination(index, 3), positions)
+            seen.append(tuple(positions))
+            combinatorics.next_combination(positions)
+
+        self.assertEqual(sorted(seen), list(itertools.combinations(range(0, 7), 3)))
+        self.assertEqual(combinatorics.unrank_combination(0, 0), [])
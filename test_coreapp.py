@@ -8,8 +8,13 @@ the handcompare application.
 import unittest
 import sys
 import os
+import select
+import tempfile
+import threading
+from StringIO import StringIO
 
 import handcompare
+import hand
 
 
 class TestCoreApp(unittest.TestCase):
@@ -99,3 +104,115 @@ class TestCoreApp(unittest.TestCase):
 
         # Reset sys.argv as all tests are done
         sys.argv = old_argv
+
+    def test_batch(self):
+        """Test comparing many pairs of hands in a single batch."""
+        input_file = StringIO(
+            "5D,6D,7D,8D,9D 4C,5C,6C,7C,8C\n"
+            "\n"
+            "JC,JD,JH,4S,5S    KC,KS,KD,AS,AC\n"
+            "5C,6C,7C,8H,9H 9S,8S,7D,6D,5D\n"
+            "5C,6C,7C,8H,9H\n"
+            "5C,6C,7C,8C,9C 5C,4H,5H,6H,7H\n"
+            "5C,5C,6C,7C,8C 4D,5D,6D,7D,8D\n"
+        )
+        output_file = StringIO()
+
+        totals = self.hc.batch(input_file, output_file)
+        self.assertEqual(output_file.getvalue(), "2\n3\n4\n1\n1\n1\n")
+        self.assertEqual(totals, {
+            handcompare.HAND1_WINS: 1,
+            handcompare.HAND2_WINS: 1,
+            handcompare.HANDS_DRAW: 1,
+            1: 3,
+        })
+
+        # Without sanity checking, hands may share cards; verbose adds hand details
+        input_file.seek(0)
+        output_file = StringIO()
+        self.hc.batch(input_file, output_file, verbosity=1, sanity=False)
+        lines = output_file.getvalue().splitlines()
+        self.assertEqual(lines[0], (
+            "2\tStraight Flush, multiple 0, rank [9, 8, 7, 6, 5]"
+            "\tStraight Flush, multiple 0, rank [8, 7, 6, 5, 4]"))
+        self.assertEqual(lines[4].split("\t")[0], "2")
+
+        # Batch runs do not change the evaluator used elsewhere
+        self.assertEqual(hand.Hand.evaluator, "check")
+
+    def test_batch_pipe(self):
+        """Test that batch mode answers each line at once when used as a coprocess."""
+        (input_read, input_write) = os.pipe()
+        (output_read, output_write) = os.pipe()
+        input_file = os.fdopen(input_write, "w")
+        output_file = os.fdopen(output_write, "w")
+
+        worker = threading.Thread(target=self.hc.batch,
+                                  args=(os.fdopen(input_read), output_file))
+        worker.start()
+        try:
+            input_file.write("5D,6D,7D,8D,9D 4C,5C,6C,7C,8C\n")
+            input_file.flush()
+
+            # The result arrives while the input is still open
+            self.assertTrue(select.select([output_read], [], [], 10)[0])
+            self.assertEqual(os.read(output_read, 100), "2\n")
+        finally:
+            input_file.close()
+            worker.join()
+            output_file.close()
+            os.close(output_read)
+
+    def test_main_batch(self):
+        """Test --batch mode reading from a file given on the command line."""
+        (handle, path) = tempfile.mkstemp()
+        os.write(handle, "JC,JD,JH,4S,5S KC,KS,KD,AS,AC\n")
+        os.close(handle)
+
+        old_argv = sys.argv
+        try:
+            sys.argv = ("handcompare.py", "--batch", path, "--verbose")
+            totals = self.hc.main()
+            self.assertEqual(totals[handcompare.HAND2_WINS], 1)
+
+            # The file may also follow other options
+            sys.argv = ("handcompare.py", "--batch", "--verbose", path)
+            totals = self.hc.main()
+            self.assertEqual(totals[handcompare.HAND2_WINS], 1)
+
+            # More than one file exits the application
+            sys.argv = ("handcompare.py", "--batch", path, path)
+            self.assertRaises(SystemExit, self.hc.main)
+
+            # Missing files exit the application
+            sys.argv = ("handcompare.py", "--batch", path + ".missing")
+            self.assertRaises(SystemExit, self.hc.main)
+        finally:
+            sys.argv = old_argv
+            os.remove(path)
+
+    def test_main_showdown(self):
+        """Test --showdown mode with several hands on the command line."""
+        old_argv = sys.argv
+        try:
+            sys.argv = ("handcompare.py", "--showdown", "2C,3H,4D,5S,10C",
+                        "10D,JD,QD,KD,AD", "9S,9H,KC,QC,2D", "--verbose")
+            result = self.hc.main()
+            self.assertEqual(result["winners"], [1])
+            self.assertEqual(
+                self.hc.verbose_output,
+                ("1. Hand 2: Straight Flush, multiple 0, rank [14, 13, 12, 11, 10]\n"
+                 "2. Hand 3: Pair, multiple 9, rank [13, 12, 2]\n"
+                 "3. Hand 1: High Card, multiple 0, rank [10, 5, 4, 3, 2]\n")
+            )
+
+            # Fewer than two hands, invalid hands and shared cards all exit
+            sys.argv = ("handcompare.py", "--showdown", "2C,3H,4D,5S,10C")
+            self.assertRaises(SystemExit, self.hc.main)
+            sys.argv = ("handcompare.py", "--showdown", "2C,3H,4D,5S,10C", "5X")
+            self.assertRaises(SystemExit, self.hc.main)
+            sys.argv = ("handcompare.py", "--showdown", "2C,3H,4D,5S,10C",
+                        "9S,9H,KC,QC,2D", "2C,2H,2D,2S,3C")
+            self.assertRaises(SystemExit, self.hc.main)
+        finally:
+            sys.argv = old_argv
@@ -0,0 +1,132 @@
+"""
+This script is not directly executable and forms part of the test suite for
+the handcompare application.
+"""
+
+# TestEquity: Test cases to deal with equity calculations over partial deals.
+
+import unittest
+import itertools
+
+import hand
+import equity
+import evaluator
+import handcompare
+import combinatorics
+
+
+class TestEquity(unittest.TestCase):
+    def setUp(self):
+        """Construct shared objects for all testcases in this suite."""
+        self.hc = handcompare.HandCompare()
+
+    def tearDown(self):
+        """Destroy all shared objects from this suite."""
+        del self.hc
+
+    def get_cards(self, card_strings):
+        """Helper function to parse a comma separated list of cards."""
+        return [self.hc.parse_card_string(card_string)
+                for card_string in card_strings.split(",")]
+
+    def test_monte_carlo(self):
+        """Check sampled equity for a well known preflop matchup."""
+        hands = [self.get_cards("AS,AH"), self.get_cards("KS,KH")]
+        result = equity.monte_carlo(hands, trials=4000, processes=1, seed=1)
+
+        self.assertEqual(result.trials, 4000)
+        for player in range(0, 2):
+            self.assertEqual(result.wins[player] + result.ties[player] +
+                             result.get_losses(player), 4000)
+
+        # Aces are roughly an 82% favourite over kings
+        self.assertAlmostEqual(result.get_equity(0), 0.82, delta=0.03)
+        self.assertAlmostEqual(result.get_equity(0) + result.get_equity(1), 1.0)
+
+        # Results for a seed do not depend on the number of processes
+        parallel = equity.monte_carlo(hands, trials=4000, processes=2, seed=1)
+        self.assertEqual(parallel.wins, result.wins)
+        self.assertEqual(parallel.ties, result.ties)
+
+        self.assertRaises(ValueError, equity.monte_carlo, hands, trials=0, processes=1)
+
+    def test_monte_carlo_target_error(self):
+        """Check that sampling stops once the target standard error is reached."""
+        hands = [self.get_cards("AS,AH"), self.get_cards("7C,2D")]
+        board = self.get_cards("AC,7H,2S")
+        result = equity.monte_carlo(hands, board=board, trials=100000,
+                                    target_error=0.01, processes=1, seed=3)
+
+        self.assertLess(result.trials, 100000)
+        self.assertLessEqual(result.get_standard_error(0), 0.01)
+
+        # The stopping point does not depend on the number of processes
+        parallel = equity.monte_carlo(hands, board=board, trials=100000,
+                                      target_error=0.01, processes=3, seed=3)
+        self.assertEqual(parallel.trials, result.trials)
+        self.assertEqual(parallel.wins, result.wins)
+
+        self.assertRaises(ValueError, equity.monte_carlo, hands, board=board,
+                          target_error=0.01, processes=0)
+
+    def test_monte_carlo_complete_board(self):
+        """Check that a complete board gives an exact result."""
+        hands = [self.get_cards("AS,KS"), self.get_cards("AD,KD")]
+        board = self.get_cards("2C,7H,9S,JC,3D")
+        result = equity.monte_carlo(hands, board=board, trials=10, processes=1)
+
+        self.assertEqual(result.ties, [10, 10])
+        self.assertEqual(result.get_equity(0), 0.5)
+
+    def test_prepare_deal(self):
+        """Check that invalid deals are rejected."""
+        aces = self.get_cards("AS,AH")
+        kings = self.get_cards("KS,KH")
+
+        self.assertRaises(ValueError, equity.prepare_deal, [aces])
+        self.assertRaises(hand.DuplicateCardError, equity.prepare_deal,
+                          [aces, self.get_cards("AS,KH")])
+        self.assertRaises(hand.DuplicateCardError, equity.prepare_deal,
+                          [aces, kings], dead=self.get_cards("KH"))
+        self.assertRaises(hand.MaximumCardError, equity.prepare_deal,
+                          [aces, kings], board=self.get_cards("2C,3C,4C,5C,6C,7C"))
+        self.assertRaises(hand.MissingCardError, equity.prepare_deal,
+                          [aces, kings], board_size=2)
+
+        (hole_indices, board, deck, needed) = equity.prepare_deal(
+            [aces, kings], board=self.get_cards("2C,3C"), dead=self.get_cards("4C"))
+        self.assertEqual(len(deck), 52 - 7)
+        self.assertEqual(needed, 3)
+
+    def test_exhaustive(self):
+        """Check exact equity on the turn against a direct enumeration."""
+        hands = [self.get_cards("AS,AH"), self.get_cards("KS,KH")]
+        board = self.get_cards("KC,7D,2S")
+        dead = self.get_cards("3C,4D")
+
+        self.assertEqual(equity.count_deals(hands, board, dead),
+                         combinatorics.BINOMIALS[43][2])
+        result = equity.exhaustive(hands, board, dead, processes=1, chunk_size=100)
+        self.assertEqual(result.trials, 903)
+
+        (hole_indices, board_indices, deck, needed) = equity.prepare_deal(
+            hands, board, dead)
+        lookup = evaluator.get_lookup_evaluator()
+        expected = equity.EquityResult(2)
+        for dealt in itertools.combinations(deck, needed):
+            expected.add_deal([
+                lookup.evaluate_best_indices(hole + board_indices + list(dealt))[3]
+                for hole in hole_indices])
+
+        self.assertEqual(result.wins, expected.wins)
+        self.assertEqual(result.ties, expected.ties)
+
+        # Identical for any number of processes, and for any split of the range
+        parallel = equity.exhaustive(hands, board, dead, processes=3, chunk_size=100)
+        self.assertEqual(parallel.wins, result.wins)
+        self.assertEqual(parallel.shares, result.shares)
+
+        first = equity.enumerate_range(hands, board, dead, 0, 450)
+        first.merge(equity.enumerate_range(hands, board, dead, 450))
+        self.assertEqual(first.wins, result.wins)
+        self.assertEqual(first.trials, 903)
@@ -0,0 +1,188 @@
+"""
+This script is not directly executable and forms part of the test suite for
+the handcompare application.
+"""
+
+# TestEvaluator: Test cases to compare alternate evaluators with the check_() chain.
+
+import unittest
+import random
+import itertools
+
+import card
+import hand
+import evaluator
+import default_hands
+import handcompare
+
+
+class TestEvaluator(unittest.TestCase):
+    def setUp(self):
+        """Construct shared objects for all testcases in this suite."""
+        self.hc = handcompare.HandCompare()
+        self.lookup = evaluator.get_lookup_evaluator()
+
+    def tearDown(self):
+        """Restore the default evaluator in case a testcase changed it."""
+        hand.set_evaluator("check")
+        del self.hc
+
+    def get_deck(self):
+        """Helper function to return a list of all 52 cards."""
+        deck = []
+        for value in range(2, 15):
+            for suit in sorted(card.Card.SUITS.keys()):
+                deck.append(card.Card(self.lookup.VALUE_LETTERS.get(value, value), suit))
+
+        return deck
+
+    def assert_lookup_matches(self, test_hand):
+        """Check that the lookup evaluator agrees with the check_() chain."""
+        test_hand.get_hand_type_check()
+        expected = (test_hand.get_type(), test_hand.get_multiple(), test_hand.get_rank(),
+                    test_hand.get_score())
+
+        test_hand.get_hand_type_lookup()
+        self.assertEqual(
+            (test_hand.get_type(), test_hand.get_multiple(), test_hand.get_rank(),
+             test_hand.get_score()),
+            expected)
+
+    def test_table_size(self):
+        """Check that every equivalence class of five card hands is present."""
+        self.assertEqual(len(self.lookup.flush_table), 1287)
+        self.assertEqual(len(self.lookup.rank_table), 6175)
+
+    def test_lookup_default_hands(self):
+        """Check the lookup evaluator against every hand in default_hands."""
+        for hand_string in default_hands.DEFAULT_HANDS.values():
+            self.assert_lookup_matches(self.hc.parse_hand_string(hand_string))
+
+    def test_lookup_random_hands(self):
+        """Check the lookup evaluator against a seeded sample of random hands."""
+        deck = self.get_deck()
+        rng = random.Random(5)
+
+        for i in range(0, 2000):
+            test_hand = hand.Hand()
+            for card_obj in rng.sample(deck, hand.Hand.MAXIMUM_CARDS):
+                test_hand.add_card(card_obj)
+            self.assert_lookup_matches(test_hand)
+
+    def test_lookup_all_flushes(self):
+        """Check the lookup evaluator against every flush in a single suit."""
+        for values in itertools.combinations(range(2, 15), hand.Hand.MAXIMUM_CARDS):
+            test_hand = hand.Hand()
+            for value in values:
+                test_hand.add_card(
+                    card.Card(self.lookup.VALUE_LETTERS.get(value, value), "S"))
+            self.assert_lookup_matches(test_hand)
+
+    def test_set_evaluator(self):
+        """Check that the evaluator can be selected and is used by get_hand_type."""
+        self.assertRaises(ValueError, hand.set_evaluator, "unknown")
+
+        self.assertTrue(hand.set_evaluator("lookup"))
+        test_hand = self.hc.parse_hand_string(default_hands.DEFAULT_HANDS["two_pair"])
+        self.assertEqual(test_hand.get_type_text(), "two_pair")
+        self.assertEqual(test_hand.get_multiple(), 9)
+        self.assertEqual(test_hand.get_rank(), [7, 2])
+
+        # Comparisons between hands are unchanged by the lookup evaluator
+        hand1 = self.hc.parse_hand_string(default_hands.DEFAULT_HANDS["wp_two_pair_5"])
+        hand2 = self.hc.parse_hand_string(default_hands.DEFAULT_HANDS["wp_two_pair_6"])
+        self.assertGreater(hand1, hand2)
+
+        # A hand can use its own evaluator regardless of the global choice
+        hand.set_evaluator("check")
+        self.assertEqual(hand.Hand("lookup").evaluator, "lookup")
+        self.assertEqual(hand.Hand().evaluator, "check")
+        self.assertRaises(ValueError, hand.Hand, "unknown")
+
+    def test_evaluate_best(self):
+        """Check best-of-seven evaluation against every five card subset."""
+        rng = random.Random(7)
+
+        for card_count in (5, 6, 7):
+            for i in range(0, 300):
+                card_indices = rng.sample(range(0, 52), card_count)
+                subsets = [
+                    self.lookup.evaluate_best_indices(list(subset))
+                    for subset in itertools.combinations(card_indices,
+                                                         hand.Hand.MAXIMUM_CARDS)
+                ]
+                best = max(subsets, key=lambda result: result[3])
+                self.assertEqual(self.lookup.evaluate_best_indices(card_indices), best)
+
+        self.assertRaises(hand.MissingCardError,
+                          self.lookup.evaluate_best_indices, [0, 1, 2, 3])
+        self.assertRaises(hand.MaximumCardError,
+                          self.lookup.evaluate_best_indices, range(0, 8))
+
+    def test_seven_card_hand(self):
+        """Check that SevenCardHand evaluates the best five cards as they are added."""
+        hole_cards = self.hc.parse_hand_string("AS,AD,2C,7H,9S").get_cards()
+        test_hand = hand.SevenCardHand()
+        for card_obj in hole_cards:
+            test_hand.add_card(card_obj)
+        self.assertEqual(test_hand.get_type_text(), "pair")
+
+        # A sixth card makes two pair, a seventh a full house
+        test_hand.add_card(card.Card(9, "D"))
+        self.assertEqual(test_hand.get_type_text(), "two_pair")
+        self.assertEqual(test_hand.get_rank(), [9, 7])
+        test_hand.add_card(card.Card("A", "H"))
+        self.assertEqual(test_hand.get_type_text(), "full_house")
+        self.assertEqual((test_hand.get_multiple(), test_hand.get_rank()), (14, [9]))
+
+        self.assertRaises(hand.MaximumCardError, test_hand.add_card, card.Card(3, "H"))
+
+        # Seven card hands compare directly with five card hands
+        self.assertEqual(test_hand,
+                         self.hc.parse_hand_string("AC,AH,AS,9C,9H"))
+        self.assertGreater(test_hand,
+                           self.hc.parse_hand_string("KC,KH,KS,QC,QH"))
+
+        # Wheel straight flush in a seven card hand with a higher flush card
+        test_hand = hand.SevenCardHand()
+        for card_string in ["AD", "2D", "3D", "4D", "5D", "KD", "KS"]:
+            test_hand.add_card(self.hc.parse_card_string(card_string))
+        self.assertEqual(test_hand.get_type_text(), "straight_flush")
+        self.assertEqual(test_hand.get_rank(), [5, 4, 3, 2, 1])
+
+        test_hand.clear()
+        self.assertRaises(hand.MissingCardError, test_hand.get_hand_type)
+
+    @unittest.skipIf(hand.numpy is None, "NumPy is not installed")
+    def test_evaluate_array(self):
+        """Check vectorized evaluation against the check_() chain."""
+        test_hands = [self.hc.parse_hand_string(hand_string)
+                      for hand_string in sorted(default_hands.DEFAULT_HANDS.values())]
+
+        rng = random.Random(11)
+        deck = self.get_deck()
+        for i in range(0, 1000):
+            test_hand = hand.Hand()
+            for card_obj in rng.sample(deck, hand.Hand.MAXIMUM_CARDS):
+                test_hand.add_card(card_obj)
+            test_hands.append(test_hand)
+
+        card_indices = hand.numpy.array(
+            [[card_obj.get_index() for card_obj in test_hand.get_cards()]
+             for test_hand in test_hands], dtype=hand.numpy.uint8)
+        (types, multiples, ranks) = hand.evaluate_array(card_indices)
+
+        for hand_index in range(0, len(test_hands)):
+            test_hand = test_hands[hand_index]
+            self.assertEqual(types[hand_index], test_hand.get_type())
+            self.assertEqual(multiples[hand_index], test_hand.get_multiple())
+            self.assertEqual(
+                hand.pack_score(int(types[hand_index]), int(multiples[hand_index]), []) |
+                ranks[hand_index], test_hand.get_score())
+
+        # Empty input, bad shapes, out of range and repeated cards
+        self.assertEqual(len(hand.evaluate_array(hand.numpy.zeros((0, 5)))[0]), 0)
+        self.assertRaises(ValueError, hand.evaluate_array, [[0, 1, 2, 3]])
+        self.assertRaises(ValueError, hand.evaluate_array, [[0, 1, 2, 3, 52]])
+        self.assertRaises(hand.DuplicateCardError, hand.evaluate_array,
+                          [[0, 1, 2, 3, 4], [0, 1, 2, 3, 3]])
@@ -432,3 +432,108 @@ class TestHand(unittest.TestCase):
         # Set ranks to different lengths and check consistency
         hand1.rank = [0, 0]
         self.assertRaises(hand.CompareError, hand1.check_rank_consistency, hand2)
+
+    def test_score(self):
+        """Check that the packed score orders hands by type, multiple and rank"""
+        self.hand.clear()
+        self.assertEqual(self.hand.get_score(), 0)
+
+        # AAAKK full house: type 6, multiple 14, rank [13]
+        self.set_full_house()
+        self.assertEqual(self.hand.get_score(), hand.pack_score(6, 14, [13]))
+        self.assertEqual(self.hand.get_score(), (6 << 24) | (14 << 20) | (13 << 16))
+        full_house = self.hand
+
+        self.hand = hand.Hand()
+        self.set_three_of_a_kind()
+        self.assertGreater(full_house.get_score(), self.hand.get_score())
+        self.assertGreater(full_house, self.hand)
+
+        # Equal hands have equal hashes and collapse in a set
+        other_hand = hand.Hand()
+        for card_suit in ["S", "D", "H"]:
+            other_hand.add_card(card.Card("A", card_suit))
+        other_hand.add_card(card.Card("K", "C"))
+        other_hand.add_card(card.Card("K", "D"))
+        self.assertEqual(full_house, other_hand)
+        self.assertEqual(hash(full_house), hash(other_hand))
+        self.assertEqual(len(set([full_house, other_hand, self.hand])), 2)
+
+        # Sorting by score gives the same order as the comparison operators
+        hands = [full_house, self.hand, other_hand]
+        self.assertEqual(sorted(hands, key=hand.Hand.get_score), sorted(hands))
+
+    def test_card_counts(self):
+        """Check that the card bitmask and value/suit counts follow added cards"""
+        self.hand.clear()
+        self.assertEqual(self.hand.get_mask(), 0)
+        self.assertFalse(self.hand.has_exact_card(card.Card(3, "D")))
+
+        self.set_three_of_a_kind()
+        self.assertTrue(self.hand.has_exact_card(card.Card(3, "D")))
+        self.assertFalse(self.hand.has_exact_card(card.Card(3, "H")))
+
+        expected_mask = 0
+        for card_obj in self.hand.get_cards():
+            expected_mask |= card_obj.get_mask()
+        self.assertEqual(self.hand.get_mask(), expected_mask)
+
+        # 33345: three 3s, one 4, one 5; suits D, C, S, H, D
+        self.assertEqual(self.hand.get_rank_counts()[3:6], [3, 1, 1])
+        self.assertEqual(sum(self.hand.get_rank_counts()), 5)
+        self.assertEqual(self.hand.get_suit_counts(), [1, 2, 1, 1])
+
+        # cards are sorted by value (and insertion order within a value) when read
+        self.assertEqual(str(self.hand),
+                         "[(3, 'D'), (3, 'C'), (3, 'S'), (4, 'H'), (5, 'D')]")
+
+    def test_add_cards(self):
+        """Check adding several cards in one pass"""
+        self.hand.clear()
+        cards = [card.Card(value, "C") for value in range(2, 6)]
+        self.assertTrue(self.hand.add_cards(cards))
+        self.assertEqual(self.hand.get_type(), 0)
+
+        # a rejected card leaves the hand unchanged
+        self.assertRaises(hand.DuplicateCardError, self.hand.add_cards,
+                          [card.Card(6, "C"), card.Card(2, "C")])
+        self.assertRaises(hand.MaximumCardError, self.hand.add_cards,
+                          [card.Card(6, "C"), card.Card(7, "C")])
+        self.assertRaises(ValueError, self.hand.add_cards, ["6C"])
+        self.assertEqual(len(self.hand.get_cards()), 4)
+
+        # the fifth card evaluates the hand
+        self.hand.add_cards([card.Card(6, "C")])
+        self.assertEqual(self.hand.get_type_text(), "straight_flush")
+
+    def test_sort_hands(self):
+        """Check ordering hands into tie groups and selecting the strongest hands"""
+        def make_hand(cards):
+            new_hand = hand.Hand()
+            new_hand.add_cards([card.Card(value, suit) for (value, suit) in cards])
+            return new_hand
+
+        pair1 = make_hand([(9, "C"), (9, "D"), ("A", "S"), (4, "H"), (2, "D")])
+        flush = make_hand([(2, "H"), (5, "H"), (7, "H"), (9, "H"), ("J", "H")])
+        pair2 = make_hand([(9, "H"), (9, "S"), ("A", "C"), (4, "C"), (2, "S")])
+        high = make_hand([(3, "C"), (5, "D"), (7, "S"), (9, "S"), ("J", "C")])
+        pair3 = make_hand([(9, "S"), (9, "H"), ("A", "D"), (4, "D"), (2, "C")])
+        hands = [pair1, flush, pair2, high, pair3]
+
+        groups = hand.sort_hands(hands)
+        self.assertEqual([[id(h) for h in group] for group in groups],
+                         [[id(flush)], [id(pair1), id(pair2), id(pair3)], [id(high)]])
+        self.assertEqual(hand.sort_hand_indexes(hands), [[1], [0, 2, 4], [3]])
+        self.assertEqual(hand.sort_hands([]), [])
+
+        # The third place is shared; the earliest hands are kept unless ties are wanted
+        top = hand.top_k(hands, 2)
+        self.assertEqual([[id(h) for h in group] for group in top],
+                         [[id(flush)], [id(pair1)]])
+
+        top = hand.top_k(hands, 2, include_ties=True)
+        self.assertEqual([[id(h) for h in group] for group in top],
+                         [[id(flush)], [id(pair1), id(pair2), id(pair3)]])
+
+        self.assertEqual(len(hand.top_k(hands, 10)), 3)
+        self.assertEqual(hand.top_k(hands, 0), [])
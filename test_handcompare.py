@@ -17,8 +17,23 @@ import hand
 from test_cardvalue import *
 from test_hand import *
 from test_coreapp import *
+from test_evaluator import *
+from test_equity import *
+from test_combinatorics import *
+from test_handfile import *
+from test_server import *
+from test_cache import *
+from test_isomorphism import *
+from test_preflop import *
+from test_benchmark import *
+from test_verify import *
+from test_incremental import *
+from test_outs import *
+from test_ranges import *
+from test_bulkcompare import *
 
 import sys
+import itertools
 
 
 class TestHandCompare(unittest.TestCase):
@@ -47,6 +62,19 @@ class TestHandCompare(unittest.TestCase):
         result = self.hc.parse_hand_string("2C,3H,4D,5C,6H")
         self.assertIsInstance(result, hand.Hand)
 
+        # lowercase and padded cards are accepted
+        result = self.hc.parse_hand_string("2c, 3H,4d ,5C,6h")
+        self.assertEqual(result.get_type_text(), "straight")
+
+        # too many or too few cards, invalid and duplicate cards
+        for invalid_hand in ["2C,3H,4D,5C", "2C,3H,4D,5C,6H,7H"]:
+            self.assertRaises(handcompare.InvalidHandError, self.hc.parse_hand_string,
+                              invalid_hand)
+        self.assertRaises(card.InvalidCardError, self.hc.parse_hand_string,
+                          "2C,3H,4D,5C,1H")
+        self.assertRaises(hand.DuplicateCardError, self.hc.parse_hand_string,
+                          "2C,3H,4D,2C,6H")
+
     def test_parse_card_string(self):
         """Tests to ensure the card is a valid string with appropriate content."""
 
@@ -270,6 +298,98 @@ class TestHandCompare(unittest.TestCase):
         hand2 = self.load_default_hand("straight_flush_ace_low")
         self.assertTrue(self.hc.hand_sanity(hand1, hand2))
 
+    def test_deck_sanity(self):
+        """Check shared card detection across many hands, a board and dead cards."""
+        hands = [self.hc.parse_hand_string(hand_string) for hand_string in (
+            "2C,3C,4C,5C,6C", "2D,3D,4D,5D,6D", "7H,8H,9H,10H,JH", "QS,KS,AS,2H,3H")]
+        board = [card.Card(7, "S"), card.Card(8, "S")]
+        self.assertTrue(self.hc.deck_sanity(hands, board, [card.Card("Q", "H")]))
+        self.assertTrue(self.hc.deck_sanity([]))
+
+        # 2D is in hands 2 and 5, and 8H in hand 3 and the dead cards
+        hands.append(self.hc.parse_hand_string("2D,4H,5H,6H,9S"))
+        try:
+            self.hc.deck_sanity(hands, board, [card.Card(8, "H")])
+            self.fail("Shared cards were not detected")
+        except handcompare.SharedCardError as e:
+            self.assertEqual(e.shared_cards, {
+                card.Card(2, "D"): ["hand 2", "hand 5"],
+                card.Card(8, "H"): ["hand 3", "dead cards"],
+            })
+            self.assertEqual(str(e), "Same card found more than once: "
+                                     "2D (hand 2, hand 5), 8H (hand 3, dead cards)")
+
+        # A card repeated within the board itself, or shared with a hand
+        self.assertRaises(handcompare.SharedCardError, self.hc.deck_sanity, hands[:1],
+                          [card.Card(7, "S"), card.Card(7, "S")])
+        self.assertRaises(handcompare.InvalidHandError, self.hc.deck_sanity, hands[:1],
+                          hands[0].get_cards()[:3])
+
+    def test_showdown(self):
+        """Check ranking of more than two hands at once."""
+        hands = [
+            self.load_default_hand("pair"),
+            self.load_default_hand("straight_flush"),
+            self.load_default_hand("high_card"),
+            self.load_default_hand("straight_flush_2"),
+            self.load_default_hand("pair_less"),
+        ]
+
+        result = self.hc.showdown(hands)
+        self.assertEqual(result["winners"], [1, 3])
+        self.assertEqual(result["ordering"], [[1, 3], [0], [4], [2]])
+        self.assertEqual(result["ties"], [[1, 3]])
+
+        # A single winner with hands of the same type and multiple
+        hands = [
+            self.load_default_hand("wp_two_pair_6"),
+            self.load_default_hand("wp_two_pair_5"),
+        ]
+        result = self.hc.showdown(hands)
+        self.assertEqual(result["winners"], [1])
+        self.assertEqual(result["ties"], [])
+
+        self.assertRaises(handcompare.InvalidHandError, self.hc.showdown, [])
+
+    def test_pipeline(self):
+        """Check the generator pipeline, including per-record errors."""
+        lines = [
+            "5D,6D,7D,8D,9D 4C,5C,6C,7C,8C",
+            "",
+            "JC,JD,JH,4S,5S KC,KS,KD,AS,AC",
+            "5C,6C,7C,8H,9H 9S,8S,7D,6D,5D",
+            "5C,6C,7C,8H,9H",
+            "5C,6C,7C,8C,9C 5C,4H,5H,6H,7H",
+            "5C,5C,6C,7C,8C 4D,5D,6D,7D,8D",
+            "5C,6C,7C,8C,9X 4D,5D,6D,7D,8D",
+        ]
+        records = list(self.hc.iter_compare(self.hc.iter_evaluate(
+            self.hc.iter_parse_hands(lines))))
+
+        self.assertEqual([record.line_number for record in records],
+                         [1, 3, 4, 5, 6, 7, 8])
+        self.assertEqual([record.result for record in records[0:3]], [
+            handcompare.HAND1_WINS, handcompare.HAND2_WINS, handcompare.HANDS_DRAW])
+        self.assertEqual(records[0].scores, [hand_obj.get_score()
+                                             for hand_obj in records[0].hands])
+
+        self.assertIsInstance(records[3].error, handcompare.InvalidHandError)
+        self.assertIsInstance(records[4].error, handcompare.InvalidHandError)
+        self.assertIsInstance(records[5].error, hand.DuplicateCardError)
+        self.assertIsInstance(records[6].error, card.InvalidCardError)
+        for record in records[3:]:
+            self.assertIsNone(record.result)
+
+        # Without sanity checking, hands may share cards
+        records = list(self.hc.iter_parse_hands(lines[5:6], sanity=False))
+        self.assertIsNone(records[0].error)
+
+        # Records are produced lazily, so unbounded input can be consumed
+        stream = self.hc.iter_compare(self.hc.iter_evaluate(
+            self.hc.iter_parse_hands(itertools.repeat(lines[0]))))
+        for i in range(0, 100):
+            self.assertEqual(next(stream).result, handcompare.HAND1_WINS)
+
 if __name__ == '__main__':
     """
     Empty sys.argv in case this application is accidentally run with hand strings
@@ -0,0 +1,98 @@
+"""
+This script is not directly executable and forms part of the test suite for
+the handcompare application.
+"""
+
+# TestHandFile: Test cases to deal with binary hand files.
+
+import unittest
+import os
+import tempfile
+from StringIO import StringIO
+
+import hand
+import handfile
+import handcompare
+
+
+class TestHandFile(unittest.TestCase):
+    def setUp(self):
+        """Create a temporary path for hand files."""
+        self.hc = handcompare.HandCompare()
+        (handle, self.path) = tempfile.mkstemp()
+        os.close(handle)
+
+    def tearDown(self):
+        """Remove the temporary hand file."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        del self.hc
+
+    def test_convert_and_read(self):
+        """Check that text records survive conversion to the binary format."""
+        text = ("5D,6D,7D,8D,9D 4C,5C,6C,7C,8C\n"
+                "\n"
+                "JC,JD,JH,4S,5S KC,KS,KD,AS,AC\n")
+        self.assertEqual(handfile.convert_text(StringIO(text), self.path), 2)
+
+        # 16 byte header plus two records of 10 cards
+        self.assertEqual(os.path.getsize(self.path), 16 + 20)
+
+        with handfile.HandFileReader(self.path) as reader:
+            self.assertEqual(len(reader), 2)
+            self.assertEqual(reader.cards_per_record, 10)
+            self.assertEqual(list(reader.get_record(1))[0],
+                             self.hc.parse_card_string("JC").get_index())
+            self.assertRaises(IndexError, reader.get_record, 2)
+
+            records = list(reader.iter_hands())
+            self.assertEqual(len(records), 2)
+            self.assertEqual(
+                records[1][0], self.hc.parse_hand_string("JC,JD,JH,4S,5S"))
+            self.assertEqual(records[1][0].get_type_text(), "three_of_a_kind")
+            self.assertGreater(records[0][0], records[0][1])
+
+            self.assertRaises(handfile.InvalidHandFileError, list, reader.iter_hands(3))
+
+            if hand.numpy is not None:
+                records = reader.as_array()
+                self.assertEqual(records.shape, (2, 10))
+                (types, multiples, ranks) = hand.evaluate_array(records[:, 5:])
+                self.assertEqual(list(types), [8, 6])
+
+    def test_invalid_files(self):
+        """Check that bad input and bad files are rejected."""
+        # empty file
+        self.assertRaises(handfile.InvalidHandFileError, handfile.HandFileReader,
+                          self.path)
+
+        self.assertRaises(handfile.InvalidHandFileError, handfile.convert_text,
+                          StringIO("2C,3C,4C,5C,6C\n2D,3D,4D,5D\n"), self.path)
+        # the partly written file is removed
+        self.assertFalse(os.path.exists(self.path))
+        self.assertRaises(handfile.InvalidHandFileError, handfile.convert_text,
+                          StringIO("2C,3C,4C,5C,6X\n"), self.path)
+        self.assertRaises(handfile.InvalidHandFileError, handfile.convert_text,
+                          StringIO("\n"), self.path)
+        self.assertRaises(handfile.InvalidHandFileError, handfile.convert_text,
+                          StringIO("2C,3C,4C,5C,6C\n2D,3D,2D,5D,6D\n"), self.path)
+
+        # wrong magic and truncated files
+        with open(self.path, "wb") as output_file:
+            output_file.write("NOT A HAND FILE!")
+        self.assertRaises(handfile.InvalidHandFileError, handfile.HandFileReader,
+                          self.path)
+
+        # card bytes outside 0-51
+        handfile.convert_text(StringIO("2C,3C,4C,5C,6C\n"), self.path)
+        with open(self.path, "r+b") as output_file:
+            output_file.seek(17)
+            output_file.write(chr(52))
+        with handfile.HandFileReader(self.path) as reader:
+            self.assertRaises(handfile.InvalidHandFileError, list, reader.iter_hands())
+
+        handfile.convert_text(StringIO("2C,3C,4C,5C,6C\n"), self.path)
+        with open(self.path, "r+b") as output_file:
+            output_file.truncate(18)
+        self.assertRaises(handfile.InvalidHandFileError, handfile.HandFileReader,
+                          self.path)
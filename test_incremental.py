@@ -0,0 +1,107 @@
+"""
+This script is not directly executable and forms part of the test suite for
+the handcompare application.
+"""
+
+# TestIncremental: Test cases to deal with incremental hand evaluation.
+
+import unittest
+import random
+
+import card
+import hand
+import incremental
+import handcompare
+
+
+class TestIncremental(unittest.TestCase):
+    def setUp(self):
+        """Create a HandCompare object for parsing cards."""
+        self.hc = handcompare.HandCompare()
+
+    def tearDown(self):
+        del self.hc
+
+    def parse_cards(self, card_strings):
+        """Helper: return a list of Card objects from a comma separated string."""
+        return [self.hc.parse_card_string(card_string)
+                for card_string in card_strings.split(",")]
+
+    def test_streets(self):
+        """Check the type after every card is dealt, and after cards are removed."""
+        state = incremental.IncrementalEvaluator()
+        expected = ["high_card", "pair", "pair", "two_pair", "full_house", "full_house",
+                    "four_of_a_kind"]
+        cards = self.parse_cards("9C,9D,4S,4H,9H,4D,9S")
+        for (card_obj, type_name) in zip(cards, expected):
+            state.add_card(card_obj)
+            self.assertEqual(state.get_type_text(), type_name)
+
+        self.assertEqual(state.get_cards(), cards)
+        self.assertRaises(hand.MaximumCardError, state.add_card, card.Card(2, "C"))
+
+        state.remove_card(card.Card(9, "S"))
+        self.assertEqual(state.get_type_text(), "full_house")
+        state.remove_card(card.Card(9, "C"))
+        state.remove_card(card.Card(9, "H"))
+        self.assertEqual(state.get_type_text(), "three_of_a_kind")
+        self.assertRaises(incremental.CardNotFoundError, state.remove_card,
+                          card.Card(9, "S"))
+        self.assertRaises(hand.DuplicateCardError, state.add_card, card.Card(4, "S"))
+
+        state.clear()
+        self.assertEqual(state.get_mask(), 0)
+        self.assertEqual(state.get_type_text(), "high_card")
+
+        # Four of a kind is known from four cards; straights and flushes need five
+        state = incremental.IncrementalEvaluator(self.parse_cards("JC,JD,JH,JS"))
+        self.assertEqual(state.get_type_text(), "four_of_a_kind")
+        state = incremental.IncrementalEvaluator(self.parse_cards("AS,2S,3S,4S"))
+        self.assertEqual(state.get_type_text(), "high_card")
+        state.add_card(card.Card(5, "S"))
+        self.assertEqual(state.get_type_text(), "straight_flush")
+        self.assertEqual(state.evaluate()[2], (5, 4, 3, 2, 1))
+
+    def test_matches_evaluator(self):
+        """Check types and scores against the LookupEvaluator for random deals."""
+        rng = random.Random(22)
+        deck = [card.from_index(card_index) for card_index in range(0, 52)]
+        for deal in range(0, 2000):
+            cards = rng.sample(deck, 7)
+            state = incremental.IncrementalEvaluator(cards[:4])
+            for card_obj in cards[4:]:
+                state.add_card(card_obj)
+                seven_card_hand = hand.SevenCardHand()
+                seven_card_hand.add_cards(state.get_cards())
+                self.assertEqual(state.get_type(), seven_card_hand.get_type())
+                self.assertEqual(state.get_score(), seven_card_hand.get_score())
+
+            # Removing cards in any order restores the earlier state exactly
+            for card_obj in rng.sample(cards[4:], 3):
+                state.remove_card(card_obj)
+            self.assertEqual(state.count_counts,
+                             incremental.IncrementalEvaluator(cards[:4]).count_counts)
+            self.assertEqual(state.value_mask,
+                             incremental.IncrementalEvaluator(cards[:4]).value_mask)
+
+    def test_out_types(self):
+        """Check the type made by every possible next card."""
+        state = incremental.IncrementalEvaluator(self.parse_cards("AH,KH,QH,JH,2C,3D"))
+        dead_cards = self.parse_cards("10D,10S")
+        out_types = state.get_out_types(dead_cards)
+
+        self.assertEqual(len(out_types), 52 - 8)
+        self.assertFalse(card.Card(10, "D").index in out_types)
+        self.assertEqual(out_types[card.Card(10, "H").index],
+                         incremental.TYPES["straight_flush"])
+        self.assertEqual(out_types[card.Card(10, "C").index],
+                         incremental.TYPES["straight"])
+        self.assertEqual(out_types[card.Card(5, "H").index], incremental.TYPES["flush"])
+        self.assertEqual(out_types[card.Card(2, "D").index], incremental.TYPES["pair"])
+
+        self.assertEqual(state.get_type_with(card.Card(10, "H")),
+                         incremental.TYPES["straight_flush"])
+        self.assertEqual(len(state.get_cards()), 6)
+
+        state.add_card(card.Card(4, "S"))
+        self.assertRaises(hand.MaximumCardError, state.get_out_types)
@@ -0,0 +1,152 @@
+"""
+This script is not directly executable and forms part of the test suite for
+the handcompare application.
+"""
+
+# TestIsomorphism: Test cases to deal with suit isomorphism.
+
+import unittest
+import random
+import itertools
+
+import card
+import isomorphism
+import handcompare
+
+
+class TestIsomorphism(unittest.TestCase):
+    def setUp(self):
+        """Create a HandCompare object for parsing cards."""
+        self.hc = handcompare.HandCompare()
+
+    def tearDown(self):
+        del self.hc
+
+    def parse_cards(self, card_strings):
+        """Helper: return a list of Card objects from a comma separated string."""
+        if not card_strings:
+            return []
+
+        return [self.hc.parse_card_string(card_string)
+                for card_string in card_strings.split(",")]
+
+    def test_canonicalize(self):
+        """Check canonical forms and the inverse mapping."""
+        (groups, suit_map) = isomorphism.canonicalize(
+            [self.parse_cards("AS,KH"), self.parse_cards("2H,7H,QD")])
+        self.assertEqual(groups, [self.parse_cards("KD,AC"),
+                                  self.parse_cards("2D,7D,QH")])
+
+        inverse = isomorphism.invert_suit_map(suit_map)
+        self.assertEqual(isomorphism.relabel(groups[0], inverse),
+                         self.parse_cards("KH,AS"))
+        self.assertEqual(isomorphism.relabel(groups[1], inverse),
+                         self.parse_cards("2H,7H,QD"))
+
+        # Equivalent deals share a key; moving a card between groups does not
+        self.assertEqual(isomorphism.get_key([self.parse_cards("AC,KC")]),
+                         isomorphism.get_key([self.parse_cards("KH,AH")]))
+        self.assertNotEqual(isomorphism.get_key([self.parse_cards("AC,KC")]),
+                            isomorphism.get_key([self.parse_cards("AC,KD")]))
+        self.assertNotEqual(
+            isomorphism.get_key([self.parse_cards("AC"), self.parse_cards("KC")]),
+            isomorphism.get_key([self.parse_cards("AC,KC"), []]))
+
+    def test_random_relabelling(self):
+        """Check that every suit relabelling of a deal has the same canonical form."""
+        deck = [card.from_index(card_index) for card_index in range(0, 52)]
+        rng = random.Random(16)
+
+        for deal in range(0, 200):
+            cards = rng.sample(deck, 9)
+            groups = [cards[:2], cards[2:7], cards[7:]]
+            (canonical_groups, suit_map) = isomorphism.canonicalize(groups)
+
+            suit_permutation = range(0, 4)
+            rng.shuffle(suit_permutation)
+            permuted = [isomorphism.relabel(cards, suit_permutation) for cards in groups]
+
+            self.assertEqual(isomorphism.get_key(permuted), isomorphism.get_key(groups))
+            self.assertEqual(isomorphism.canonicalize(permuted)[0], canonical_groups)
+
+            inverse = isomorphism.invert_suit_map(suit_map)
+            for group_index in range(0, len(groups)):
+                self.assertEqual(
+                    isomorphism.relabel(canonical_groups[group_index], inverse),
+                    sorted(groups[group_index], key=lambda card_obj: card_obj.index))
+
+    def test_index(self):
+        """Check the dense index of starting hands and of a hand with one card."""
+        starting_hands = isomorphism.IsomorphismIndex((2,))
+        weights = [starting_hands.get_weight(index)
+                   for index in range(0, len(starting_hands))]
+        self.assertEqual(len(starting_hands), 169)
+        self.assertEqual(sorted(set(weights)), [4, 6, 12])
+        self.assertEqual(sum(weights), 1326)
+
+        # Pairs, suited and offsuit hands
+        for (card_strings, weight) in (("AC,AS", 6), ("9H,8H", 4), ("QD,2S", 12)):
+            index = starting_hands.get_index([self.parse_cards(card_strings)])
+            self.assertEqual(starting_hands.get_weight(index), weight)
+
+            groups = starting_hands.get_groups(index)
+            self.assertEqual(starting_hands.get_index(groups), index)
+            self.assertEqual(isomorphism.get_key(groups),
+                             isomorphism.get_key([self.parse_cards(card_strings)]))
+
+        self.assertRaises(ValueError, starting_hands.get_index,
+                          [self.parse_cards("AC,KC,QC")])
+        self.assertRaises(ValueError, starting_hands.get_index,
+                          [self.parse_cards("AC,AC")])
+
+        self.assertRaises(IndexError, starting_hands.get_groups, 169)
+        self.assertRaises(ValueError, isomorphism.IsomorphismIndex, (53,))
+        self.assertRaises(ValueError, isomorphism.IsomorphismIndex, (50, 3))
+
+    def test_index_deals(self):
+        """Check the index against every deal of a starting hand and one card."""
+        with_card = isomorphism.IsomorphismIndex((2, 1))
+        self.assertEqual(len(with_card), 5083)
+
+        # Every deal of a class shares its key, and each class holds weight deals
+        cards = [card.from_index(card_index) for card_index in range(0, 52)]
+        keys = {}
+        deals = {}
+        for hand_cards in itertools.combinations(cards, 2):
+            for card_obj in cards:
+                if card_obj.mask & (hand_cards[0].mask | hand_cards[1].mask):
+                    continue
+                groups = [list(hand_cards), [card_obj]]
+                index = with_card.get_index(groups)
+                self.assertEqual(keys.setdefault(index, isomorphism.get_key(groups)),
+                                 isomorphism.get_key(groups))
+                deals[index] = deals.get(index, 0) + 1
+
+        self.assertEqual(sorted(deals.keys()), range(0, len(with_card)))
+        for index in range(0, len(with_card)):
+            self.assertEqual(with_card.get_weight(index), deals[index])
+            groups = with_card.get_groups(index)
+            self.assertEqual(with_card.get_index(groups), index)
+            self.assertEqual(isomorphism.get_key(groups), keys[index])
+
+        self.assertRaises(ValueError, with_card.get_index,
+                          [self.parse_cards("AC,KC"), self.parse_cards("KC")])
+
+    def test_index_large(self):
+        """Check shapes with too many deals to enumerate, such as a hand and a flop."""
+        self.assertEqual(len(isomorphism.IsomorphismIndex((2, 3))), 1286792)
+        self.assertEqual(len(isomorphism.IsomorphismIndex((2, 5))), 123156254)
+
+        with_flop = isomorphism.IsomorphismIndex((2, 3))
+        random_obj = random.Random(16)
+        for trial in range(0, 200):
+            index = random_obj.randrange(0, len(with_flop))
+            groups = with_flop.get_groups(index)
+            self.assertEqual(with_flop.get_index(groups), index)
+
+            deal = random_obj.sample(range(0, 52), 5)
+            groups = [[card.from_index(card_index) for card_index in sorted(deal[:2])],
+                      [card.from_index(card_index) for card_index in sorted(deal[2:])]]
+            index = with_flop.get_index(groups)
+            self.assertEqual(isomorphism.get_key(with_flop.get_groups(index)),
+                             isomorphism.get_key(groups))
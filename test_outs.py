@@ -0,0 +1,102 @@
+"""
+This script is not directly executable and forms part of the test suite for
+the handcompare application.
+"""
+
+# TestOuts: Test cases to deal with outs and draw analysis.
+
+import unittest
+
+import card
+import hand
+import outs
+import handcompare
+
+
+class TestOuts(unittest.TestCase):
+    def setUp(self):
+        """Create a HandCompare object for parsing cards."""
+        self.hc = handcompare.HandCompare()
+
+    def tearDown(self):
+        del self.hc
+
+    def parse_cards(self, card_strings):
+        """Helper: return a list of Card objects from a comma separated string."""
+        return [self.hc.parse_card_string(card_string)
+                for card_string in card_strings.split(",")]
+
+    def test_flush_draw(self):
+        """Check the outs of an open ended straight flush draw on the flop."""
+        result = outs.analyze(self.parse_cards("9H,10H"),
+                              self.parse_cards("JH,QH,2C"))
+
+        self.assertEqual(len(result.unseen), 47)
+        self.assertEqual(result.type, hand.Hand.HAND_TYPES[-1][1])
+        self.assertEqual(result.get_outs("straight_flush"), self.parse_cards("8H,KH"))
+        self.assertEqual(result.get_counts(), {
+            "straight_flush": 2,
+            "flush": 7,
+            "straight": 6,
+            "pair": 6,
+        })
+        self.assertAlmostEqual(result.get_probability(), 21 / 47.0)
+
+        # Pairing the board is not an out, as every player shares the pair
+        self.assertEqual([card_obj.value for card_obj in result.get_board_outs()],
+                         [2, 2, 11, 11, 11, 12, 12, 12])
+        self.assertFalse(card.Card("J", "C").index in result.out_types)
+        self.assertAlmostEqual(result.get_probability("flush"), 7 / 47.0)
+        self.assertEqual(result.get_probability("full_house"), 0.0)
+        self.assertEqual(result.winning, None)
+        self.assertEqual(result.get_runner_runner_probability(), 0.0)
+
+    def test_opponents(self):
+        """Check winning outs against opponents, whose cards are not unseen."""
+        # Player has a flush draw against a set of jacks
+        result = outs.analyze(self.parse_cards("AH,5H"), self.parse_cards("JH,8H,2C,7D"),
+                              opponents=[self.parse_cards("JC,JD")])
+
+        self.assertEqual(len(result.unseen), 44)
+        self.assertFalse(card.Card("J", "C").index in result.unseen)
+
+        # Nine hearts make the flush, but 2H and 7H pair the board for a full house
+        winning = result.get_winning_outs()
+        self.assertEqual(len(result.get_outs("flush")), 9)
+        self.assertEqual(winning, [card_obj for card_obj in result.get_outs("flush")
+                                   if card_obj.value not in (2, 7)])
+        self.assertAlmostEqual(result.get_winning_probability(), 7 / 44.0)
+
+        self.assertRaises(hand.MissingCardError, outs.analyze, self.parse_cards("AH,5H"),
+                          self.parse_cards("JH"), [self.parse_cards("JC,JD")])
+        self.assertRaises(hand.DuplicateCardError, outs.analyze,
+                          self.parse_cards("AH,5H"), self.parse_cards("JH,8H,2C"),
+                          [self.parse_cards("JH,JD")])
+
+        # Every opponent needs exactly two hole cards
+        self.assertRaises(hand.MissingCardError, outs.analyze, self.parse_cards("AH,5H"),
+                          self.parse_cards("JH,8H,2C"), [[]])
+        self.assertRaises(hand.MissingCardError, outs.analyze, self.parse_cards("AH,5H"),
+                          self.parse_cards("JH,8H,2C"), [self.parse_cards("JC,JD"),
+                                                         self.parse_cards("KC")])
+        self.assertRaises(hand.MaximumCardError, outs.analyze, self.parse_cards("AH,5H"),
+                          self.parse_cards("JH,8H,2C"), [self.parse_cards("JC,JD,3S")])
+
+    def test_runner_runner(self):
+        """Check pairs of cards that only improve the hand together."""
+        result = outs.analyze(self.parse_cards("AS,KS"), self.parse_cards("QS,7D,2C"),
+                              runner_runner=True)
+        counts = result.get_runner_runner_counts()
+
+        # Two more spades; JS,10S is a straight flush instead
+        self.assertEqual(counts["flush"], 45 - 1)
+        self.assertEqual(counts["straight_flush"], 1)
+        # J and 10 of any other suits (both spades make a straight flush)
+        self.assertEqual(counts["straight"], 4 * 4 - 1)
+        self.assertAlmostEqual(result.get_runner_runner_probability("straight_flush"),
+                               1 / 1081.0)
+        # Two of a value not yet dealt only pair the board
+        self.assertFalse("pair" in counts)
+
+        self.assertRaises(hand.MaximumCardError, outs.analyze, self.parse_cards("AS,KS"),
+                          self.parse_cards("QS,7D,2C,3C"), runner_runner=True)
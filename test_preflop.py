@@ -0,0 +1,166 @@
+"""
+This script is not directly executable and forms part of the test suite for
+the handcompare application.
+"""
+
+# TestPreflop: Test cases to deal with the preflop equity table.
+
+import unittest
+import os
+import math
+import tempfile
+
+import card
+import preflop
+import handcompare
+
+
+class TestPreflop(unittest.TestCase):
+    def setUp(self):
+        """Create a temporary path for equity tables."""
+        self.hc = handcompare.HandCompare()
+        (handle, self.path) = tempfile.mkstemp()
+        os.close(handle)
+
+    def tearDown(self):
+        """Remove the temporary equity table."""
+        os.remove(self.path)
+        del self.hc
+
+    def parse_cards(self, card_strings):
+        """Helper: return a list of Card objects from a comma separated string."""
+        return [self.hc.parse_card_string(card_string)
+                for card_string in card_strings.split(",")]
+
+    def test_indexes(self):
+        """Check combo and class indexes and class names."""
+        for combo_index in range(0, preflop.COMBOS):
+            cards = [card.from_index(card_index)
+                     for card_index in preflop.get_combo_cards(combo_index)]
+            self.assertEqual(preflop.get_combo_index(cards), combo_index)
+            self.assertEqual(preflop.get_combo_index(cards[::-1]), combo_index)
+
+        self.assertRaises(ValueError, preflop.get_combo_index, self.parse_cards("AC,AC"))
+
+        names = [preflop.get_class_name(class_index)
+                 for class_index in range(0, preflop.CLASSES)]
+        self.assertEqual(len(set(names)), preflop.CLASSES)
+
+        for (card_strings, name) in (("AS,AD", "AA"), ("KH,AH", "AKs"),
+                                     ("10C,9D", "T9o"), ("2S,3S", "32s")):
+            class_index = preflop.get_class_index(self.parse_cards(card_strings))
+            self.assertEqual(preflop.get_class_name(class_index), name)
+
+    def test_simulate(self):
+        """Check a simulated matchup against its known equity."""
+        # Card indices: aces are 48-51, sevens 20-23 and deuces 0-3
+        aces = [(48, 49), (50, 51)]
+        seven_deuce = [(0, 21), (1, 22)]
+
+        # AA against 72 offsuit: about 87-88% for the aces
+        (equity,) = preflop._simulate_matchups((((aces, seven_deuce),), 4000, 17))
+        self.assertTrue(abs(equity - 0.875) < 0.03)
+
+        # Combos sharing a card are never dealt: only AC,2C against KC,QC is played
+        (equity,) = preflop._simulate_matchups(
+            ((([(0, 48)], [(0, 44), (40, 44)]),), 400, 17))
+        self.assertTrue(0.5 < equity < 0.75)
+
+    def test_build_and_query(self):
+        """Check the layout of a built table and queries against it."""
+        stats = preflop.build_table(self.path, trials=1, processes=1, seed=3)
+        self.assertEqual(stats["size"], preflop.CLASSES)
+        self.assertEqual(stats["matchups"], preflop.CLASSES * (preflop.CLASSES - 1) // 2)
+
+        self.assertEqual(os.path.getsize(self.path),
+                         preflop.HEADER.size + preflop.CLASSES ** 2 * 4)
+
+        with preflop.EquityTable(self.path) as table:
+            self.assertEqual(table.size, preflop.CLASSES)
+            self.assertEqual(table.trials, 1)
+
+            for row in range(0, table.size, 7):
+                self.assertEqual(table.get_equity(row, row), 0.5)
+                for column in range(0, table.size, 5):
+                    equity = table.get_equity(row, column)
+                    self.assertTrue(equity in (0.0, 0.5, 1.0))
+                    self.assertEqual(equity + table.get_equity(column, row), 1.0)
+
+            aces = preflop.get_class_index(self.parse_cards("AC,AD"))
+            kings = preflop.get_class_index(self.parse_cards("KC,KD"))
+            self.assertEqual(table.query(self.parse_cards("AH,AS"),
+                                         self.parse_cards("KS,KH")),
+                             table.get_equity(aces, kings))
+
+            stats = preflop.benchmark_queries(table, queries=100)
+            self.assertEqual(stats["queries"], 100)
+
+    def test_combos(self):
+        """Check combo matchups and a combo table built from a subset of combos."""
+        # Pairs of aces, pairs of kings and AKo
+        combo_indexes = sorted(preflop.get_combo_index(self.parse_cards(card_strings))
+                               for card_strings in ("AC,AD", "AH,AS", "AC,AH", "KC,KD",
+                                                    "KH,KS", "KC,AD"))
+        (positions, matchups) = preflop._get_combo_matchups(combo_indexes)
+
+        pairs = [pair for class_positions in positions for pair in class_positions]
+        self.assertEqual(len(pairs), len(set(pairs)))
+        self.assertEqual(len(matchups), len(positions))
+        for (row, column) in pairs:
+            self.assertTrue(row < column)
+            self.assertFalse(set(preflop.get_combo_cards(row)) &
+                             set(preflop.get_combo_cards(column)))
+
+        # 11 pairs share no card; the six of aces against kings fall into three
+        # classes, by the number of suits the two hands share
+        self.assertEqual(len(pairs), 11)
+        self.assertEqual(len(matchups), 8)
+
+        # Build the 1326 x 1326 table from the subset only
+        get_combo_matchups = preflop._get_combo_matchups
+        preflop._get_combo_matchups = lambda: get_combo_matchups(combo_indexes)
+        try:
+            stats = preflop.build_table(self.path, trials=200, processes=1, seed=3,
+                                        combos=True)
+        finally:
+            preflop._get_combo_matchups = get_combo_matchups
+
+        self.assertEqual(stats["size"], preflop.COMBOS)
+        self.assertEqual(stats["matchups"], len(matchups))
+        self.assertEqual(os.path.getsize(self.path),
+                         preflop.HEADER.size + preflop.COMBOS ** 2 * 4)
+
+        with preflop.EquityTable(self.path) as table:
+            self.assertEqual(table.size, preflop.COMBOS)
+            for (row, column) in pairs:
+                self.assertAlmostEqual(table.get_equity(row, column) +
+                                       table.get_equity(column, row), 1.0, places=6)
+
+            # Suit relabellings share a value; shared cards and other pairs have none
+            self.assertEqual(table.query(self.parse_cards("AC,AD"),
+                                         self.parse_cards("KH,KS")),
+                             table.query(self.parse_cards("AH,AS"),
+                                         self.parse_cards("KC,KD")))
+            self.assertTrue(table.query(self.parse_cards("AS,AH"),
+                                        self.parse_cards("KD,KC")) > 0.7)
+            self.assertTrue(math.isnan(table.query(self.parse_cards("AC,AD"),
+                                                   self.parse_cards("AC,AH"))))
+            self.assertTrue(math.isnan(table.query(self.parse_cards("QC,QD"),
+                                                   self.parse_cards("KH,KS"))))
+
+    def test_invalid_table(self):
+        """Check that bad files are rejected."""
+        self.assertRaises(preflop.InvalidEquityTableError, preflop.EquityTable, self.path)
+
+        with open(self.path, "wb") as table_file:
+            table_file.write("HCEQ")
+        self.assertRaises(preflop.InvalidEquityTableError, preflop.EquityTable, self.path)
+
+        with open(self.path, "wb") as table_file:
+            table_file.write(preflop.HEADER.pack("HCRD", preflop.VERSION, 169, 1))
+        self.assertRaises(preflop.InvalidEquityTableError, preflop.EquityTable, self.path)
+
+        with open(self.path, "wb") as table_file:
+            table_file.write(preflop.HEADER.pack("HCEQ", preflop.VERSION, 169, 1))
+            table_file.write("\0" * 100)
+        self.assertRaises(preflop.InvalidEquityTableError, preflop.EquityTable, self.path)
@@ -0,0 +1,100 @@
+"""
+This script is not directly executable and forms part of the test suite for
+the handcompare application.
+"""
+
+# TestRanges: Test cases to deal with hand ranges and range equity.
+
+import unittest
+
+import card
+import hand
+import ranges
+import handcompare
+
+
+class TestRanges(unittest.TestCase):
+    def setUp(self):
+        """Create a HandCompare object for parsing cards."""
+        self.hc = handcompare.HandCompare()
+
+    def tearDown(self):
+        del self.hc
+
+    def parse_cards(self, card_strings):
+        """Helper: return a list of Card objects from a comma separated string."""
+        return [self.hc.parse_card_string(card_string)
+                for card_string in card_strings.split(",")]
+
+    def test_parse_range(self):
+        """Check the number of combos for every kind of range entry."""
+        for (range_string, count) in (("AA", 6), ("AKs", 4), ("ako", 12), ("AK", 16),
+                                      ("TT+", 30), ("A9s+", 20), ("KTo+", 36),
+                                      ("98s-65s", 16), ("TT-77", 24), ("A9s-A6s", 16),
+                                      ("AhKh", 1), ("AA, KK, AKs", 16), ("AK-QJ", 48),
+                                      ("", 0)):
+            self.assertEqual(len(ranges.HandRange(range_string)), count)
+
+        combos = ranges.parse_range("AKs, AhKh:0.5, QQ:0")
+        self.assertEqual(len(combos), 10)
+        self.assertEqual(sorted(set(combos.values())), [0.0, 0.5, 1.0])
+        self.assertEqual(len(ranges.HandRange("AKs, AhKh:0.5, QQ:0")), 4)
+
+        # Connectors step down together, keeping the same gap
+        names = set(ranges.get_combo_name(combo)
+                    for combo in ranges.parse_range("97s-75s"))
+        self.assertEqual(len(names), 12)
+        self.assertEqual(set(name[0] + name[2] for name in names),
+                         set(["97", "86", "75"]))
+        self.assertTrue("9h7h" in names)
+
+        for invalid in ("AKx", "A", "AAs", "AK-Q9", "AKs-A9o", "AhAh", "AK:2", "AK:x",
+                        "1010"):
+            self.assertRaises(ranges.InvalidRangeError, ranges.parse_range, invalid)
+
+    def test_blockers(self):
+        """Check that combos using known cards are removed."""
+        hand_range = ranges.HandRange("AA, AKs")
+        board = self.parse_cards("AH,KS,2C")
+        combos = hand_range.get_combos(board)
+
+        # Three aces remain for pairs, and AK suited only in clubs and diamonds
+        self.assertEqual(len(combos), 3 + 2)
+        for (combo, mask, weight) in combos:
+            self.assertFalse(card.Card("A", "H").index in combo)
+            self.assertEqual(mask, (1 << combo[0]) | (1 << combo[1]))
+        self.assertEqual(hand_range.get_weight(board), 5.0)
+
+    def test_river_equity(self):
+        """Check exact equities with a complete board."""
+        board = self.parse_cards("2C,7D,9H,JS,3C")
+        result = ranges.range_equity("AA", "KK, AhKh", board, processes=1)
+
+        # Aces beat kings; AhKh blocks three of the aces
+        self.assertEqual(len(result.pairs), 6 * 6 + 3)
+        self.assertEqual(result.get_equity(0), 1.0)
+        self.assertEqual(result.get_equity(1), 0.0)
+        self.assertEqual(result.get_combo_equities(0)["AsAc"], 1.0)
+        self.assertFalse("AhAd" in result.get_combo_equities(1))
+        self.assertTrue(("AsAc", "AhKh", 1.0) in result.get_matchups())
+
+        result = ranges.range_equity("AhKh:0.5, QQ", "AsKs", board, processes=1)
+        self.assertEqual(result.get_combo_equities(0), {
+            "AhKh": 0.5, "QsQh": 1.0, "QsQd": 1.0, "QsQc": 1.0, "QhQd": 1.0,
+            "QhQc": 1.0, "QdQc": 1.0})
+        # AhKh (weight 0.5) splits the pot, while all six QQ combos win
+        self.assertAlmostEqual(result.get_equity(1), 0.25 / 6.5)
+
+        self.assertRaises(hand.DuplicateCardError, ranges.range_equity, "AA", "KK",
+                          board, board[:1])
+
+    def test_simulated_equity(self):
+        """Check simulated preflop equity, and that processes do not change results."""
+        result = ranges.range_equity("AA", "KK", trials=600, processes=1, seed=24)
+        self.assertEqual(len(result.pairs), 36)
+        self.assertTrue(all(0 < boards < 600 for boards in result.boards))
+        self.assertTrue(abs(result.get_equity(0) - 0.82) < 0.03)
+        self.assertAlmostEqual(result.get_equity(0) + result.get_equity(1), 1.0)
+
+        parallel = ranges.range_equity("AA", "KK", trials=600, processes=2, seed=24)
+        self.assertEqual(parallel.get_combo_equities(0), result.get_combo_equities(0))
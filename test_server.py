@@ -0,0 +1,195 @@
+"""
+This script is not directly executable and forms part of the test suite for
+the handcompare application.
+"""
+
+# TestServer: Test cases to deal with the comparison service.
+
+import unittest
+import json
+import time
+import httplib
+import threading
+
+import hand
+import server
+import handcompare
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        """Start a service on free ports."""
+        self.service = server.ComparisonService()
+        self.service.start()
+
+    def tearDown(self):
+        """Stop the service, which restores the evaluator."""
+        self.service.stop()
+        del self.service
+
+    def test_process_request(self):
+        """Check responses for compare, showdown and invalid requests."""
+        hc = handcompare.HandCompare()
+
+        response = server.process_request(hc, {
+            "id": 7, "hands": ["2C,3H,4D,5S,10C", "10D,JD,QD,KD,AD"]})
+        self.assertEqual(response, {"id": 7, "result": handcompare.HAND2_WINS})
+
+        response = server.process_request(hc, {
+            "op": "showdown",
+            "hands": ["2C,3H,4D,5S,10C", "2D,3S,4H,5C,10S", "9S,9H,KC,QC,2H"]})
+        self.assertEqual(response["winners"], [2])
+        self.assertEqual(response["ties"], [[0, 1]])
+
+        # Duplicate cards are rejected unless sanity checks are disabled
+        request = {"hands": ["2C,3H,4D,5S,10C", "2C,3H,4D,5S,10C"]}
+        self.assertTrue("error" in server.process_request(hc, request))
+        request["sanity"] = False
+        self.assertEqual(server.process_request(hc, request)["result"],
+                         handcompare.HANDS_DRAW)
+
+        for request in ([], {"hands": ["2C,3H,4D,5S,10C"]}, {"op": "fold", "hands": []},
+                        {"hands": ["2C,3H,4D,5S,10C", "1X,3H,4D,5S,10C"]},
+                        {"hands": ["2C,3H,4D,5S,10C", 5]},
+                        {"hands": ["2C,3H,4D,5S,10C", "2D,3S,4H,5C,10S",
+                                   "9S,9H,KC,QC,2H"]}):
+            self.assertTrue("error" in server.process_request(hc, request))
+
+    def test_tcp(self):
+        """Check requests over the newline-delimited JSON protocol."""
+        (host, port) = self.service.get_tcp_address()
+        client = server.ComparisonClient(host, port)
+        try:
+            self.assertEqual(client.compare("10D,JD,QD,KD,AD", "2C,3H,4D,5S,10C"),
+                             {"result": handcompare.HAND1_WINS})
+            self.assertEqual(client.showdown(["2C,3H,4D,5S,10C", "10D,JD,QD,KD,AD",
+                                              "9S,9H,KC,QC,2H"])["winners"], [1])
+
+            # Invalid JSON gets an error response without closing the connection
+            client.stream.write("not json\n")
+            client.stream.flush()
+            self.assertTrue("error" in json.loads(client.stream.readline()))
+            self.assertEqual(client.compare("2C,3H,4D,5S,10C", "2D,3S,4H,5C,10S"),
+                             {"result": handcompare.HANDS_DRAW})
+        finally:
+            client.close()
+
+    def test_http(self):
+        """Check requests POSTed over HTTP."""
+        (host, port) = self.service.get_http_address()
+        connection = httplib.HTTPConnection(host, port)
+        try:
+            connection.request("POST", "/showdown", json.dumps({
+                "hands": ["2C,3H,4D,5S,10C", "10D,JD,QD,KD,AD", "9S,9H,KC,QC,2H"]}))
+            response = connection.getresponse()
+            self.assertEqual(response.status, 200)
+            self.assertEqual(json.loads(response.read())["ordering"], [[1], [2], [0]])
+
+            connection.request("POST", "/compare", json.dumps({"hands": ["AC"]}))
+            response = connection.getresponse()
+            self.assertEqual(response.status, 400)
+            self.assertTrue("error" in json.loads(response.read()))
+        finally:
+            connection.close()
+
+        # A Content-Length that is not a number of bytes is rejected
+        for length in ("ten", "-1"):
+            connection = httplib.HTTPConnection(host, port)
+            try:
+                connection.putrequest("POST", "/compare")
+                connection.putheader("Content-Length", length)
+                connection.endheaders()
+                response = connection.getresponse()
+                self.assertEqual(response.status, 400)
+                self.assertTrue("error" in json.loads(response.read()))
+            finally:
+                connection.close()
+
+    def test_failures(self):
+        """Check that no request can stop the worker thread."""
+        batcher = self.service.batcher
+        response = batcher.submit({"hands": [u"2C,3H,4D,5S,10C", u"\xe9,3H,4D,5S,10C"]})
+        self.assertTrue("error" in response)
+        response = batcher.submit({"op": u"\xe9", "hands": []})
+        self.assertTrue("error" in response)
+
+        process_request = server.process_request
+
+        def broken_process_request(hc, request):
+            raise RuntimeError(u"\xe9")
+
+        server.process_request = broken_process_request
+        try:
+            self.assertTrue("error" in batcher.submit({"hands": []}))
+        finally:
+            server.process_request = process_request
+
+        response = batcher.submit({"hands": ["10D,JD,QD,KD,AD", "2C,3H,4D,5S,10C"]})
+        self.assertEqual(response, {"result": handcompare.HAND1_WINS})
+
+    def test_evaluator(self):
+        """Check that the service evaluates with lookup tables, leaving the default."""
+        self.assertEqual(hand.Hand.evaluator, "check")
+        parsed = self.service.batcher.hc.parse_hand_string("10D,JD,QD,KD,AD")
+        self.assertEqual(parsed.evaluator, "lookup")
+
+    def test_process_batch(self):
+        """Check that a hand repeated across a batch is parsed once."""
+        batcher = server.RequestBatcher()
+        parsed = []
+
+        def parse_hand_string(hand_string):
+            parsed.append(hand_string)
+            return handcompare.HandCompare.parse_hand_string(batcher.hc, hand_string)
+
+        batcher.hc.parse_hand_string = parse_hand_string
+        responses = batcher.process_batch([
+            {"hands": ["10D,JD,QD,KD,AD", "2C,3H,4D,5S,10C"]},
+            {"hands": ["2C,3H,4D,5S,10C", "10D,JD,QD,KD,AD"]},
+            {"hands": ["2C,3H,4D,5S,10C", "2C,3H,4D,5S,1X"]},
+            {"hands": ["2C,3H,4D,5S,1X", "10D,JD,QD,KD,AD"]},
+        ])
+
+        self.assertEqual([response.get("result") for response in responses],
+                         [handcompare.HAND1_WINS, handcompare.HAND2_WINS, None, None])
+        self.assertEqual(sorted(parsed),
+                         ["10D,JD,QD,KD,AD", "2C,3H,4D,5S,10C", "2C,3H,4D,5S,1X"])
+
+    def test_batching(self):
+        """Check that queued requests are evaluated together and answered correctly."""
+        batcher = server.RequestBatcher()
+        responses = [None] * 40
+
+        def submit(request_id):
+            responses[request_id] = batcher.submit({
+                "id": request_id, "hands": ["10D,JD,QD,KD,AD", "2C,3H,4D,5S,10C"]})
+
+        threads = [threading.Thread(target=submit, args=(request_id,))
+                   for request_id in range(0, len(responses))]
+        for thread in threads:
+            thread.start()
+
+        # The worker only starts once every request is queued, so one batch holds all
+        while batcher.queue.qsize() < len(responses):
+            time.sleep(0.001)
+        batcher.start()
+        for thread in threads:
+            thread.join()
+        batcher.stop()
+
+        self.assertEqual(responses, [{"id": request_id, "result": handcompare.HAND1_WINS}
+                                     for request_id in range(0, len(responses))])
+        self.assertEqual(batcher.requests, len(responses))
+        self.assertEqual(batcher.batches, 1)
+
+    def test_load(self):
+        """Check that the load generator answers every request."""
+        requests = [{"id": request_id, "hands": ["10D,JD,QD,KD,AD", "2C,3H,4D,5S,10C"]}
+                    for request_id in range(0, 400)]
+
+        results = server.run_load(lambda: server.LocalClient(self.service.batcher),
+                                  requests, concurrency=8)
+        self.assertEqual(results["requests"], 400)
+        self.assertEqual(results["errors"], 0)
+        self.assertTrue(results["p99_ms"] >= results["p50_ms"])
+        self.assertEqual(self.service.batcher.requests, 400)
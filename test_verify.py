@@ -0,0 +1,57 @@
+"""
+This script is not directly executable and forms part of the test suite for
+the handcompare application.
+"""
+
+# TestVerify: Test cases to deal with the exhaustive verification sweep.
+
+import unittest
+
+import verify
+
+
+class TestVerify(unittest.TestCase):
+    def test_verify_range(self):
+        """Check a range of hands, split into chunks, against every engine."""
+        report = verify.verify(0, 3000, processes=1, chunk_size=1000)
+
+        self.assertEqual(report["hands"], 3000)
+        self.assertEqual(sum(report["type_counts"].values()), 3000)
+        self.assertEqual(report["mismatches"], [])
+
+        # The lowest numbered hands use only the lowest cards, so include four 2s
+        self.assertTrue(report["type_counts"]["four_of_a_kind"] > 0)
+        self.assertTrue(report["type_counts"]["full_house"] > 0)
+
+        for engine_name in ["check"] + verify.get_default_engines():
+            self.assertEqual(report["engines"][engine_name]["mismatches"], 0)
+            self.assertTrue(report["engines"][engine_name]["per_second"] > 0)
+
+        self.assertRaises(ValueError, verify.verify, 0, 10, ["fastest"])
+
+    def test_mismatches(self):
+        """Check that an engine disagreeing with the reference is reported."""
+        engines = verify.ENGINES
+        verify.ENGINES = engines + (
+            ("broken", lambda hands: [0] * len(hands)),)
+        try:
+            report = verify.verify(0, 50, ["best", "broken"], processes=1)
+        finally:
+            verify.ENGINES = engines
+
+        self.assertEqual(report["engines"]["best"]["mismatches"], 0)
+        self.assertEqual(report["engines"]["broken"]["mismatches"], 50)
+        self.assertEqual(len(report["mismatches"]), verify.MAX_MISMATCHES)
+        self.assertEqual(report["mismatches"][0], ("broken", [0, 1, 2, 3, 4],
+                                                   report["mismatches"][0][2], 0))
+
+    def test_type_counts(self):
+        """Check the comparison against the known poker frequencies."""
+        self.assertEqual(sum(verify.EXPECTED_COUNTS.values()), verify.TOTAL_HANDS)
+        self.assertEqual(verify.check_type_counts(verify.EXPECTED_COUNTS), [])
+
+        type_counts = dict(verify.EXPECTED_COUNTS)
+        type_counts["straight"] -= 4
+        type_counts["straight_flush"] += 4
+        self.assertEqual(verify.check_type_counts(type_counts), [
+            ("straight", 10196, 10200), ("straight_flush", 44, 40)])
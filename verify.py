@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+
+"""
+verify
+
+Exhaustive correctness and speed sweep: evaluates every one of the 2,598,960 distinct
+five card hands with the reference check_() functions and with each alternate engine,
+reporting any hand where an engine disagrees with the reference, and checks that the
+number of hands of each type matches the known poker frequencies.
+
+Engines are compared by packed score (see hand.pack_score()), which encodes type,
+multiple and rank:
+    lookup: Hand with the lookup evaluator
+    best: LookupEvaluator.evaluate_best_indices()
+    array: hand.evaluate_array() (only when NumPy is installed)
+
+Hands are numbered by the combinatorial number system (see
+combinatorics.unrank_combination()) and split into chunks evaluated across processes.
+
+Usage:
+    verify.py [--processes N] [--engines lookup,best,array] [--start N] [--stop N]
+              [--chunk-size N]
+"""
+
+import sys
+import time
+import multiprocessing
+
+import card
+import hand
+import evaluator
+import combinatorics
+
+# Number of distinct five card hands, and of hands evaluated by one worker task
+TOTAL_HANDS = combinatorics.BINOMIALS[52][5]
+CHUNK_SIZE = 50000
+
+# Mismatches recorded per engine in each chunk; all are counted
+MAX_MISMATCHES = 10
+
+# Number of hands of each type among all distinct five card hands
+EXPECTED_COUNTS = {
+    "straight_flush": 40,
+    "four_of_a_kind": 624,
+    "full_house": 3744,
+    "flush": 5108,
+    "straight": 10200,
+    "three_of_a_kind": 54912,
+    "two_pair": 123552,
+    "pair": 1098240,
+    "high_card": 1302540,
+}
+
+
+def _evaluate_hand(hands, evaluator_name):
+    """Return the packed score of every hand of card indices, using a Hand object."""
+    scores = []
+    for card_indices in hands:
+        hand_obj = hand.Hand()
+        hand_obj.evaluator = evaluator_name
+        hand_obj.add_cards([card.from_index(card_index) for card_index in card_indices])
+        scores.append(hand_obj.get_score())
+
+    return scores
+
+
+def evaluate_reference(hands):
+    """Return a list of (type, score) for every hand, using the check_() functions."""
+    results = []
+    for card_indices in hands:
+        hand_obj = hand.Hand()
+        hand_obj.evaluator = "check"
+        hand_obj.add_cards([card.from_index(card_index) for card_index in card_indices])
+        results.append((hand_obj.get_type(), hand_obj.get_score()))
+
+    return results
+
+
+def evaluate_lookup(hands):
+    """Engine: packed scores from Hand objects with the lookup evaluator."""
+    return _evaluate_hand(hands, "lookup")
+
+
+def evaluate_best(hands):
+    """Engine: packed scores from LookupEvaluator.evaluate_best_indices()."""
+    evaluate = evaluator.get_lookup_evaluator().evaluate_best_indices
+    return [evaluate(card_indices)[3] for card_indices in hands]
+
+
+def evaluate_array(hands):
+    """Engine: packed scores from hand.evaluate_array()."""
+    (types, multiples, ranks) = hand.evaluate_array(
+        hand.numpy.array(hands, dtype=hand.numpy.uint8))
+    scores = (types.astype(hand.numpy.int64) << 24) | \
+        (multiples.astype(hand.numpy.int64) << 20) | ranks
+    return scores.tolist()
+
+
+# Available engines, in the order they are run
+ENGINES = (
+    ("lookup", evaluate_lookup),
+    ("best", evaluate_best),
+    ("array", evaluate_array),
+)
+
+
+def get_default_engines():
+    """Return the names of every engine that can run here."""
+    return [name for (name, function) in ENGINES
+            if name != "array" or hand.numpy is not None]
+
+
+def _verify_chunk(task):
+    """
+    Worker: verify the hands with indices from start (inclusive) to stop (exclusive).
+    task is a tuple of (start, stop, engine names). Returns a dict of the number of
+    hands of each type, the seconds taken by each engine (and the reference), the
+    number of mismatches for each engine, and the first few mismatches as tuples of
+    (engine, card indices, reference score, engine score).
+    """
+    (start, stop, engine_names) = task
+
+    hands = []
+    positions = combinatorics.unrank_combination(start, 5)
+    for hand_index in range(start, stop):
+        hands.append(list(positions))
+        combinatorics.next_combination(positions)
+
+    started = time.time()
+    reference = evaluate_reference(hands)
+    seconds = {"check": time.time() - started}
+
+    type_counts = {}
+    for (hand_type, score) in reference:
+        type_counts[hand_type] = type_counts.get(hand_type, 0) + 1
+
+    engine_functions = dict(ENGINES)
+    mismatch_counts = {}
+    mismatches = []
+    for engine_name in engine_names:
+        started = time.time()
+        scores = engine_functions[engine_name](hands)
+        seconds[engine_name] = time.time() - started
+
+        mismatch_counts[engine_name] = 0
+        for hand_index in range(0, len(hands)):
+            if scores[hand_index] != reference[hand_index][1]:
+                mismatch_counts[engine_name] += 1
+                if mismatch_counts[engine_name] <= MAX_MISMATCHES:
+                    mismatches.append((engine_name, hands[hand_index],
+                                       reference[hand_index][1], scores[hand_index]))
+
+    return {
+        "type_counts": type_counts,
+        "seconds": seconds,
+        "mismatch_counts": mismatch_counts,
+        "mismatches": mismatches,
+    }
+
+
+def verify(start=0, stop=TOTAL_HANDS, engines=None, processes=None,
+           chunk_size=CHUNK_SIZE):
+    """
+    Verify hands start (inclusive) to stop (exclusive) against the reference.
+
+    engines: list of engine names; None runs every engine available
+    processes: number of worker processes; None uses every core, 1 runs in-process
+
+    Returns a dict with the number of hands, elapsed seconds, counts of hands by type
+    name, and per engine (including "check", the reference): the total seconds spent
+    across all processes, hands per second per process and mismatch count. Mismatches
+    holds the first few (engine, card indices, reference score, engine score) tuples
+    from each chunk.
+    """
+    if engines is None:
+        engines = get_default_engines()
+
+    for engine_name in engines:
+        if engine_name not in dict(ENGINES):
+            raise ValueError("Unknown engine {0}; must be one of {1}".format(
+                engine_name, ", ".join(name for (name, function) in ENGINES)))
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+
+    tasks = [(chunk_start, min(chunk_start + chunk_size, stop), engines)
+             for chunk_start in range(start, stop, chunk_size)]
+
+    # Build the lookup tables before forking so workers inherit them
+    evaluator.get_lookup_evaluator()
+
+    started = time.time()
+    if processes > 1 and len(tasks) > 1:
+        pool = multiprocessing.Pool(processes)
+        try:
+            chunk_results = pool.map(_verify_chunk, tasks)
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        chunk_results = [_verify_chunk(task) for task in tasks]
+    elapsed = time.time() - started
+
+    type_names = dict((type_value, type_name)
+                      for (type_name, type_value) in hand.Hand.HAND_TYPES)
+    report = {
+        "hands": stop - start,
+        "seconds": elapsed,
+        "type_counts": dict((type_name, 0) for type_name in type_names.values()),
+        "engines": {},
+        "mismatches": [],
+    }
+
+    for engine_name in ["check"] + list(engines):
+        engine_seconds = sum(chunk_result["seconds"][engine_name]
+                             for chunk_result in chunk_results)
+        report["engines"][engine_name] = {
+            "seconds": engine_seconds,
+            "per_second": (stop - start) / engine_seconds if engine_seconds else 0.0,
+            "mismatches": sum(chunk_result["mismatch_counts"].get(engine_name, 0)
+                              for chunk_result in chunk_results),
+        }
+
+    for chunk_result in chunk_results:
+        for (hand_type, count) in chunk_result["type_counts"].items():
+            report["type_counts"][type_names[hand_type]] += count
+        report["mismatches"] += chunk_result["mismatches"]
+
+    return report
+
+
+def check_type_counts(type_counts):
+    """
+    Return a list of (type name, count, expected count) for every hand type whose
+    count over all distinct five card hands differs from EXPECTED_COUNTS.
+    """
+    return [(type_name, type_counts.get(type_name, 0), expected)
+            for (type_name, expected) in sorted(EXPECTED_COUNTS.items())
+            if type_counts.get(type_name, 0) != expected]
+
+
+def get_option(name, default):
+    """Return the integer value following a command line option, or a default."""
+    if name in sys.argv:
+        try:
+            return int(sys.argv[sys.argv.index(name) + 1])
+        except (IndexError, ValueError):
+            print "Error: {0} requires an integer value".format(name)
+            sys.exit(1)
+
+    return default
+
+
+if __name__ == '__main__':
+    engines = None
+    if "--engines" in sys.argv:
+        try:
+            engines = sys.argv[sys.argv.index("--engines") + 1].split(",")
+        except IndexError:
+            print "Error: --engines requires a comma separated list of engines"
+            sys.exit(1)
+
+    start = get_option("--start", 0)
+    stop = get_option("--stop", TOTAL_HANDS)
+
+    try:
+        report = verify(start, stop, engines, get_option("--processes", None),
+                        get_option("--chunk-size", CHUNK_SIZE))
+    except ValueError as e:
+        print "Error: {0}".format(e)
+        sys.exit(1)
+
+    print "Verified {0} hands in {1:.1f} seconds".format(report["hands"],
+                                                         report["seconds"])
+    for (engine_name, engine_report) in sorted(report["engines"].items()):
+        print "{0:<8} {1:>12.0f} hands/s per process {2:>8} mismatches".format(
+            engine_name, engine_report["per_second"], engine_report["mismatches"])
+
+    for (engine_name, card_indices, expected, score) in report["mismatches"]:
+        card_strings = ["{0}{1}".format(
+            evaluator.LookupEvaluator.VALUE_LETTERS.get(card_obj.value, card_obj.value),
+            card_obj.suit) for card_obj in map(card.from_index, card_indices)]
+        print "Mismatch: {0} {1} expected {2:#x}, found {3:#x}".format(
+            engine_name, ",".join(card_strings), expected, score)
+
+    failed = any(engine_report["mismatches"]
+                 for engine_report in report["engines"].values())
+
+    if (start, stop) == (0, TOTAL_HANDS):
+        for (type_name, count, expected) in check_type_counts(report["type_counts"]):
+            print "Count: {0} has {1} hands, expected {2}".format(
+                type_name, count, expected)
+            failed = True
+
+    sys.exit(1 if failed else 0)